@@ -20,10 +20,11 @@ import numpy
 
 from ch2o.test_args import dprint
 from ch2o.env import Env
-from ch2o.utils import new_tensor, new_sequence, clip_head, ValueReturn, istensor, totensor, make_graph
+from ch2o.utils import new_tensor, new_sequence, clip_head, ValueReturn, istensor, totensor, make_graph, rename_node
 from ch2o.links import Link2NodeClass
 from ch2o.funcs import Func, Func2NodeClass, Function_Concat, Function_Dummy, castto
 from ch2o.builtin_funcs import builtin_functions
+from ch2o.link_templates import LinkTemplates, repeated_suffix
 from ch2o.value import Value
 
 import builtins
@@ -48,6 +49,10 @@ def id2name(nid):
     raise Exception("Not Found ID ", nid)
 
 
+def has_id2name(nid):
+    return any(k == nid for k, _ in id2name_list)
+
+
 def _value(v):
     if (isinstance(v, User_Defined_Function) or
         isinstance(v, User_Defined_Func_In_Link)):
@@ -372,15 +377,25 @@ def eval_for(nast, env):
     # TODO(hamaji): This code doesn't handle scope properly, I think.
     if (isinstance(ite.value, types.GeneratorType) and
         'ChainList.children' in str(ite.value)):
+        links = list(ite.value)
+        # Identical links at the end are emitted as a Loop.
+        start = None
+        if (env.loop_chain_list and
+            all(has_id2name(id(l)) for l in links) and
+            _chain_list_parent(links) is not None):
+            start = repeated_suffix(links)
+
         # とりあえず実際にfor文を回す
         tg = nast.target.id
         env.set_var(tg, Value(None))
-        for v in ite.value:
+        for v in links[:start]:
             env.set_var(tg, _value(v))
             eval_ast(nast.body, env)
             # print('looping',env.vars.keys())
 
         env.pop_var(tg)
+        if start is not None:
+            eval_for_chain_list(nast, env, links, start)
         return None
 
     if ite.is_py:
@@ -401,6 +416,76 @@ def eval_for(nast, env):
     ty = eval_ast(nast.body, localenv)
     assert ty.is_none()
 
+    mtc = env.calc(
+        "ChainerGenericLen",
+        inputs=[ite.to_sequence(env).name],
+    )
+    _emit_loop(localenv, env, mtc, cnt, [(gtx, ite.to_sequence(env))])
+    return None
+
+
+def _chain_list_parent(links):
+    # Returns the pathname of the ChainList whose children are `links`.
+    pathnames = [id2name(id(l)) for l in links]
+    parent = pathnames[0].rsplit('/', 1)[0]
+    if pathnames != ['%s/%d' % (parent, i) for i in range(len(links))]:
+        return None
+    return parent
+
+
+def eval_for_chain_list(nast, env, links, start):
+    # Emits a Loop instead of unrolling `for l in self.children()`
+    # for `links[start:]`, which emit the same nodes.
+    # Each parameter of them is stacked into a single initializer
+    # named `<parent>/<start>*/<param>` (`<parent>/*/<param>` if
+    # `start` is zero) and the body translated for `links[start]`
+    # gathers the one for the current layer, so the outer graph does
+    # not grow with the number of layers.
+    # `edit_onnx_protobuf` stacks parameters of the chainer model.
+    assert isinstance(nast.target, gast.Name)
+    localenv = env.new_block()
+    cnt = new_tensor()
+    localenv.set_var(nast.target.id, Value(links[start]))
+    ty = eval_ast(nast.body, localenv)
+    assert ty.is_none()
+    localenv.pop_var(nast.target.id)
+
+    parent = _chain_list_parent(links)
+    prefix = '%s/%d/' % (parent, start)
+    stacked_prefix = '%s/%s*/' % (parent, start or '')
+    num_layers = len(links) - start
+    gathers = []
+    renamed = {}
+    for name in list(localenv.init_tensors.keys()):
+        if not name.startswith(prefix):
+            continue
+        init = localenv.init_tensors.pop(name)
+        tensor_type = init.type.tensor_type
+        dims = None
+        if tensor_type.HasField('shape'):
+            dims = [num_layers] + [d.dim_value for d in tensor_type.shape.dim]
+        stacked = helper.make_tensor_value_info(
+            stacked_prefix + name[len(prefix):], tensor_type.elem_type, dims)
+        env.init_tensors[stacked.name] = stacked
+        renamed[name] = new_tensor(name='param').name
+        gathers.append(helper.make_node(
+            "Gather",
+            inputs=[stacked.name, cnt.name],
+            outputs=[renamed[name]],
+        ))
+
+    for node in localenv.nodes:
+        rename_node(node, lambda name: renamed.get(name, name))
+    localenv.nodes[:0] = gathers
+
+    mtc = Value(np.array(num_layers)).to_tensor(env)
+    _emit_loop(localenv, env, mtc, cnt, [])
+    return None
+
+
+def _emit_loop(localenv, env, mtc, cnt, invariants):
+    # `invariants` is a list of (an input of the body, a value passed
+    # from `env`) which are not changed by the loop.
     in_out = _find_in_out(localenv, env)
 
     input_values = []
@@ -419,24 +504,20 @@ def eval_for(nast, env):
         input_values.append(iv.to_value_info(env))
         output_values.append(ov.to_value_info(env))
 
+    invariant_inputs = [i for i, _ in invariants]
     cond = new_tensor(name='loop_cond')
     localgraph = make_graph(
         localenv.nodes,
         "Loop_subgraph",
-        [cnt, cond, gtx] + input_values,
-        [cond, gtx] + output_values
-    )
-
-    mtc = env.calc(
-        "ChainerGenericLen",
-        inputs=[ite.to_sequence(env).name],
+        [cnt, cond] + invariant_inputs + input_values,
+        [cond] + invariant_inputs + output_values
     )
 
     env.addnode(
         'Loop',
-        inputs=([mtc.name, "", ite.to_sequence(env).name] +
+        inputs=([mtc.name, ""] + [v.name for _, v in invariants] +
                 [i.name for i in input_values]),
-        outputs=([new_tensor('out_generator').name] +
+        outputs=([new_tensor('out_generator').name for _ in invariants] +
                  [o.name for _, o in final_outputs]),
         body=localgraph
     )
@@ -541,7 +622,12 @@ def eval_call(nast, env):
         assert fn.__module__ != 'builtins'
         fn = User_Defined_Class(fn).init_wrapper
     elif isinstance(fn, chainer.link.Link):
+        link = fn
         fn = convert_link(fn, env)
+        if (isinstance(fn, User_Defined_Link) and
+            env.link_templates is not None and has_id2name(id(link))):
+            return env.link_templates.call(link, id2name(id(link)), fn,
+                                           args, keywords, env)
 
     dprint('converted to', fn)
     return fn.call(args, keywords, env)
@@ -1049,12 +1135,24 @@ def eval_ast_impl(nast, env):
     raise Exception("shouldn't reach here", nast)
 
 
-def compile_model(model, inputs):
+def compile_model(model, inputs, dedup_links=False, loop_chain_list=False,
+                  link_templates=None):
     # return helper.make_graph([],'dummy',[],[])
 
     init_id2name(model)
     # code.InteractiveConsole({'mo': model}).interact()
     env = Env(sys.modules[model.__module__])
+    if link_templates is not None:
+        # Reuse translations of a previous `compile_model`.
+        env.link_templates = link_templates
+    elif dedup_links:
+        # Structurally identical link calls share their translation.
+        # This only saves translation time in Python. The emitted
+        # nodes are copied for each call so the ONNX graph is the same.
+        env.link_templates = LinkTemplates()
+    # Emit a Loop for homogeneous `ChainList.children` instead of
+    # unrolling it.
+    env.loop_chain_list = loop_chain_list
     molk = User_Defined_Link(model, env)
 
     input_tensors = []
@@ -1078,6 +1176,9 @@ def compile_model(model, inputs):
     v = molk.call(input_values, [], env)
 
     dprint('output_tensors', v)
+    if env.link_templates is not None:
+        dprint('link templates: %d hits %d misses' %
+               (env.link_templates.num_hits, env.link_templates.num_misses))
     if isinstance(v.value, tuple):
         output_tensors = list(v.value)  # ばらしてみる
     else:
@@ -53,6 +53,9 @@ class Env(object):
         self.restore_funcs = []  # User定義Linkの初期化子を正常化させるやつ
         self.module = module
         self.outer_block = None
+        # A `LinkTemplates` shared by all envs, or None to disable it.
+        self.link_templates = None
+        self.loop_chain_list = False
 
     def get_var(self, k):
         if k in self._vars:
@@ -85,6 +88,8 @@ class Env(object):
         res.nodes = self.nodes  # こっちはglobalに共通でないといけない
         res.init_tensors = self.init_tensors  # こっちも共通
         res.restore_funcs = self.restore_funcs
+        res.link_templates = self.link_templates
+        res.loop_chain_list = self.loop_chain_list
         return res
 
     def root(self):
@@ -96,6 +101,8 @@ class Env(object):
     def new_block(self):
         block = Env(self.module)
         block.outer_block = self
+        block.link_templates = self.link_templates
+        block.loop_chain_list = self.loop_chain_list
         return block
 
     def addnode(self, *args, **kwargs):
@@ -2,6 +2,10 @@
 # ほぼ　https://github.com/chainer/onnx-chainer/blob/master/onnx_chainer/testing/test_mxnet.py
 # からもらっってきました
 
+import os
+import re
+import sys
+
 import chainer
 import numpy as np
 
@@ -10,13 +14,18 @@ import onnx
 from chainer import functions as F
 from chainer import links as L
 
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))))
+sys.path.append(os.path.join(project_root, 'common'))
+import test_data_writer
+
 
 def tensor_from_array(array, name):
     array = chainer.cuda.to_cpu(array)
     return onnx.numpy_helper.from_array(array, name)
 
 
-def convert_parameter(parameter, name):
+def _parameter_array(parameter):
     if isinstance(parameter, chainer.Parameter):
         array = parameter.array
     elif isinstance(parameter, chainer.Variable):
@@ -30,9 +39,26 @@ def convert_parameter(parameter, name):
                 type(parameter)))
     if array.shape == ():
         array = array[None]
+    return array
+
+
+def convert_parameter(parameter, name):
+    array = _parameter_array(parameter)
     # print('initialize', name, array)
     return tensor_from_array(array, name)
 
+
+def _fill_tensor(tensor, array, name):
+    # Same as `numpy_helper.from_array` but fills `tensor` in place so
+    # large parameters are not copied once more by `MergeFrom`. A
+    # TensorProto in memory owns its bytes so one copy is still made.
+    # Use `reference_params` of `edit_onnx_protobuf` to avoid it.
+    array = np.ascontiguousarray(chainer.cuda.to_cpu(array))
+    tensor.name = name
+    tensor.dims.extend(array.shape)
+    tensor.data_type = onnx.mapping.NP_TYPE_TO_TENSOR_TYPE[array.dtype]
+    tensor.raw_data = array.tobytes()
+
 # 入力xから次元を決める
 # モデルにxを流して最初の重みを決める
 
@@ -66,25 +92,72 @@ def collect_inits(lk, pathname):
 import code
 
 
-def edit_onnx_protobuf(onnxmod, chainermod):
+# Matches `/<start>*/` in names of stacked parameters.
+_STACKED_LAYERS_RE = re.compile(r'/(\d*)\*/')
+
+
+def _stacked_param(name, params):
+    # Stacks parameters for `<parent>/<start>*/<param>` emitted by
+    # `eval_for_chain_list`, i.e., `<parent>/<i>/<param>` for all
+    # i >= start.
+    matched = _STACKED_LAYERS_RE.search(name)
+    parent = name[:matched.start()]
+    start = int(matched.group(1) or 0)
+    suffix = name[matched.end() - 1:]
+    arrays = []
+    while True:
+        layer_name = '%s/%d%s' % (parent, start + len(arrays), suffix)
+        if layer_name in params:
+            arrays.append(_parameter_array(params[layer_name]))
+        elif _STACKED_LAYERS_RE.search(suffix):
+            try:
+                arrays.append(_stacked_param(layer_name, params))
+            except KeyError:
+                break
+        else:
+            break
+    if not arrays:
+        raise KeyError(name)
+    return np.stack([chainer.cuda.to_cpu(a) for a in arrays])
+
+
+def edit_onnx_protobuf(onnxmod, chainermod, reference_params=False):
+    """Sets types of parameters in `onnxmod` and adds their initializers.
+
+    With `reference_params`, initializers are not added to `onnxmod`.
+    Pass the returned parameters to `write_model` instead, which writes
+    them to a file without copying them into TensorProto.
+    """
     initializers = collect_inits(chainermod, '')
 
-    onnx_initializers = []
-    for name, param in initializers:
-        found = False
-        for input in onnxmod.graph.input:
-            if input.name == name:
-                onnx_initializers.append(convert_parameter(param, name))
-                vi = onnx.helper.make_tensor_value_info(
-                    'dummy', onnx.TensorProto.FLOAT, param.shape)
-                input.type.CopyFrom(vi.type)
-                found = True
-                break
-        assert found, name
+    inputs = {}
+    for input in onnxmod.graph.input:
+        inputs.setdefault(input.name, input)
+
+    # Parameters stacked for a Loop over ChainList replace the ones of
+    # each layer.
+    params = dict(initializers)
+    stacked = [(name, _stacked_param(name, params))
+               for name in inputs if _STACKED_LAYERS_RE.search(name)]
+    if stacked:
+        initializers = [(name, param) for name, param in initializers
+                        if name in inputs] + stacked
 
-    dummygraph = onnx.helper.make_graph(
-        [], "hoge", [], [], initializer=onnx_initializers)
-    dummygraph.ClearField("name")
-    # print(dummygraph)
-    onnxmod.graph.MergeFrom(dummygraph)
+    for name, param in initializers:
+        input = inputs.get(name, None)
+        assert input is not None, name
+        if not reference_params:
+            _fill_tensor(onnxmod.graph.initializer.add(),
+                         _parameter_array(param), name)
+        vi = onnx.helper.make_tensor_value_info(
+            'dummy', onnx.TensorProto.FLOAT, param.shape)
+        input.type.CopyFrom(vi.type)
     return initializers
+
+
+def write_model(fp, onnxmod, initializers):
+    """Writes `onnxmod` with parameters from `edit_onnx_protobuf`."""
+    fp.write(onnxmod.SerializeToString())
+    for name, param in initializers:
+        array = chainer.cuda.to_cpu(_parameter_array(param))
+        test_data_writer.write_initializer(fp, name, array)
@@ -0,0 +1,325 @@
+# coding: utf-8
+#
+# Deduplication of structurally identical link calls.
+#
+# ResNet-like models call the same link class many times (e.g., via
+# the `ChainList.children` hack in `eval_for`) and CH2O used to
+# re-walk the AST of `forward` for each of them. `LinkTemplates`
+# records the nodes emitted by the first call and instantiates them
+# for later calls whose link attributes, parameter shapes and
+# argument signature are identical.
+#
+# This is a translation-time cache only. The recorded nodes are copied
+# into the graph for each call so the emitted ONNX model has the same
+# nodes as a translation without the cache. It is disabled by default
+# and enabled by `compile_model(..., dedup_links=True)`.
+#
+# Links which actually share nodes in the emitted model are identical
+# links at the end of a ChainList, found by `repeated_suffix`. With
+# `compile_model(..., loop_chain_list=True)`, they are emitted once as
+# the body of a Loop (see `eval_for_chain_list`).
+#
+# A `LinkTemplates` can be passed to `compile_model` repeatedly. Links
+# are keyed by the hash of their class source so only edited links
+# (and links which contain them) are translated again.
+
+import hashlib
+import inspect
+
+import numpy as np
+import onnx
+
+import chainer
+
+from ch2o import utils
+from ch2o.value import Value
+
+
+class _NotRepresentable(Exception):
+    pass
+
+
+# Attributes which do not affect the emitted graph.
+_IGNORED_LINK_ATTRS = set(['name', 'children'])
+
+
+_class_keys = {}
+
+
+def _class_key(cls):
+    if cls not in _class_keys:
+        try:
+            src = inspect.getsource(cls)
+        except (OSError, TypeError):
+            # We cannot tell if the class was edited.
+            _class_keys[cls] = None
+        else:
+            digest = hashlib.sha1(src.encode('utf-8')).hexdigest()
+            _class_keys[cls] = (cls.__module__, cls.__qualname__, digest)
+    if _class_keys[cls] is None:
+        raise _NotRepresentable(cls)
+    return _class_keys[cls]
+
+
+def _value_info_key(vi):
+    if not vi.type.HasField('tensor_type'):
+        return ('vi', vi.type.SerializeToString())
+    tensor_type = vi.type.tensor_type
+    dims = []
+    for dim in tensor_type.shape.dim:
+        if dim.HasField('dim_value'):
+            dims.append(dim.dim_value)
+        else:
+            dims.append(dim.dim_param)
+    return ('tensor', tensor_type.elem_type, tuple(dims))
+
+
+def _attr_key(v):
+    if isinstance(v, Value):
+        if v.const_value is not None:
+            return _attr_key(v.const_value.value)
+        return _attr_key(v.value)
+    if isinstance(v, onnx.ValueInfoProto):
+        return _value_info_key(v)
+    if isinstance(v, chainer.Link):
+        return _link_key(v)
+    if isinstance(v, chainer.Variable):
+        # Parameters of user defined links are replaced by ONNX
+        # values in `User_Defined_Link` so they must have the same key.
+        if v.array is None:
+            raise _NotRepresentable(v)
+        return ('tensor', utils.onnx_dtype(v.dtype), tuple(v.shape))
+    if isinstance(v, chainer.get_array_types()):
+        return ('array', v.shape, v.dtype.str)
+    if isinstance(v, (list, tuple)):
+        return (type(v).__name__,) + tuple(_attr_key(e) for e in v)
+    if isinstance(v, (set, frozenset)):
+        return ('set',) + tuple(sorted((_attr_key(e) for e in v), key=repr))
+    if isinstance(v, np.generic):
+        return ('np', v.dtype.str, v.item())
+    if v is None or isinstance(v, (bool, int, float, str, type)):
+        return v
+    raise _NotRepresentable(v)
+
+
+def _link_key(link):
+    attrs = []
+    for k, v in sorted(vars(link).items()):
+        if k in _IGNORED_LINK_ATTRS:
+            continue
+        try:
+            attrs.append((k, _attr_key(v)))
+        except _NotRepresentable:
+            # Private attributes are mostly Chainer's internal state
+            # (devices, hooks, etc.). Public ones may be read by
+            # `forward` so we cannot tell two links apart.
+            if not k.startswith('_'):
+                raise
+    return ('link', _class_key(type(link)), tuple(attrs))
+
+
+def _flatten_value_infos(v, out):
+    if isinstance(v, Value):
+        if not v.is_py:
+            out.append(v.value.name)
+            return
+        v = v.value
+    if isinstance(v, onnx.ValueInfoProto):
+        out.append(v.name)
+    elif isinstance(v, (list, tuple)):
+        for e in v:
+            _flatten_value_infos(e, out)
+    elif isinstance(v, dict):
+        for k in sorted(v):
+            _flatten_value_infos(v[k], out)
+
+
+def _collect_names(nodes, defined, referenced):
+    for node in nodes:
+        referenced.update(node.input)
+        defined.update(node.output)
+        for g in utils.subgraphs(node):
+            defined.update(i.name for i in g.input)
+            defined.update(i.name for i in g.value_info)
+            referenced.update(o.name for o in g.output)
+            _collect_names(g.node, defined, referenced)
+
+
+class _Template(object):
+    def __init__(self, pathname, arg_names, nodes, new_inits, result):
+        self.pathname = pathname
+        self.arg_names = arg_names
+        self.nodes = nodes
+        self.new_inits = new_inits
+        self.result = result
+
+
+class LinkTemplates(object):
+    """A cache of emitted nodes keyed by the structure of a link call."""
+
+    def __init__(self):
+        self._templates = {}
+        self.num_hits = 0
+        self.num_misses = 0
+
+    def call(self, link, pathname, fn, args, kwargs, env):
+        if not pathname:
+            return fn.call(args, kwargs, env)
+        try:
+            key = (_link_key(link),
+                   tuple(_attr_key(a) for a in args),
+                   tuple(sorted((k, _attr_key(v))
+                                for k, v in kwargs.items())))
+        except _NotRepresentable:
+            return fn.call(args, kwargs, env)
+
+        arg_names = []
+        _flatten_value_infos((args, kwargs), arg_names)
+
+        template = self._templates.get(key)
+        if template is not None:
+            result = self._instantiate(template, pathname, arg_names, env)
+            if result is not None:
+                self.num_hits += 1
+                return result[0]
+
+        self.num_misses += 1
+        num_nodes = len(env.nodes)
+        init_names = set(env.init_tensors.keys())
+        result = fn.call(args, kwargs, env)
+        if template is None:
+            template = self._record(link, key, pathname, arg_names,
+                                    env.nodes[num_nodes:],
+                                    [v for k, v in env.init_tensors.items()
+                                     if k not in init_names],
+                                    result)
+            if template is not None:
+                self._templates[key] = template
+        return result
+
+    def _record(self, link, key, pathname, arg_names, nodes, new_inits,
+                result):
+        # `forward` may overwrite attributes of `self`. We cannot
+        # reuse its nodes in this case.
+        try:
+            if _link_key(link) != key[0]:
+                return None
+        except _NotRepresentable:
+            return None
+
+        prefix = pathname + '/'
+        for init in new_inits:
+            if not init.name.startswith(prefix):
+                return None
+
+        defined = set()
+        referenced = set()
+        _collect_names(nodes, defined, referenced)
+        for name in referenced - defined:
+            if name and name not in arg_names and not name.startswith(prefix):
+                return None
+
+        try:
+            self._check_result(result)
+        except _NotRepresentable:
+            return None
+
+        nodes = [_copy_proto(node) for node in nodes]
+        new_inits = [_copy_proto(init) for init in new_inits]
+        # The caller may convert the returned Python values into ONNX
+        # values in place so we keep a copy.
+        result = _convert_result(result, _copy_proto)
+        return _Template(pathname, arg_names, nodes, new_inits, result)
+
+    def _check_result(self, result):
+        if isinstance(result, Value):
+            if result.is_py:
+                self._check_result(result.value)
+        elif isinstance(result, (list, tuple)):
+            for r in result:
+                self._check_result(r)
+        elif not (result is None or
+                  isinstance(result, (bool, int, float, str,
+                                      onnx.ValueInfoProto))):
+            raise _NotRepresentable(result)
+
+    def _instantiate(self, template, pathname, arg_names, env):
+        assert len(arg_names) == len(template.arg_names)
+        prefix = template.pathname + '/'
+        renamed = dict(zip(template.arg_names, arg_names))
+        renamed[''] = ''
+
+        def rename(name):
+            if name not in renamed:
+                if name.startswith(prefix):
+                    renamed[name] = pathname + name[len(template.pathname):]
+                else:
+                    renamed[name] = utils.gen_id(name, 'D')
+            return renamed[name]
+
+        # Parameters of the link itself are registered by
+        # `convert_link`. Nested links must be registered here.
+        new_inits = []
+        for init in template.new_inits:
+            init = _copy_proto(init)
+            init.name = rename(init.name)
+            new_inits.append(init)
+        defined = set()
+        referenced = set()
+        _collect_names(template.nodes, defined, referenced)
+        known_inits = set(env.init_tensors.keys())
+        known_inits.update(init.name for init in new_inits)
+        for name in referenced - defined:
+            if name.startswith(prefix) and rename(name) not in known_inits:
+                return None
+
+        for init in new_inits:
+            env.init_tensors[init.name] = init
+        for node in template.nodes:
+            node = _copy_proto(node)
+            utils.rename_node(node, rename)
+            env.nodes.append(node)
+
+        def rename_value_info(vi):
+            vi = _copy_proto(vi)
+            vi.name = rename(vi.name)
+            return vi
+
+        return (_convert_result(template.result, rename_value_info),)
+
+
+def _convert_result(v, convert_value_info):
+    if isinstance(v, Value):
+        nv = Value(_convert_result(v.value, convert_value_info))
+        nv.const_value = v.const_value
+        return nv
+    if isinstance(v, onnx.ValueInfoProto):
+        return convert_value_info(v)
+    if isinstance(v, (list, tuple)):
+        return type(v)(_convert_result(e, convert_value_info) for e in v)
+    return v
+
+
+def _copy_proto(proto):
+    copied = type(proto)()
+    copied.CopyFrom(proto)
+    return copied
+
+
+def repeated_suffix(links):
+    """Returns the start of the longest suffix of `links` whose links emit
+    the same nodes, or None if the suffix has less than two links."""
+    keys = []
+    for link in links:
+        try:
+            keys.append(_link_key(link))
+        except _NotRepresentable:
+            keys.append(None)
+    if not keys or keys[-1] is None:
+        return None
+    start = len(keys) - 1
+    while start > 0 and keys[start - 1] == keys[-1]:
+        start -= 1
+    if len(keys) - start < 2:
+        return None
+    return start
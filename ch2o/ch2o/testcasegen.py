@@ -7,6 +7,7 @@ import copy
 import glob
 import os
 import shutil
+import sys
 import types
 
 import numpy as np
@@ -20,7 +21,13 @@ import onnx
 from onnx import numpy_helper
 from onnx import TensorProto
 
-from ch2o.initializer import edit_onnx_protobuf, tensor_from_array
+from ch2o.initializer import edit_onnx_protobuf
+from ch2o.initializer import write_model
+
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))))
+sys.path.append(os.path.join(project_root, 'common'))
+import test_data_writer
 
 # variableを消す
 
@@ -72,37 +79,30 @@ def dump_test_inputs_outputs(inputs, outputs, test_data_dir):
     if not os.path.exists(test_data_dir):
         os.makedirs(test_data_dir)
 
+    write_npy = get_test_args().npy
     for typ, values in [('input', inputs), ('output', outputs)]:
         for i, (value_info, value) in enumerate(values):
             name = value_info.name
             if isinstance(value, list):
-                assert value
-                digits = len(str(len(value)))
-                for j, v in enumerate(value):
-                    filename = os.path.join(
-                        test_data_dir,
-                        '%s_%d_%s.pb' % (typ, i, str(j).zfill(digits)))
-                    tensor = tensor_from_array(v, name)
-                    with open(filename, 'wb') as f:
-                        f.write(tensor.SerializeToString())
+                value = [chainer.cuda.to_cpu(v) for v in value]
+                data_type = test_data_writer.write_test_data(
+                    test_data_dir, typ, i, name, value, write_npy=write_npy)
 
                 value_info.type.CopyFrom(onnx.TypeProto())
                 sequence_type = value_info.type.sequence_type
                 tensor_type = sequence_type.elem_type.tensor_type
-                tensor_type.elem_type = tensor.data_type
+                tensor_type.elem_type = data_type
             else:
-                filename = os.path.join(test_data_dir,
-                                        '%s_%d.pb' % (typ, i))
                 if value is None:
                     if get_test_args().allow_unused_params:
                         continue
                     raise RuntimeError('Unused parameter: %s' % name)
-                tensor = tensor_from_array(value, name)
-                with open(filename, 'wb') as f:
-                    f.write(tensor.SerializeToString())
+                value = chainer.cuda.to_cpu(value)
+                data_type = test_data_writer.write_test_data(
+                    test_data_dir, typ, i, name, value, write_npy=write_npy)
 
                 vi = onnx.helper.make_tensor_value_info(
-                    name, tensor.data_type, tensor.dims)
+                    name, data_type, np.shape(value))
                 value_info.CopyFrom(vi)
 
 
@@ -111,7 +111,8 @@ _seen_subnames = set()
 
 def generate_testcase(model, orig_xs,
                       subname=None, output_dir=None,
-                      backprop=False, use_gpu=False):
+                      backprop=False, use_gpu=False,
+                      loop_chain_list=False, dedup_links=False):
     xs = copy.deepcopy(orig_xs)
     if output_dir is None:
         args = get_test_args()
@@ -140,7 +141,9 @@ def generate_testcase(model, orig_xs,
         return model
 
     # さらの状態からonnxのmodをつくる
-    onnxmod = compile_model(get_model(), xs)
+    onnxmod = compile_model(get_model(), xs,
+                            dedup_links=dedup_links,
+                            loop_chain_list=loop_chain_list)
     all_input_tensors = onnxmod.graph.input
     output_tensors = onnxmod.graph.output
 
@@ -165,11 +168,9 @@ def generate_testcase(model, orig_xs,
         ys.backward()
 
     # 1回の実行をもとにinitialize
-    edit_onnx_protobuf(onnxmod, model)
+    initializers = edit_onnx_protobuf(onnxmod, model, reference_params=True)
 
-    initializer_names = set()
-    for initializer in onnxmod.graph.initializer:
-        initializer_names.add(initializer.name)
+    initializer_names = set(name for name, _ in initializers)
     input_tensors = []
     for input_tensor in all_input_tensors:
         if input_tensor.name not in initializer_names:
@@ -195,4 +196,4 @@ def generate_testcase(model, orig_xs,
         os.path.join(output_dir, 'test_data_set_0'))
 
     with open(os.path.join(output_dir, 'model.onnx'), 'wb') as fp:
-        fp.write(onnxmod.SerializeToString())
+        write_model(fp, onnxmod, initializers)
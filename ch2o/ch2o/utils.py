@@ -169,3 +169,27 @@ def make_graph(nodes, graph_name, inputs, outputs):
 
     graph_name = gen_graph_name(graph_name)
     return helper.make_graph(nodes, graph_name, inputs, outputs_fixed)
+
+
+def subgraphs(node):
+    for attr in node.attribute:
+        if attr.HasField('g'):
+            yield attr.g
+        for g in attr.graphs:
+            yield g
+
+
+def rename_graph(graph, rename):
+    for vi in list(graph.input) + list(graph.output) + list(graph.value_info):
+        vi.name = rename(vi.name)
+    for node in graph.node:
+        rename_node(node, rename)
+
+
+def rename_node(node, rename):
+    for i, name in enumerate(node.input):
+        node.input[i] = rename(name)
+    for i, name in enumerate(node.output):
+        node.output[i] = rename(name)
+    for g in subgraphs(node):
+        rename_graph(g, rename)
@@ -625,9 +625,34 @@ def gen(output, recipe, bwd=True, use_gpu=False):
                            [xs, ilens, ys], backprop=bwd, use_gpu=use_gpu)
 
 
+def recompile(recipe):
+    # Measures how long `compile_model` takes when a layer of the
+    # decoder is changed after the first compilation.
+    (idim, odim, args), (xs, ilens, ys) = recipe
+    templates = ch2o.LinkTemplates()
+
+    def compile_with(label, args, link_templates):
+        model = E2E(idim, odim, args)
+        hits = templates.num_hits
+        st = time.time()
+        ch2o.compile_model(model, [xs, ilens, ys],
+                           link_templates=link_templates)
+        elapsed = (time.time() - st) * 1000
+        print('%s: %s msec (%d links reused)' %
+              (label, elapsed, templates.num_hits - hits))
+
+    compile_with('Initial', args, templates)
+    compile_with('Unchanged', args, templates)
+    changed = Args(dict(vars(args)))
+    changed.dunits = args.dunits + 1
+    compile_with('Decoder changed (no cache)', changed, None)
+    compile_with('Decoder changed', changed, templates)
+
+
 def dispatch():
     parser = argparse.ArgumentParser(description='EspNet E2E')
     parser.add_argument('--run', action='store_true')
+    parser.add_argument('--recompile', action='store_true')
     parser.add_argument('--gen', default=None)
     parser.add_argument('--recipe', default='test', type=str)
     parser.add_argument('--forward', action='store_true')
@@ -651,6 +676,8 @@ def dispatch():
         gen(args.gen, recipe, backward, args.gpu)
     elif args.run:
         run(recipe, args.iterations, backward, is_gpu=args.gpu)
+    elif args.recompile:
+        recompile(recipe)
     else:
         raise
 
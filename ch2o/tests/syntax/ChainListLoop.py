@@ -0,0 +1,77 @@
+# coding: utf-8
+
+import chainer
+import chainer.functions as F
+import chainer.links as L
+
+# Network definition
+
+
+class Layer(chainer.Chain):
+    def __init__(self, n_units):
+        super(Layer, self).__init__()
+        with self.init_scope():
+            self.l = L.Linear(n_units, n_units)
+
+    def forward(self, x):
+        return F.tanh(self.l(x)) + x
+
+
+class Layers(chainer.ChainList):
+    def __init__(self, n_layers, n_units):
+        super(Layers, self).__init__()
+        for i in range(n_layers):
+            self.add_link(Layer(n_units))
+
+    def forward(self, x):
+        for f in self.children():
+            x = f(x)
+        return x
+
+
+class A(chainer.Chain):
+
+    def __init__(self):
+        super(A, self).__init__()
+        with self.init_scope():
+            self.layers = Layers(6, 4)
+
+    def forward(self, x):
+        return self.layers(x)
+
+
+class ProjectedLayers(Layers):
+    def __init__(self, n_layers, n_in, n_units):
+        super(Layers, self).__init__()
+        # Only the layers after the first one are identical.
+        self.add_link(L.Linear(n_in, n_units))
+        for i in range(n_layers):
+            self.add_link(Layer(n_units))
+
+
+class B(chainer.Chain):
+
+    def __init__(self):
+        super(B, self).__init__()
+        with self.init_scope():
+            self.layers = ProjectedLayers(3, 3, 4)
+
+    def forward(self, x):
+        return self.layers(x)
+
+
+# ======================================
+
+import ch2o
+
+
+if __name__ == '__main__':
+    import numpy as np
+    np.random.seed(314)
+
+    x = np.random.rand(3, 4).astype(np.float32)
+    ch2o.generate_testcase(A, [x])
+    ch2o.generate_testcase(A, [x], subname='loop', loop_chain_list=True)
+
+    x = np.random.rand(3, 3).astype(np.float32)
+    ch2o.generate_testcase(B, [x], subname='suffix', loop_chain_list=True)
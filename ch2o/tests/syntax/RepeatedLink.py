@@ -0,0 +1,62 @@
+# coding: utf-8
+
+import chainer
+import chainer.functions as F
+import chainer.links as L
+
+# Network definition
+
+
+class Block(chainer.Chain):
+    def __init__(self, n_units, p):
+        super(Block, self).__init__()
+        with self.init_scope():
+            self.l1 = L.Linear(n_units, n_units)
+            self.l2 = L.Linear(n_units, n_units)
+        self.p = p
+
+    def forward(self, x):
+        h = F.relu(self.l1(x))
+        return self.l2(h) * self.p + x
+
+
+class Blocks(chainer.ChainList):
+    def __init__(self, n_layers, n_units):
+        super(Blocks, self).__init__()
+        for i in range(n_layers):
+            self.add_link(Block(n_units, 0.5))
+        # A block with a different attribute must not share the
+        # translation with others.
+        self.add_link(Block(n_units, 2.0))
+
+    def forward(self, x):
+        for f in self.children():
+            x = f(x)
+        return x
+
+
+class A(chainer.Chain):
+
+    def __init__(self):
+        super(A, self).__init__()
+        with self.init_scope():
+            self.blocks = Blocks(3, 4)
+            self.last = Block(4, 0.5)
+
+    def forward(self, x, y):
+        x = self.blocks(x)
+        return self.last(x) + y
+
+
+# ======================================
+
+import ch2o
+
+
+if __name__ == '__main__':
+    import numpy as np
+    np.random.seed(314)
+
+    x = np.random.rand(3, 4).astype(np.float32)
+    y = np.random.rand(3, 4).astype(np.float32)
+    ch2o.generate_testcase(A, [x, y], dedup_links=True)
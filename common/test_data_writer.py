@@ -0,0 +1,115 @@
+"""Writes test data of ONNX's backend tests with bounded memory.
+
+`numpy_helper.from_array` copies a whole array into a TensorProto
+before it is serialized. The functions here write the header of a
+TensorProto and then the array itself as `raw_data`, so no copy is
+made for C-contiguous little-endian arrays and tensors are written to
+disk one by one.
+"""
+
+import os
+
+import numpy as np
+import onnx
+from onnx import numpy_helper
+
+
+def _encode_varint(value):
+    ret = bytearray()
+    while True:
+        b = value & 0x7f
+        value >>= 7
+        if value == 0:
+            ret.append(b)
+            return bytes(ret)
+        ret.append(b | 0x80)
+
+
+def _field_header(message_type, field_name, size):
+    number = message_type.DESCRIPTOR.fields_by_name[field_name].number
+    # wire type 2 (length-delimited)
+    return _encode_varint(number << 3 | 2) + _encode_varint(size)
+
+
+def _serialize_raw_tensor(name, array):
+    """Returns the TensorProto of `array` split into the header and data.
+
+    The header is a serialized TensorProto without data followed by the
+    field header of `raw_data`, and the data is a memoryview of `array`.
+    """
+    array = np.require(array, requirements='C')
+    if array.dtype.byteorder == '>':
+        array = array.astype(array.dtype.newbyteorder('<'))
+
+    tensor = onnx.TensorProto()
+    tensor.name = name
+    tensor.data_type = onnx.mapping.NP_TYPE_TO_TENSOR_TYPE[array.dtype]
+    tensor.dims.extend(array.shape)
+
+    data = memoryview(array.reshape(-1)).cast('B')
+    header = (tensor.SerializeToString() +
+              _field_header(onnx.TensorProto, 'raw_data', data.nbytes))
+    return tensor.data_type, header, data
+
+
+def write_tensor(f, name, array):
+    """Writes `array` as a serialized TensorProto to a file object.
+
+    Returns the data type of the TensorProto.
+    """
+    array = np.asarray(array)
+    if array.dtype.kind in 'OSU':
+        tensor = numpy_helper.from_array(array, name)
+        f.write(tensor.SerializeToString())
+        return tensor.data_type
+
+    data_type, header, data = _serialize_raw_tensor(name, array)
+    f.write(header)
+    f.write(data)
+    return data_type
+
+
+def write_initializer(f, name, array):
+    """Appends `array` as an initializer to a serialized ModelProto in `f`.
+
+    Protobuf merges message fields which appear more than once, so the
+    file is parsed as a ModelProto whose graph has the initializer.
+    """
+    _, header, data = _serialize_raw_tensor(name, np.asarray(array))
+    tensor_size = len(header) + data.nbytes
+    initializer_header = _field_header(onnx.GraphProto, 'initializer',
+                                       tensor_size)
+    f.write(_field_header(onnx.ModelProto, 'graph',
+                          len(initializer_header) + tensor_size))
+    f.write(initializer_header)
+    f.write(header)
+    f.write(data)
+
+
+def write_test_data(test_data_dir, typ, index, name, value, write_npy=False):
+    """Writes an input or an output of a test case.
+
+    A list is written as a sequence, i.e., `<typ>_<index>_<j>.pb` for
+    each element. With `write_npy`, `.npy` files which can be
+    memory-mapped are written next to `.pb` files. Returns the data
+    type of the (last) tensor.
+    """
+    if isinstance(value, list):
+        assert value
+        digits = len(str(len(value)))
+        basenames = ['%s_%d_%s' % (typ, index, str(j).zfill(digits))
+                     for j in range(len(value))]
+        values = value
+    else:
+        basenames = ['%s_%d' % (typ, index)]
+        values = [value]
+
+    data_type = None
+    for basename, v in zip(basenames, values):
+        filename = os.path.join(test_data_dir, basename)
+        with open(filename + '.pb', 'wb') as f:
+            data_type = write_tensor(f, name, v)
+        if write_npy:
+            # run_onnx maps .npy files only in C order.
+            np.save(filename + '.npy', np.require(v, requirements='C'))
+    return data_type
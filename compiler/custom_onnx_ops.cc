@@ -478,6 +478,10 @@ public:
 namespace chainer_compiler {
 
 void RegisterCustomOnnxOperatorSetSchema() {
+    // run_onnx may run many tests in a process.
+    static bool registered = false;
+    if (registered) return;
+    registered = true;
     ONNX_NAMESPACE::RegisterOpSetSchema<ONNX_NAMESPACE::Custom_OpSet_Onnx_ver9>();
 }
 
@@ -43,6 +43,7 @@ bool g_dump_after_fusion;
 bool g_dump_after_scheduling;
 bool g_dump_subgraphs;
 
+bool g_plan_memory;
 std::string g_computation_order;
 int g_chen_budget;
 
@@ -67,6 +67,9 @@ extern bool g_dump_after_fusion;
 extern bool g_dump_after_scheduling;
 extern bool g_dump_subgraphs;
 
+// Plan offsets of arrays in a single arena in XCVM programs.
+extern bool g_plan_memory;
+
 // The policy of computation order.
 extern std::string g_computation_order;
 extern int g_chen_budget;
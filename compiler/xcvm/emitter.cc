@@ -16,6 +16,7 @@
 #include <compiler/passes.h>
 #include <compiler/tvm/compiler.h>
 #include <compiler/value.h>
+#include <compiler/xcvm/memory_planner.h>
 #include <runtime/xcvm.pb.h>
 
 namespace chainer_compiler {
@@ -1228,6 +1229,11 @@ void Emit(const Model& model, XCProgramProto* program, bool dump_value_names) {
 void Emit(const Graph& graph, XCProgramProto* program, bool dump_value_names) {
     XCVMEmitter emitter;
     emitter.EmitModel(graph, program, dump_value_names);
+    if (g_plan_memory) {
+        PlannedMemoryUsage usage = PlanMemory(program);
+        CLOG() << "Planned memory usage: arena=" << usage.arena_size / 1000 / 1000 << "MB peak=" << usage.peak / 1000 / 1000
+               << "MB unknowns=" << usage.num_unknowns << "/" << usage.num_values << " views=" << usage.num_views << std::endl;
+    }
 }
 
 void Emit(const Model& model, std::ostream& out, bool dump_value_names) {
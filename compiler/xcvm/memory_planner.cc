@@ -0,0 +1,294 @@
+#include "compiler/xcvm/memory_planner.h"
+
+#include <algorithm>
+#include <map>
+#include <set>
+#include <vector>
+
+#include <common/log.h>
+#include <compiler/dtype.h>
+#include <runtime/xcvm.pb.h>
+
+namespace chainer_compiler {
+namespace xcvm {
+namespace {
+
+using runtime::XCInstructionProto;
+using runtime::XCProgramProto;
+using runtime::XCTypeProto;
+using runtime::XCValueProto;
+
+// Same as the allocation unit of ChainerX's CUDA memory pool.
+const int64_t kAlignment = 512;
+
+struct Interval {
+    int pc;
+    int output_index;
+    int64_t size;
+    // The lifetime in the program, [begin, end).
+    int begin;
+    int end;
+    int64_t offset;
+};
+
+int64_t GetAlignedNBytes(const XCTypeProto& type) {
+    if (type.dtype() <= 0) return -1;
+    int64_t size = Dtype(static_cast<Dtype::DataType>(type.dtype())).SizeOf();
+    for (int d : type.shape()) {
+        if (d < 0) return -1;
+        size *= d;
+    }
+    return (size + kAlignment - 1) / kAlignment * kAlignment;
+}
+
+int GetJumpTarget(const XCInstructionProto& inst) {
+    switch (inst.op()) {
+        case XCInstructionProto::Jmp:
+            return inst.inputs(0).i();
+        case XCInstructionProto::JmpTrue:
+        case XCInstructionProto::JmpFalse:
+            return inst.inputs(1).i();
+        default:
+            return -1;
+    }
+}
+
+// Returns true if outputs of `op` may be views of its inputs.
+bool IsViewOp(XCInstructionProto::Op op) {
+    switch (op) {
+        case XCInstructionProto::Identity:
+        case XCInstructionProto::Reshape:
+        case XCInstructionProto::Expand:
+        case XCInstructionProto::Squeeze:
+        case XCInstructionProto::Unsqueeze:
+        case XCInstructionProto::Slice:
+        case XCInstructionProto::DynamicSlice:
+        case XCInstructionProto::GetItem:
+        case XCInstructionProto::Split:
+        case XCInstructionProto::Transpose:
+        case XCInstructionProto::SequenceLookup:
+        case XCInstructionProto::GenericGetItem:
+        case XCInstructionProto::GenericGetSlice:
+            return true;
+        default:
+            return false;
+    }
+}
+
+// Returns IDs of variables (arrays, sequences, and opaques) used by `inst`.
+std::vector<int> GetInputIds(const XCInstructionProto& inst) {
+    std::vector<int> ids;
+    for (const XCValueProto& value : inst.inputs()) {
+        switch (value.type()) {
+            case XCValueProto::ARRAY:
+            case XCValueProto::OPTIONAL_ARRAY:
+                ids.push_back(value.array());
+                break;
+            case XCValueProto::ARRAY_LIST:
+                ids.insert(ids.end(), value.array_list().begin(), value.array_list().end());
+                break;
+            case XCValueProto::SEQUENCE:
+                ids.push_back(value.sequence());
+                break;
+            case XCValueProto::OPAQUE:
+                ids.push_back(value.opaque());
+                break;
+            default:
+                break;
+        }
+    }
+    ids.erase(std::remove_if(ids.begin(), ids.end(), [](int id) { return id <= 0; }), ids.end());
+    return ids;
+}
+
+// Computes lifetimes of planned arrays. A variable which is not
+// planned (a view, an array of an unknown shape, a sequence, or an
+// opaque) may refer to planned arrays used to compute it, so these
+// arrays live until all variables which may refer to them are freed.
+std::vector<Interval> ComputeIntervals(const XCProgramProto& program, PlannedMemoryUsage* usage) {
+    const int num_insts = program.instructions_size();
+    std::vector<Interval> intervals;
+    // The number of live variables which may refer to each interval.
+    std::vector<int> num_refs;
+    std::vector<bool> escaped;
+    std::map<int, std::set<size_t>> refs;
+    std::vector<std::pair<int, int>> loops;
+
+    auto release = [&](const std::set<size_t>& indices, int pc) {
+        for (size_t index : indices) {
+            if (--num_refs[index] == 0 && !escaped[index]) intervals[index].end = pc;
+        }
+    };
+
+    // Sets the intervals referred by `id`. The old ones are released
+    // after the new ones are acquired as they may overlap.
+    auto assign = [&](int id, const std::set<size_t>& indices, int pc) {
+        for (size_t index : indices) ++num_refs[index];
+        std::set<size_t> old;
+        std::swap(old, refs[id]);
+        refs[id] = indices;
+        release(old, pc);
+    };
+
+    auto collect = [&](const std::vector<int>& ids) {
+        std::set<size_t> indices;
+        for (int id : ids) {
+            auto found = refs.find(id);
+            if (found != refs.end()) indices.insert(found->second.begin(), found->second.end());
+        }
+        return indices;
+    };
+
+    for (int pc = 0; pc < num_insts; ++pc) {
+        const XCInstructionProto& inst = program.instructions(pc);
+        if (inst.op() == XCInstructionProto::Free) {
+            const int id = inst.inputs(0).array();
+            auto found = refs.find(id);
+            if (found == refs.end()) continue;
+            release(found->second, pc);
+            refs.erase(found);
+            continue;
+        }
+
+        const int target = GetJumpTarget(inst);
+        if (target >= 0 && target <= pc) {
+            loops.emplace_back(std::max(target - 1, 0), pc + 1);
+        }
+
+        // Inputs of the program are owned by the caller.
+        if (inst.op() == XCInstructionProto::In) continue;
+
+        // Outputs of the program are owned by the caller after the run.
+        if (inst.op() == XCInstructionProto::Out) {
+            for (size_t index : collect(GetInputIds(inst))) {
+                escaped[index] = true;
+                intervals[index].end = num_insts;
+            }
+            continue;
+        }
+
+        const std::set<size_t> input_refs = collect(GetInputIds(inst));
+
+        // The sequence holds the appended array.
+        if (inst.op() == XCInstructionProto::SequenceAppend) {
+            const int id = inst.inputs(0).sequence();
+            std::set<size_t> indices = refs[id];
+            indices.insert(input_refs.begin(), input_refs.end());
+            assign(id, indices, pc + 1);
+            continue;
+        }
+
+        CHECK_EQ(inst.outputs_size(), inst.output_types_size()) << inst.DebugString();
+        for (int i = 0; i < inst.outputs_size(); ++i) {
+            const int id = inst.outputs(i);
+            if (id <= 0) continue;
+            usage->num_values++;
+            const int64_t size = GetAlignedNBytes(inst.output_types(i));
+            if (IsViewOp(inst.op())) {
+                usage->num_views++;
+            } else if (size < 0) {
+                usage->num_unknowns++;
+            } else {
+                num_refs.push_back(0);
+                escaped.push_back(false);
+                intervals.push_back(Interval{pc, i, size, pc, num_insts, -1});
+                // An overwritten array may be used by this instruction.
+                assign(id, {intervals.size() - 1}, pc + 1);
+                continue;
+            }
+            assign(id, input_refs, pc + 1);
+        }
+    }
+
+    // Arrays used in a loop must live during the whole loop.
+    bool changed = true;
+    while (changed) {
+        changed = false;
+        for (const auto& loop : loops) {
+            for (Interval& interval : intervals) {
+                if (interval.end <= loop.first || loop.second <= interval.begin) continue;
+                if (loop.first < interval.begin || interval.end < loop.second) {
+                    interval.begin = std::min(interval.begin, loop.first);
+                    interval.end = std::max(interval.end, loop.second);
+                    changed = true;
+                }
+            }
+        }
+    }
+    return intervals;
+}
+
+int64_t ComputePeak(const std::vector<Interval>& intervals) {
+    std::map<int, int64_t> diffs;
+    for (const Interval& interval : intervals) {
+        diffs[interval.begin] += interval.size;
+        diffs[interval.end] -= interval.size;
+    }
+    int64_t peak = 0;
+    int64_t mem = 0;
+    for (const auto& p : diffs) {
+        mem += p.second;
+        peak = std::max(peak, mem);
+    }
+    return peak;
+}
+
+// Places larger arrays first. Each array goes to the smallest gap
+// among arrays which are already placed and alive at the same time.
+int64_t AssignOffsets(std::vector<Interval>* intervals) {
+    std::vector<Interval*> order;
+    for (Interval& interval : *intervals) order.push_back(&interval);
+    std::stable_sort(order.begin(), order.end(), [](const Interval* a, const Interval* b) { return a->size > b->size; });
+
+    int64_t arena_size = 0;
+    std::vector<const Interval*> placed;
+    for (Interval* interval : order) {
+        std::vector<const Interval*> overlapped;
+        for (const Interval* p : placed) {
+            if (p->begin < interval->end && interval->begin < p->end) overlapped.push_back(p);
+        }
+        std::sort(overlapped.begin(), overlapped.end(), [](const Interval* a, const Interval* b) { return a->offset < b->offset; });
+
+        int64_t best_offset = -1;
+        int64_t best_gap = -1;
+        int64_t offset = 0;
+        for (const Interval* p : overlapped) {
+            const int64_t gap = p->offset - offset;
+            if (gap >= interval->size && (best_gap < 0 || gap < best_gap)) {
+                best_offset = offset;
+                best_gap = gap;
+            }
+            offset = std::max(offset, p->offset + p->size);
+        }
+        if (best_offset < 0) best_offset = offset;
+
+        interval->offset = best_offset;
+        arena_size = std::max(arena_size, best_offset + interval->size);
+        placed.push_back(interval);
+    }
+    return arena_size;
+}
+
+}  // namespace
+
+PlannedMemoryUsage PlanMemory(XCProgramProto* program) {
+    PlannedMemoryUsage usage{};
+    std::vector<Interval> intervals = ComputeIntervals(*program, &usage);
+    usage.peak = ComputePeak(intervals);
+    usage.arena_size = AssignOffsets(&intervals);
+
+    for (XCInstructionProto& inst : *program->mutable_instructions()) {
+        inst.clear_output_offsets();
+        for (int i = 0; i < inst.outputs_size(); ++i) {
+            inst.add_output_offsets(-1);
+        }
+    }
+    for (const Interval& interval : intervals) {
+        program->mutable_instructions(interval.pc)->set_output_offsets(interval.output_index, interval.offset);
+    }
+    program->set_arena_size(usage.arena_size);
+    return usage;
+}
+
+}  // namespace xcvm
+}  // namespace chainer_compiler
@@ -0,0 +1,36 @@
+#pragma once
+
+#include <stdint.h>
+
+namespace chainer_compiler {
+namespace runtime {
+class XCProgramProto;
+}  // namespace runtime
+
+namespace xcvm {
+
+struct PlannedMemoryUsage {
+    // The size of the arena which holds all planned arrays.
+    int64_t arena_size;
+    // The maximum total size of arrays alive at the same time.
+    int64_t peak;
+    int num_values;
+    // The number of outputs of ops which may return views.
+    int num_views;
+    // The number of outputs whose sizes are unknown.
+    int num_unknowns;
+};
+
+// Assigns an offset in a single arena to each output array of
+// `program` whose shape is statically known. Two arrays share a
+// region of the arena only when their lifetimes do not overlap.
+// Offsets are stored in `output_offsets` of instructions (-1 for
+// arrays which are not planned) and the size of the arena is stored
+// in `arena_size` of `program`. Views, arrays of unknown shapes,
+// sequences, and opaques are not planned, but planned arrays live as
+// long as such values computed from them since they may share the
+// memory.
+PlannedMemoryUsage PlanMemory(runtime::XCProgramProto* program);
+
+}  // namespace xcvm
+}  // namespace chainer_compiler
@@ -0,0 +1,183 @@
+#include <vector>
+
+#include <gtest/gtest.h>
+
+#include <compiler/dtype.h>
+#include <compiler/xcvm/memory_planner.h>
+#include <runtime/xcvm.pb.h>
+
+namespace chainer_compiler {
+namespace xcvm {
+namespace {
+
+using runtime::XCInstructionProto;
+using runtime::XCProgramProto;
+using runtime::XCValueProto;
+
+// Adds an instruction whose output is a float32 array of `size`
+// elements (or unknown when `size` is negative).
+void AddOp(XCProgramProto* program, XCInstructionProto::Op op, int input, int output, int size) {
+    XCInstructionProto* inst = program->add_instructions();
+    inst->set_op(op);
+    XCValueProto* value = inst->add_inputs();
+    value->set_type(XCValueProto::ARRAY);
+    value->set_array(input);
+    inst->add_outputs(output);
+    runtime::XCTypeProto* type = inst->add_output_types();
+    if (size >= 0) {
+        type->set_dtype(Dtype::kFloat32);
+        type->add_shape(size);
+    }
+}
+
+void AddFree(XCProgramProto* program, int id) {
+    XCInstructionProto* inst = program->add_instructions();
+    inst->set_op(XCInstructionProto::Free);
+    XCValueProto* value = inst->add_inputs();
+    value->set_type(XCValueProto::ARRAY);
+    value->set_array(id);
+}
+
+void AddOut(XCProgramProto* program, int id) {
+    XCInstructionProto* inst = program->add_instructions();
+    inst->set_op(XCInstructionProto::Out);
+    XCValueProto* value = inst->add_inputs();
+    value->set_type(XCValueProto::STRING);
+    value->set_s("out");
+    value = inst->add_inputs();
+    value->set_type(XCValueProto::ARRAY);
+    value->set_array(id);
+}
+
+void AddJmpTrue(XCProgramProto* program, int cond, int pc) {
+    XCInstructionProto* inst = program->add_instructions();
+    inst->set_op(XCInstructionProto::JmpTrue);
+    XCValueProto* value = inst->add_inputs();
+    value->set_type(XCValueProto::ARRAY);
+    value->set_array(cond);
+    value = inst->add_inputs();
+    value->set_type(XCValueProto::INT);
+    value->set_i(pc);
+}
+
+TEST(MemoryPlannerTest, Sequential) {
+    XCProgramProto program;
+    AddOp(&program, XCInstructionProto::Relu, 1, 2, 256);
+    AddOp(&program, XCInstructionProto::Relu, 2, 3, 256);
+    AddFree(&program, 2);
+    AddOp(&program, XCInstructionProto::Relu, 3, 4, 256);
+    AddFree(&program, 3);
+    AddOp(&program, XCInstructionProto::Relu, 4, 5, -1);
+
+    PlannedMemoryUsage usage = PlanMemory(&program);
+    EXPECT_EQ(2048, usage.arena_size);
+    EXPECT_EQ(2048, usage.peak);
+    EXPECT_EQ(4, usage.num_values);
+    EXPECT_EQ(1, usage.num_unknowns);
+    EXPECT_EQ(2048, program.arena_size());
+
+    const int64_t offset2 = program.instructions(0).output_offsets(0);
+    const int64_t offset3 = program.instructions(1).output_offsets(0);
+    const int64_t offset4 = program.instructions(3).output_offsets(0);
+    EXPECT_NE(offset2, offset3);
+    // The region of $2 is reused after it is freed.
+    EXPECT_EQ(offset2, offset4);
+    EXPECT_EQ(-1, program.instructions(5).output_offsets(0));
+}
+
+TEST(MemoryPlannerTest, NoOverlap) {
+    const int kNumValues = 30;
+    XCProgramProto program;
+    std::vector<int> def_pcs, free_pcs, sizes;
+    for (int i = 0; i < kNumValues; ++i) {
+        def_pcs.push_back(program.instructions_size());
+        sizes.push_back((i * 37 % 7 + 1) * 128 * 4);
+        AddOp(&program, XCInstructionProto::Relu, 1, i + 2, sizes.back() / 4);
+        // Frees every four values at once.
+        if (i % 4 == 3) {
+            for (int j = i - 3; j <= i; ++j) {
+                free_pcs.push_back(program.instructions_size());
+                AddFree(&program, j + 2);
+            }
+        }
+    }
+    while (free_pcs.size() < static_cast<size_t>(kNumValues)) free_pcs.push_back(program.instructions_size());
+
+    PlannedMemoryUsage usage = PlanMemory(&program);
+    EXPECT_LE(usage.peak, usage.arena_size);
+    for (int i = 0; i < kNumValues; ++i) {
+        const int64_t offset_i = program.instructions(def_pcs[i]).output_offsets(0);
+        EXPECT_LE(offset_i + sizes[i], usage.arena_size);
+        for (int j = i + 1; j < kNumValues; ++j) {
+            if (free_pcs[i] <= def_pcs[j] || free_pcs[j] <= def_pcs[i]) continue;
+            const int64_t offset_j = program.instructions(def_pcs[j]).output_offsets(0);
+            EXPECT_TRUE(offset_i + sizes[i] <= offset_j || offset_j + sizes[j] <= offset_i) << i << " vs " << j;
+        }
+    }
+}
+
+TEST(MemoryPlannerTest, Loop) {
+    XCProgramProto program;
+    AddOp(&program, XCInstructionProto::Relu, 1, 2, 256);
+    AddOp(&program, XCInstructionProto::Relu, 2, 3, 256);
+    AddFree(&program, 3);
+    // $4 is defined after $3 is freed but they coexist in the loop.
+    AddOp(&program, XCInstructionProto::Relu, 2, 4, 256);
+    AddJmpTrue(&program, 2, 1);
+
+    PlanMemory(&program);
+    EXPECT_NE(program.instructions(1).output_offsets(0), program.instructions(3).output_offsets(0));
+}
+
+TEST(MemoryPlannerTest, View) {
+    XCProgramProto program;
+    AddOp(&program, XCInstructionProto::Relu, 1, 2, 256);
+    AddOp(&program, XCInstructionProto::Reshape, 2, 3, 256);
+    AddOp(&program, XCInstructionProto::Transpose, 3, 4, 256);
+    AddFree(&program, 2);
+    AddFree(&program, 3);
+    // $4 is a view of $2 so $5 cannot use the region of $2.
+    AddOp(&program, XCInstructionProto::Relu, 1, 5, 256);
+    AddFree(&program, 4);
+    AddOp(&program, XCInstructionProto::Relu, 1, 6, 256);
+
+    PlannedMemoryUsage usage = PlanMemory(&program);
+    EXPECT_EQ(2, usage.num_views);
+    EXPECT_EQ(-1, program.instructions(1).output_offsets(0));
+    EXPECT_EQ(-1, program.instructions(2).output_offsets(0));
+    const int64_t offset2 = program.instructions(0).output_offsets(0);
+    const int64_t offset5 = program.instructions(5).output_offsets(0);
+    const int64_t offset6 = program.instructions(7).output_offsets(0);
+    EXPECT_NE(offset2, offset5);
+    EXPECT_EQ(offset2, offset6);
+}
+
+TEST(MemoryPlannerTest, Unknown) {
+    XCProgramProto program;
+    AddOp(&program, XCInstructionProto::Relu, 1, 2, 256);
+    // $3 may share the memory with $2 as its shape is unknown.
+    AddOp(&program, XCInstructionProto::Dropout, 2, 3, -1);
+    AddFree(&program, 2);
+    AddOp(&program, XCInstructionProto::Relu, 1, 4, 256);
+
+    PlanMemory(&program);
+    EXPECT_NE(program.instructions(0).output_offsets(0), program.instructions(3).output_offsets(0));
+}
+
+TEST(MemoryPlannerTest, Out) {
+    XCProgramProto program;
+    AddOp(&program, XCInstructionProto::Relu, 1, 2, 256);
+    AddOp(&program, XCInstructionProto::Reshape, 2, 3, 256);
+    AddOut(&program, 3);
+    AddFree(&program, 2);
+    AddFree(&program, 3);
+    // The caller owns $3 after the run.
+    AddOp(&program, XCInstructionProto::Relu, 1, 4, 256);
+
+    PlanMemory(&program);
+    EXPECT_NE(program.instructions(0).output_offsets(0), program.instructions(5).output_offsets(0));
+}
+
+}  // namespace
+}  // namespace xcvm
+}  // namespace chainer_compiler
@@ -15,23 +15,37 @@ import elichika.parser.nodes as nodes
 import elichika.parser.functions as functions
 import elichika.parser.functions_builtin as functions_builtin
 import elichika.parser.utils as utils
+import elichika.parser.pruning as pruning
 
 import numpy as np
 import collections
+import os
+import sys
 
 import elichika.onnx_converters as oc
 import elichika.links_builtin as lb
 import elichika.functions_builtin as fb
 
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))))
+sys.path.append(os.path.join(project_root, 'common'))
+import test_data_writer
+
 
 class ONNXModel:
     def __init__(self):
         self.model = None
         self.inputs = []
         self.outputs = []
+        # parameters which are not stored in model (name -> ndarray)
+        self.params = collections.OrderedDict()
 
 
-def compile_model(model, inputs) -> 'ONNXModel':
+def compile_model(model, inputs, reference_params=False) -> 'ONNXModel':
+    '''
+    if reference_params is true, parameters of the model are not copied into
+    ModelProto and are stored in ONNXModel.params. they are written by save_model.
+    '''
 
     oc.chainer_f_converter.clear()
     oc.chainer_l_converter.clear()
@@ -67,14 +81,22 @@ def compile_model(model, inputs) -> 'ONNXModel':
     oc.node2onnx_parameter.clear()
     oc.value2onnx_parameter.clear()
 
-    inputs_, outputs_, graph_ = core.convert_model(model, inputs)
+    try:
+        inputs_, outputs_, graph_ = core.convert_model(model, inputs)
+    finally:
+        # parsed ASTs and recorded calls are shared only while a model is converted
+        functions.parsed_functions.clear()
+        functions.recorded_calls.clear()
 
     if graph_ is None:
         return None
 
+    # remove values which do not reach outputs
+    pruning.prune_graph(graph_)
+
     oc.preprocess(graph_, True)
 
-    generator = oc.ONNXGenerator()
+    generator = oc.ONNXGenerator(reference_params)
     model = generator.generate_model(
         graph_.input_values, graph_.output_values, graph_, model)
 
@@ -84,10 +106,22 @@ def compile_model(model, inputs) -> 'ONNXModel':
     onnx_model.model = model
     onnx_model.inputs = graph_.input_values
     onnx_model.outputs = graph_.output_values
+    onnx_model.params = generator.get_params()
     return onnx_model
 
 
-def save_model(path: 'str', model: 'ModelProto'):
+def save_model(path: 'str', model):
+    '''
+    model is ModelProto or ONNXModel.
+    parameters of ONNXModel are written one by one without copying into TensorProto.
+    '''
+    if isinstance(model, ONNXModel):
+        with open(path, "wb") as f:
+            f.write(model.model.SerializeToString())
+            for name, param in model.params.items():
+                test_data_writer.write_initializer(f, name, param)
+        return
+
     with open(path, "wb") as f:
         f.write(model.SerializeToString())
 
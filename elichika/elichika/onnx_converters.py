@@ -35,7 +35,44 @@ def get_onnx_dtype(dtype):
     return dt
 
 
-assigned_names = []
+class UniqueNames:
+    '''
+    A set of assigned ONNX names
+
+    `generate` returns the first name in `base`, `base_1`, `base_2`, ...
+    which is not assigned yet. The last suffix is remembered for each
+    base name so generating names is linear in the number of names.
+    '''
+
+    def __init__(self):
+        self.names = set()
+        self.last_indexes = {}
+
+    def __contains__(self, name):
+        return name in self.names
+
+    def add(self, name):
+        self.names.add(name)
+
+    def clear(self):
+        self.names.clear()
+        self.last_indexes.clear()
+
+    def generate(self, base_name, first_name=None):
+        name = base_name if first_name is None else first_name
+        if name in self.names:
+            # names are never removed so `base_1` ... `base_{ind}` are used.
+            ind = self.last_indexes.get(base_name, 0)
+            while (name in self.names):
+                ind += 1
+                name = base_name + '_' + str(ind)
+            self.last_indexes[base_name] = ind
+
+        self.names.add(name)
+        return name
+
+
+assigned_names = UniqueNames()
 node2onnx_parameter = {}
 value2onnx_parameter = {}
 
@@ -69,44 +106,18 @@ def generate_onnx_value_name(value: 'values.Value', none_name=''):
     if base_name == '':
         base_name = none_name
 
-    ind = 0
-    name = base_name
-
-    if name == '':
-        name = 'noname'
-
-    while (name in assigned_names):
-        ind += 1
-        name = base_name + '_' + str(ind)
+    if base_name == '':
+        return assigned_names.generate(base_name, 'noname')
 
-    assigned_names.append(name)
-    return name
+    return assigned_names.generate(base_name)
 
 
 def generate_onnx_node_name(node: 'nodes.Node'):
-    base_name = str(node)
-
-    ind = 0
-    name = base_name
-    while (name in assigned_names):
-        ind += 1
-        name = base_name + '_' + str(ind)
-
-    assigned_names.append(name)
-    return name
+    return assigned_names.generate(str(node))
 
 
 def generate_onnx_name(name: 'str'):
-    base_name = str(name)
-
-    ind = 0
-    name = base_name
-    while (name in assigned_names):
-        ind += 1
-        name = base_name + '_' + str(ind)
-
-    assigned_names.append(name)
-    return name
+    return assigned_names.generate(str(name))
 
 
 def assign_onnx_name_to_value(value: 'values.Value', none_name=''):
@@ -138,6 +149,46 @@ def assign_onnx_name(graph: 'graphs.Graph'):
             assign_onnx_name(subgraph)
 
 
+def collect_io_values(graph: 'graphs.Graph', io_values: 'set'):
+    '''
+    collect inputs and outputs of the graph and subgraphs
+    '''
+    io_values.update(graph.input_values)
+    io_values.update(graph.output_values)
+
+    for node in graph.nodes:
+        for subgraph in node.subgraphs:
+            collect_io_values(subgraph, io_values)
+
+
+def get_constant_array(value: 'values.Value'):
+    '''
+    get an array which a constant value contains
+    '''
+    if isinstance(value, values.NumberValue):
+        if value.internal_value is None:
+            # any value
+            if value.dtype is None:
+                return np.array(0)
+            else:
+                return np.array(0, dtype=value.dtype)
+        else:
+            return np.array(value.internal_value)
+
+    if isinstance(value, values.BoolValue):
+        return np.array(value.internal_value)
+
+    if isinstance(value, values.NoneValue):
+        return np.array(False)
+
+    if isinstance(value, values.UnknownValue):
+        return np.array(False)
+
+    print('Warning : Found uknown type {} in new_tensor_with_value. Float is stored.'.format(
+        type(value)))
+    return np.array(0.0, dtype=np.float32)
+
+
 def preprocess(graph: 'graphs.Graph', isMain: 'bool'):
 
     replacing = {}
@@ -295,8 +346,13 @@ def convert_node_call(onnx_graph, node: 'nodes.NodeCall'):
 
 def convert_node_unary_op(onnx_graph, node: 'nodes.NodeUnaryOp'):
 
+    # zero has the same dtype as the operand so that Add and Sub have matching inputs
+    dtype = getattr(node.operand, 'dtype', None)
+    if dtype is None:
+        dtype = np.float
+
     if node.unaryop == nodes.UnaryOpType.UAdd:
-        zero_ = ONNXValue(onnx_graph, np.array(0, dtype=np.float), [
+        zero_ = ONNXValue(onnx_graph, np.array(0, dtype=dtype), [
                           node, '/Zero'], is_constant=True)
         onnx_node = oh.make_node(
             'Add',
@@ -305,7 +361,7 @@ def convert_node_unary_op(onnx_graph, node: 'nodes.NodeUnaryOp'):
         onnx_graph.nodes.append(onnx_node)
 
     if node.unaryop == nodes.UnaryOpType.USub:
-        zero_ = ONNXValue(onnx_graph, np.array(0, dtype=np.float), [
+        zero_ = ONNXValue(onnx_graph, np.array(0, dtype=dtype), [
                           node, '/Zero'], is_constant=True)
         onnx_node = oh.make_node(
             'Sub',
@@ -421,7 +477,7 @@ class ONNXValue:
         elif id(any_value) in onnx_graph.generator.param2name.keys():
             self.np_value = any_value.data
             self.name = onnx_graph.generator.param2name[id(any_value)]
-            self.tensor = onnx_graph.new_tensor_with_np(
+            self.tensor = onnx_graph.new_tensor_with_param(
                 self.np_value, self.name)
 
         elif isinstance(any_value, np.ndarray):
@@ -429,9 +485,8 @@ class ONNXValue:
             self.name = generate_name()
 
             if self.is_constant:
-                tensor = numpy_helper.from_array(any_value, name=self.name)
-                self.onnx_graph.add_node(
-                    'Constant', [], [self.name], self.name, value=tensor)
+                self.name = onnx_graph.generator.new_constant(
+                    any_value, self.name)
             else:
                 self.tensor = onnx_graph.new_tensor_with_np(
                     self.np_value, self.name)
@@ -526,73 +581,117 @@ class ONNXInitrializer:
     def __init__(self):
         self.tensor_value = None
         self.tensor = None
+        # a parameter which is written when the model is saved
+        self.array = None
         self.name = NameError
         self.dt = 0
         self.shape = ()
 
 
 class ONNXGraph:
-    def __init__(self, generator: 'ONNXGenerator', parent: 'ONNXGraph'):
+    def __init__(self, generator: 'ONNXGenerator', parent: 'ONNXGraph', emit_shape=True):
         self.generator = generator
         self.parent = parent
         self.nodes = []
         self.input_tensor = []
         self.output_tensor = []
 
-    def new_empty_tensor(self, dims, dtype, name):
+        # estimated shapes are not emitted in loops because shapes may be changed in each iteration
+        self.emit_shape = emit_shape
+
+        # tensors whose shape is known
+        self.value_info = []
+
+    def new_empty_tensor(self, dims, dtype, name, is_estimated=False):
         '''
         generate a tensor for connecting between nodes
+        dims are emitted as value_info if they are estimated
         '''
-        dt = onnx.mapping.NP_TYPE_TO_TENSOR_TYPE[np.dtype(dtype)]
+        if dtype is None:
+            # the dtype is inferred by the compiler
+            dt = onnx.TensorProto.UNDEFINED
+        else:
+            dt = onnx.mapping.NP_TYPE_TO_TENSOR_TYPE[np.dtype(dtype)]
         tensor = oh.make_tensor_value_info(name, dt, dims)
         self.generator.onnx_tensors[name] = tensor
+        if is_estimated and dims is not None:
+            self.value_info.append(tensor)
         return tensor
 
+    def new_empty_sequence(self, elem_dtype, name):
+        vi = onnx.ValueInfoProto()
+        vi.name = name
+        if elem_dtype is None:
+            vi.type.sequence_type.elem_type.tensor_type.elem_type = onnx.TensorProto.UNDEFINED
+        else:
+            vi.type.sequence_type.elem_type.tensor_type.elem_type = get_onnx_dtype(elem_dtype)
+        self.generator.onnx_tensors[vi.name] = vi
+        return vi
+
+    def estimate_elem_dtype(self, elements):
+        '''
+        estimate a dtype of elements in a sequence. None is returned if it is unknown.
+        '''
+        dtypes = set()
+        for element in elements:
+            if isinstance(element, values.ValueRef):
+                element = element.get_value()
+            if isinstance(element, values.TensorValue) or isinstance(element, values.NumberValue):
+                dtypes.add(element.dtype)
+            else:
+                dtypes.add(None)
+
+        if len(dtypes) == 1:
+            return dtypes.pop()
+        return None
+
     def new_empty_tensor_with_value(self, value):
         '''
         generate a tensor with Value to indicate shape
         it is for inputting and outputting
         '''
 
+        # NumberValue is a scalar
+        scalar_shape = None
+        if self.emit_shape:
+            scalar_shape = []
+
         if isinstance(value, values.TensorValue):
-            dtype = np.float32
-            if value.dtype is not None:
-                dtype = value.dtype
-
-            if len(value.shape) > 0:
-                shape = list(value.shape)
-                shape = [x if x != -1 else 'Undefined' for x in shape]
-                # type estimation is not correct. so shape needs to be undefined.
-                shape = None
-                return self.new_empty_tensor(shape, dtype, value2onnx_parameter[value].onnx_name)
-            else:
-                shape = None
-                return self.new_empty_tensor(shape, dtype, value2onnx_parameter[value].onnx_name)
+            dtype = value.dtype
+
+            shape = None
+            if self.emit_shape and len(value.shape) > 0:
+                # -1 means an unknown dimension
+                shape = [x if x != -1 else None for x in value.shape]
+            return self.new_empty_tensor(shape, dtype, value2onnx_parameter[value].onnx_name, is_estimated=True)
 
         if isinstance(value, values.BoolValue):
+            # it may be a result of comparing tensors
             return self.new_empty_tensor(None, np.bool, value2onnx_parameter[value].onnx_name)
 
+        if isinstance(value, values.NoneValue):
+            # None is passed as a scalar false
+            return self.new_empty_tensor(scalar_shape, np.bool, value2onnx_parameter[value].onnx_name)
+
         if isinstance(value, values.ListValue):
-            vi = onnx.ValueInfoProto()
-            vi.name = value2onnx_parameter[value].onnx_name
-            vi.type.sequence_type.elem_type.tensor_type.elem_type = onnx.TensorProto.FLOAT
-            self.generator.onnx_tensors[vi.name] = vi
-            return vi
+            elements = []
+            if not value.is_any:
+                elements = value.values
+            return self.new_empty_sequence(self.estimate_elem_dtype(elements), value2onnx_parameter[value].onnx_name)
 
         if isinstance(value, values.TupleValue):
-            vi = onnx.ValueInfoProto()
-            vi.name = value2onnx_parameter[value].onnx_name
-            vi.type.sequence_type.elem_type.tensor_type.elem_type = onnx.TensorProto.FLOAT
-            self.generator.onnx_tensors[vi.name] = vi
-            return vi
+            elements = []
+            if value.internal_value is not None:
+                elements = value.internal_value
+            return self.new_empty_sequence(self.estimate_elem_dtype(elements), value2onnx_parameter[value].onnx_name)
 
         if isinstance(value, values.NumberValue):
             if value.dtype is not None:
-                return self.new_empty_tensor(None, value.dtype, value2onnx_parameter[value].onnx_name)
+                return self.new_empty_tensor(scalar_shape, value.dtype, value2onnx_parameter[value].onnx_name, is_estimated=True)
             elif value.internal_value is not None:
                 if isinstance(value.internal_value, int):
                     dtype = np.array(value.internal_value).dtype
-                    return self.new_empty_tensor(None, dtype, value2onnx_parameter[value].onnx_name)
+                    return self.new_empty_tensor(scalar_shape, dtype, value2onnx_parameter[value].onnx_name, is_estimated=True)
                 if isinstance(value.internal_value, float):
 
                     if config.float_restrict:
@@ -600,9 +699,13 @@ class ONNXGraph:
                     else:
                         dtype = np.float32
 
-                    return self.new_empty_tensor(None, dtype, value2onnx_parameter[value].onnx_name)
+                    return self.new_empty_tensor(scalar_shape, dtype, value2onnx_parameter[value].onnx_name, is_estimated=True)
+
+        if isinstance(value, values.RangeValue):
+            # range is translated into ChainerSequenceRange
+            return self.new_empty_sequence(np.int64, value2onnx_parameter[value].onnx_name)
 
-        return self.new_empty_tensor(None, np.float32, value2onnx_parameter[value].onnx_name)
+        return self.new_empty_tensor(None, None, value2onnx_parameter[value].onnx_name)
 
     def new_tensor_with_np(self, ndarray_, name):
         '''
@@ -633,40 +736,43 @@ class ONNXGraph:
 
         return tensor
 
-    def new_tensor_with_value(self, value):
+    def new_tensor_with_param(self, ndarray_, name):
         '''
-        generate a tensor which value
-        it is for constant input
+        generate a tensor for a parameter of a model
+        the parameter is not copied if the generator refers parameters
         '''
-        name = self.get_value_name(value)
+        if not self.generator.reference_params:
+            return self.new_tensor_with_np(ndarray_, name)
 
-        if isinstance(value, values.NumberValue):
-            if value.internal_value is None:
-                # any value
-                if value.dtype is None:
-                    arr = np.array(0)
-                else:
-                    arr = np.array(0, dtype=value.dtype)
-                return self.new_tensor_with_np(arr, name)
-            else:
-                arr = np.array(value.internal_value)
-                return self.new_tensor_with_np(arr, name)
+        if name in self.generator.initializers.keys():
+            return self.generator.initializers[name].tensor_value
 
-        if isinstance(value, values.BoolValue):
-            arr = np.array(value.internal_value)
-            return self.new_tensor_with_np(arr, name)
+        if not config.float_restrict:
+            if ndarray_.dtype == np.float64:
+                ndarray_ = ndarray_.astype(np.float32)
 
-        if isinstance(value, values.NoneValue):
-            arr = np.array(False)
-            return self.new_tensor_with_np(arr, name)
+        dt = onnx.mapping.NP_TYPE_TO_TENSOR_TYPE[np.dtype(ndarray_.dtype)]
+        tensor_value = oh.make_tensor_value_info(name, dt, ndarray_.shape)
 
-        if isinstance(value, values.UnknownValue):
-            arr = np.array(False)
-            return self.new_tensor_with_np(arr, name)
+        initializer = ONNXInitrializer()
+        initializer.name = name
+        initializer.array = ndarray_
+        initializer.tensor_value = tensor_value
+        initializer.dt = dt
+        initializer.shape = ndarray_.shape
 
-        print('Warning : Found uknown type {} in new_tensor_with_value. Float is stored.'.format(
-            type(value)))
-        arr = np.array(0.0, dtype=np.float32)
+        self.generator.initializers[name] = initializer
+        self.generator.onnx_tensors[name] = tensor_value
+
+        return tensor_value
+
+    def new_tensor_with_value(self, value):
+        '''
+        generate a tensor which value
+        it is for constant input
+        '''
+        name = self.get_value_name(value)
+        arr = get_constant_array(value)
         return self.new_tensor_with_np(arr, name)
 
     def add_node(self, optype, inputs, outputs, name, **kwargs):
@@ -730,28 +836,82 @@ class ONNXGraph:
         input_tensor_and_initializer = self.input_tensor.copy()
         initializers = []
 
+        # intermediate values
+        io_names = set([t.name for t in self.input_tensor + self.output_tensor])
+        value_info = [t for t in self.value_info if not t.name in io_names]
+
+        nodes_ = self.nodes
+        if isMain:
+            nodes_ = self.generator.constant_nodes + self.nodes
+
         # add initializers
         if isMain:
             for v in self.generator.initializers.values():
-                initializers.append(v.tensor)
+                if v.tensor is not None:
+                    initializers.append(v.tensor)
 
                 if v.tensor_value in self.input_tensor:
                     continue
 
                 input_tensor_and_initializer.append(v.tensor_value)
 
-        return oh.make_graph(self.nodes, name, input_tensor_and_initializer, self.output_tensor, initializer=initializers)
+        return oh.make_graph(nodes_, name, input_tensor_and_initializer, self.output_tensor, initializer=initializers, value_info=value_info)
 
 
 class ONNXGenerator:
-    def __init__(self):
+    def __init__(self, reference_params=False):
         self.onnx_graphs = []
         self.initializers = {}
         self.onnx_tensors = {}
         self.param2name = {}
 
-    def generate_graph(self, inputs, outputs, graph: 'graphs.Graph', parent: 'ONNXGraph', isMain=False):
-        onnx_graph = ONNXGraph(self, parent)
+        # if it is true, parameters are not stored in ModelProto. see get_params.
+        self.reference_params = reference_params
+
+        # constants shared in the model ((as_initializer, dtype, shape, bytes) -> name)
+        self.constants = {}
+        self.constant_nodes = []
+        self.main_graph = None
+
+        # inputs and outputs of graphs, which need their own names
+        self.io_values = set()
+
+    def new_constant(self, ndarray_, name, as_initializer=False):
+        '''
+        return a name of a constant which has the same dtype, value and shape as ndarray_
+        constants are emitted in the main graph only once, even if they are used in bodies of loops
+        '''
+        key = (as_initializer, ndarray_.dtype.str,
+               ndarray_.shape, ndarray_.tobytes())
+        if key in self.constants.keys():
+            return self.constants[key]
+
+        if as_initializer:
+            self.main_graph.new_tensor_with_np(ndarray_, name)
+        else:
+            tensor = numpy_helper.from_array(ndarray_, name=name)
+            self.constant_nodes.append(
+                oh.make_node('Constant', [], [name], name, value=tensor))
+
+        self.constants[key] = name
+        return name
+
+    def get_params(self):
+        '''
+        return parameters which are referred by the model and are not stored in ModelProto
+        '''
+        params = collections.OrderedDict()
+        for name, initializer in self.initializers.items():
+            if initializer.array is not None:
+                params[name] = initializer.array
+        return params
+
+    def generate_graph(self, inputs, outputs, graph: 'graphs.Graph', parent: 'ONNXGraph', isMain=False, emit_shape=True):
+        onnx_graph = ONNXGraph(self, parent, emit_shape)
+
+        if isMain:
+            self.main_graph = onnx_graph
+            collect_io_values(graph, self.io_values)
 
         def generate_tensors(values_):
             for value_ in values_:
@@ -760,6 +920,23 @@ class ONNXGenerator:
 
                 if value_.generator is not None or not value_.is_all_constant_values():
                     tensor = onnx_graph.new_empty_tensor_with_value(value_)
+                elif not value_ in self.io_values:
+                    # share a constant in the model
+                    name = value2onnx_parameter[value_].onnx_name
+                    if isinstance(value_, values.NumberValue):
+                        arr = np.array(value_.get_constant_value())
+                    else:
+                        arr = get_constant_array(value_)
+
+                    if not config.float_restrict:
+                        if arr.dtype == np.float64:
+                            arr = arr.astype(np.float32)
+
+                    constant_name = self.new_constant(
+                        arr, name, as_initializer=not isinstance(value_, values.NumberValue))
+                    if constant_name == name and isinstance(value_, values.NumberValue):
+                        self.main_graph.new_empty_tensor_with_value(value_)
+                    value2onnx_parameter[value_].onnx_name = constant_name
                 else:
                     if isinstance(value_, values.NumberValue):
                         t = onnx_graph.new_empty_tensor_with_value(value_)
@@ -914,9 +1091,9 @@ class ONNXGenerator:
                 node_ = node  # type: nodes.NodeIf
 
                 true_graph = self.generate_graph(
-                    node_.true_graph.input_values, node_.true_graph.output_values, node_.true_graph, onnx_graph)
+                    node_.true_graph.input_values, node_.true_graph.output_values, node_.true_graph, onnx_graph, emit_shape=onnx_graph.emit_shape)
                 false_graph = self.generate_graph(
-                    node_.false_graph.input_values, node_.false_graph.output_values, node_.false_graph, onnx_graph)
+                    node_.false_graph.input_values, node_.false_graph.output_values, node_.false_graph, onnx_graph, emit_shape=onnx_graph.emit_shape)
 
                 onnx_node = oh.make_node(
                     'If',
@@ -942,7 +1119,7 @@ class ONNXGenerator:
                     str(node.lineprop))
 
                 body_graph = self.generate_graph(
-                    node_.body_graph.input_values, node_.body_graph.output_values, node_.body_graph, onnx_graph)
+                    node_.body_graph.input_values, node_.body_graph.output_values, node_.body_graph, onnx_graph, emit_shape=False)
 
                 # for
                 onnx_node = onnx_graph.add_node(
@@ -987,7 +1164,7 @@ class ONNXGenerator:
                     str(node.lineprop))
 
                 body_graph = self.generate_graph(
-                    node_.body_graph.input_values, node_.body_graph.output_values, node_.body_graph, onnx_graph)
+                    node_.body_graph.input_values, node_.body_graph.output_values, node_.body_graph, onnx_graph, emit_shape=False)
 
                 onnx_node = oh.make_node(
                     'Loop',
@@ -1160,7 +1337,7 @@ class ONNXGenerator:
                            for n, p in model.namedparams()}
 
         for p, n in self.param2name.items():
-            assigned_names.append(n)
+            assigned_names.add(n)
 
         # assign onnx name
         assign_onnx_name(graph)
@@ -1,4 +1,9 @@
 import sys
 
 show_warnings = True
-float_restrict = False
\ No newline at end of file
+float_restrict = False
+
+# for statements and list comprehensions over range with a constant trip
+# count up to this are unrolled
+# (0 means that Loop is always used)
+unroll_for_threshold = 0
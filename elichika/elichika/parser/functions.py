@@ -6,12 +6,14 @@ import inspect
 import ast
 import gast
 import weakref
+import copy
 from enum import Enum
 
 import numpy as np
 
 from elichika.parser import vevaluator
 from elichika.parser import nodes
+from elichika.parser import graphs
 from elichika.parser import values
 from elichika.parser import functions
 from elichika.parser import utils
@@ -31,6 +33,7 @@ def generate_copied_value(value: 'values.Value'):
         copied = values.TensorValue()
         copied.value = value.value
         copied.shape = value.shape
+        copied.dtype = value.dtype
         return copied
 
     if isinstance(value, values.ListValue):
@@ -75,6 +78,94 @@ def generate_tensor_value_with_undefined_shape_size(value: 'values.TensorValue')
     return ret
 
 
+def get_constant(value):
+    '''
+    get a python value from values.Value
+    None is returned if it is unknown
+    '''
+    if isinstance(value, values.ValueRef):
+        value = value.get_value()
+
+    if isinstance(value, values.TupleValue):
+        if value.internal_value is None:
+            return None
+        ret = []
+        for v in value.internal_value:
+            v = get_constant(v)
+            if v is None:
+                return None
+            ret.append(v)
+        return tuple(ret)
+
+    if isinstance(value, (values.NumberValue, values.BoolValue, values.StrValue)):
+        return value.internal_value
+
+    return None
+
+
+def merge_shapes(shape1, shape2):
+    '''
+    return a shape which both shapes match
+    () means unknown rank and -1 means unknown size
+    '''
+    if len(shape1) != len(shape2):
+        return ()
+    return tuple([d1 if d1 == d2 else -1 for d1, d2 in zip(shape1, shape2)])
+
+
+def broadcast_shapes(shape1, shape2):
+    '''
+    return a shape of an elementwise operation between tensors
+    '''
+    if len(shape1) == 0 or len(shape2) == 0:
+        return ()
+
+    rank = max(len(shape1), len(shape2))
+    shape1 = (1,) * (rank - len(shape1)) + tuple(shape1)
+    shape2 = (1,) * (rank - len(shape2)) + tuple(shape2)
+
+    ret = []
+    for d1, d2 in zip(shape1, shape2):
+        if d1 == 1:
+            ret.append(d2)
+        elif d2 == 1 or d1 == d2:
+            ret.append(d1)
+        elif d1 == -1:
+            ret.append(d2)
+        elif d2 == -1:
+            ret.append(d1)
+        else:
+            # a mismatch is detected by Chainer
+            ret.append(-1)
+    return tuple(ret)
+
+
+def merge_value_type(value: 'values.Value', other: 'values.Value'):
+    '''
+    generalize a shape and a dtype of value so that they match other
+    it is used for a value which comes from some paths (if, for)
+    '''
+    if other is None:
+        return
+
+    # None does not have a type (e.g., lazy initialization)
+    if isinstance(other, values.NoneValue):
+        return
+
+    if isinstance(value, values.TensorValue):
+        if isinstance(other, values.TensorValue):
+            value.shape = merge_shapes(value.shape, other.shape)
+            if value.dtype != other.dtype:
+                value.dtype = None
+        else:
+            value.shape = ()
+            value.dtype = None
+
+    if isinstance(value, values.NumberValue):
+        if not isinstance(other, values.NumberValue) or value.dtype != other.dtype:
+            value.dtype = None
+
+
 class SuffixType(Enum):
     Unknown = 0,
     Unused = 1,
@@ -95,6 +186,8 @@ def generate_value_with_same_type(value: 'values.Value', has_default = False, su
             dtype = np.array(value.internal_value).dtype
         elif isinstance(value.internal_value, float):
             dtype = np.array(value.internal_value).dtype
+            if not config.float_restrict and dtype == np.float64:
+                dtype = np.float32
 
         if has_default:
             if dtype == np.array(0).dtype:
@@ -263,6 +356,226 @@ class FunctionArgCollection():
         return ret
 
 
+# code object -> (lineno, ast)
+# it is cleared by compile_model after a model is converted
+parsed_functions = {}
+
+
+def parse_function(func):
+    '''
+    parse a source of func and return (lineno, ast)
+    a function is looked up every time a method or a link is called,
+    so the ast is shared among functions which have the same code
+    '''
+    code_ = getattr(func, '__code__', None)
+    if code_ is not None and code_ in parsed_functions.keys():
+        return parsed_functions[code_]
+
+    lineno = inspect.getsourcelines(func)[1]
+    code = utils.clip_head(inspect.getsource(func))
+    ret = (lineno, gast.ast_to_gast(ast.parse(code)).body[0])
+
+    if code_ is not None:
+        parsed_functions[code_] = ret
+    return ret
+
+
+# (code object, id of self, signature of args) -> RecordedCall
+# it is cleared by compile_model after a model is converted
+recorded_calls = {}
+
+# RecordedCalls whose nodes are being recorded
+recording_calls = []
+
+# the number of calls which are cloned from (hit) or added to (miss) recorded_calls
+recorded_call_stats = {'hit': 0, 'miss': 0}
+
+# methods which may change an object which outlives a call
+mutating_methods = {'append', 'extend', 'insert', 'pop', 'remove', 'clear', 'update', 'setdefault', 'add', 'discard', 'reset_state'}
+
+
+def invalidate_recorded_calls():
+    '''
+    an object which outlives a call is changed,
+    so recorded calls may read stale values and calls being recorded have side effects
+    '''
+    recorded_calls.clear()
+    for recording in recording_calls:
+        recording.is_cacheable = False
+
+
+def get_call_signature(value: 'values.Value'):
+    '''
+    return a hashable signature which determines nodes generated with value,
+    or None if value cannot be a part of a key of recorded_calls
+    '''
+    if isinstance(value, values.TensorValue):
+        return (values.TensorValue, tuple(value.shape), value.dtype)
+
+    if isinstance(value, values.NumberValue):
+        if value.internal_value is None:
+            return (values.NumberValue, value.dtype)
+        return (values.NumberValue, type(value.internal_value), value.internal_value, value.dtype)
+
+    if isinstance(value, (values.BoolValue, values.StrValue)):
+        return (type(value), value.internal_value)
+
+    if isinstance(value, values.NoneValue):
+        return (values.NoneValue,)
+
+    return None
+
+
+def is_constant_in_call(value: 'values.Value') -> 'bool':
+    '''
+    whether value can be shared by clones of a call
+    '''
+    if isinstance(value, (values.Instance, values.FuncValue, values.ModuleValue, values.Type, values.NoneValue, values.StrValue)):
+        return True
+
+    if isinstance(value, (values.NumberValue, values.BoolValue)):
+        return value.internal_value is not None
+
+    return False
+
+
+def get_node_fields(node: 'nodes.Node'):
+    '''
+    return names of fields of node except outputs and subgraphs
+    '''
+    ret = []
+    for cls in type(node).__mro__:
+        for name in getattr(cls, '__slots__', ()):
+            if not name in ('outputs', 'subgraphs', 'lineprop'):
+                ret.append(name)
+    return ret
+
+
+class RecordedCall():
+    '''
+    nodes which are generated by a call of a function
+
+    when the function is called again with the same signature,
+    nodes are cloned instead of evaluating the function again
+    '''
+
+    def __init__(self, owner, args: 'List[values.Value]'):
+        self.owner = owner  # keeps id(owner) in the key valid
+        self.args = args
+        self.nodes = []
+        self.ret = None
+        self.is_cacheable = True
+
+    def finish(self, nodes_: 'List[nodes.Node]', ret: 'values.ValueRef') -> 'bool':
+        '''
+        check whether nodes depend only on args and constants
+        '''
+        self.nodes = nodes_
+        self.ret = ret
+        if not self.is_cacheable:
+            return False
+
+        produced = set(self.args)
+
+        def is_known(obj):
+            if isinstance(obj, values.ValueRef):
+                obj = obj.get_value()
+
+            if isinstance(obj, (list, tuple)):
+                return all(is_known(o) for o in obj)
+
+            if isinstance(obj, dict):
+                return all(is_known(o) for o in obj.values())
+
+            if isinstance(obj, FunctionArgValueInput):
+                return is_known(obj.inputs) and is_known(obj.keywords)
+
+            if isinstance(obj, values.TupleValue) and obj not in produced:
+                return obj.internal_value is not None and is_known(obj.internal_value)
+
+            if isinstance(obj, values.Value):
+                return obj in produced or is_constant_in_call(obj)
+
+            return True
+
+        for node in self.nodes:
+            if len(node.subgraphs) > 0 or isinstance(node, nodes.NodeNonVolatileAssign):
+                return False
+
+            for name in get_node_fields(node):
+                if not is_known(getattr(node, name)):
+                    return False
+
+            for output in node.outputs:
+                if not isinstance(output, (values.TensorValue, values.NumberValue, values.BoolValue)):
+                    return False
+                produced.add(output)
+
+        return ret is None or is_known(ret)
+
+    def clone(self, graph: 'graphs.Graph', args: 'List[values.ValueRef]') -> 'values.ValueRef':
+        converted = {}
+        for recorded, arg in zip(self.args, args):
+            converted[recorded] = arg.get_value()
+
+        def convert(obj):
+            if isinstance(obj, list):
+                return [convert(o) for o in obj]
+
+            if isinstance(obj, tuple):
+                return tuple([convert(o) for o in obj])
+
+            if isinstance(obj, dict):
+                return {k: convert(o) for k, o in obj.items()}
+
+            if isinstance(obj, FunctionArgValueInput):
+                ret = FunctionArgValueInput()
+                ret.inputs = convert(obj.inputs)
+                ret.keywords = convert(obj.keywords)
+                return ret
+
+            if isinstance(obj, values.ValueRef):
+                value = convert(obj.get_value())
+                return obj if value is obj.get_value() else values.ValueRef(value)
+
+            if isinstance(obj, values.TupleValue) and obj not in converted and obj.internal_value is not None:
+                vs = convert(obj.internal_value)
+                if all(v is o for v, o in zip(vs, obj.internal_value)):
+                    return obj
+                return values.TupleValue(vs)
+
+            if isinstance(obj, values.Value) and obj in converted:
+                return converted[obj]
+
+            return obj
+
+        for node in self.nodes:
+            node_ = copy.copy(node)
+            for name in get_node_fields(node):
+                setattr(node_, name, convert(getattr(node, name)))
+
+            outputs = []
+            for output in node.outputs:
+                output_ = copy.copy(output)
+                output_.id = utils.get_guid()
+                output_.generator = None
+                converted[output] = output_
+                outputs.append(output_)
+
+            node_.outputs = []
+            node_.set_outputs(outputs)
+            graph.add_node(node_)
+
+        if self.ret is None:
+            return None
+
+        ret_value = self.ret.get_value()
+        for recorded, arg in zip(self.args, args):
+            if ret_value is recorded:
+                return arg
+        return values.ValueRef(convert(ret_value))
+
+
 class FunctionBase():
     def __init__(self):
         self.name = ''
@@ -286,15 +599,11 @@ class UserDefinedClassConstructorFunction(FunctionBase):
         func = init_func[0]
         self.inst = func
         self.name = func.__name__
-        self.lineno = inspect.getsourcelines(func)[1]
         self.classinfo = classinfo
 
-        original_code = inspect.getsource(func)
-        code = utils.clip_head(original_code)
-
         self.args.analyze_args(func)
 
-        self.ast = gast.ast_to_gast(ast.parse(code)).body[0]
+        self.lineno, self.ast = parse_function(func)
 
     def vcall(self, module: 'values.Field', graph: 'graphs.Graph', inst: 'values.ValueRef', args: 'FunctionArgInput', line=-1):
         ret = values.ValueRef(values.UserDefinedInstance(
@@ -322,13 +631,10 @@ class UserDefinedFunction(FunctionBase):
 
         self.inst = func
         self.name = func.__name__
-        self.lineno = inspect.getsourcelines(func)[1]
-
-        code = utils.clip_head(inspect.getsource(func))
 
         self.args.analyze_args(func)
 
-        self.ast = gast.ast_to_gast(ast.parse(code)).body[0]
+        self.lineno, self.ast = parse_function(func)
 
     def vcall(self, module: 'values.Field', graph: 'core.Graph', inst: 'values.ValueRef', args: 'FunctionArgInput', line=-1):
         func_field = values.Field()
@@ -341,4 +647,61 @@ class UserDefinedFunction(FunctionBase):
             func_field.get_field().get_attribute(k).revise(v)
 
         astc = vevaluator.AstContext(self.ast.body, self.lineno - 1)
-        return vevaluator.veval_ast(astc, func_field, graph)
+
+        key, owner = self.get_recorded_call_key(inst, funcArgs)
+        if key is None:
+            return vevaluator.veval_ast(astc, func_field, graph)
+
+        args_ = [funcArgs.keywords[fa.name] for fa in self.args_list_without_self(inst)]
+        if key in recorded_calls.keys():
+            recorded_call_stats['hit'] += 1
+            return recorded_calls[key].clone(graph, args_)
+
+        recorded_call_stats['miss'] += 1
+        recording = RecordedCall(owner, [v.get_value() for v in args_])
+        recording_calls.append(recording)
+        recording_graph = graphs.Graph()
+        try:
+            ret = vevaluator.veval_ast(astc, func_field, recording_graph)
+        finally:
+            recording_calls.pop()
+
+        for node in recording_graph.nodes:
+            graph.add_node(node)
+
+        if recording.finish(recording_graph.nodes, ret):
+            recorded_calls[key] = recording
+        return ret
+
+    def args_list_without_self(self, inst: 'values.ValueRef'):
+        if inst is None:
+            return self.args.args_list
+        return self.args.args_list[1:]
+
+    def get_recorded_call_key(self, inst: 'values.ValueRef', funcArgs: 'FunctionArgInput'):
+        '''
+        return (key of recorded_calls, owner of the key) or (None, None) if the call cannot be recorded
+        '''
+        code_ = getattr(self.inst, '__code__', None)
+        if code_ is None or len(values.histories) > 0:
+            return None, None
+
+        owner = getattr(self.inst, '__self__', None)
+        if inst is not None:
+            inst_value = inst.get_value()
+            if not isinstance(inst_value, values.Instance):
+                return None, None
+            owner = inst_value.inst if inst_value.inst is not None else inst_value
+
+        signature = []
+        for fa in self.args_list_without_self(inst):
+            v = funcArgs.keywords[fa.name]
+            if not isinstance(v, values.ValueRef):
+                return None, None
+
+            s = get_call_signature(v.get_value())
+            if s is None:
+                return None, None
+            signature.append((fa.name, s))
+
+        return (code_, id(owner), tuple(signature)), owner
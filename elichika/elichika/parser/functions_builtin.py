@@ -4,13 +4,171 @@ from elichika.parser import functions
 from elichika.parser import graphs
 from elichika.parser import utils
 
+import numpy as np
+
 import chainer
 import chainer.functions as F
 import chainer.links as L
+from chainer.utils import conv
 
 def create_return_value_in_chainer_function():
     return values.TensorValue()
 
+
+def get_pair(value):
+    if isinstance(value, tuple):
+        return value
+    return (value, value)
+
+
+def get_tensor_shape(value):
+    if isinstance(value, values.TensorValue):
+        return tuple(value.shape)
+    return ()
+
+
+def estimate_same_shape(args: 'functions.FunctionArgValueInput'):
+    return get_tensor_shape(args.get_value(0))
+
+
+def estimate_reshape_shape(args: 'functions.FunctionArgValueInput'):
+    shape = functions.get_constant(args.get_value('shape'))
+    if isinstance(shape, int):
+        shape = (shape,)
+    if not isinstance(shape, tuple) or len(shape) == 0:
+        return ()
+
+    x_shape = get_tensor_shape(args.get_value('x'))
+    if shape.count(-1) == 1 and len(x_shape) > 0 and not -1 in x_shape:
+        size = int(np.prod(x_shape))
+        rest = int(np.prod([d for d in shape if d != -1]))
+        if rest > 0:
+            shape = tuple([size // rest if d == -1 else d for d in shape])
+    return shape
+
+
+def estimate_swapaxes_shape(args: 'functions.FunctionArgValueInput'):
+    shape = list(get_tensor_shape(args.get_value('x')))
+    axis1 = functions.get_constant(args.get_value('axis1'))
+    axis2 = functions.get_constant(args.get_value('axis2'))
+    if len(shape) == 0 or axis1 is None or axis2 is None:
+        return ()
+    shape[axis1], shape[axis2] = shape[axis2], shape[axis1]
+    return tuple(shape)
+
+
+def estimate_concat_shape(args: 'functions.FunctionArgValueInput'):
+    xs = args.get_value('xs')
+    if isinstance(xs, values.TupleValue) and xs.internal_value is not None:
+        xs = xs.internal_value
+    elif isinstance(xs, values.ListValue) and not xs.is_any:
+        xs = xs.values
+    else:
+        return ()
+
+    axis = functions.get_constant(args.get_value('axis'))
+    shapes = [get_tensor_shape(x.get_value() if isinstance(x, values.ValueRef) else x) for x in xs]
+    if axis is None or len(shapes) == 0 or () in shapes:
+        return ()
+
+    ret = shapes[0]
+    for shape in shapes[1:]:
+        ret = functions.merge_shapes(ret, shape)
+    if len(ret) == 0:
+        return ()
+
+    sizes = [shape[axis] for shape in shapes]
+    ret = list(ret)
+    ret[axis] = -1 if -1 in sizes else sum(sizes)
+    return tuple(ret)
+
+
+def estimate_matmul_shape(args: 'functions.FunctionArgValueInput'):
+    a = list(get_tensor_shape(args.get_value('a')))
+    b = list(get_tensor_shape(args.get_value('b')))
+    transa = functions.get_constant(args.get_value('transa'))
+    transb = functions.get_constant(args.get_value('transb'))
+    if len(a) < 2 or len(a) != len(b) or transa is None or transb is None:
+        return ()
+    if transa:
+        a[-1], a[-2] = a[-2], a[-1]
+    if transb:
+        b[-1], b[-2] = b[-2], b[-1]
+    return functions.merge_shapes(tuple(a[:-2]), tuple(b[:-2])) + (a[-2], b[-1])
+
+
+def estimate_pooling_2d_shape(args: 'functions.FunctionArgValueInput'):
+    shape = get_tensor_shape(args.get_value('x'))
+    ksize = functions.get_constant(args.get_value('ksize'))
+    stride = functions.get_constant(args.get_value('stride'))
+    pad = functions.get_constant(args.get_value('pad'))
+    cover_all = functions.get_constant(args.get_value('cover_all'))
+    if len(shape) != 4 or ksize is None or pad is None:
+        return ()
+    if stride is None:
+        stride = ksize
+    if cover_all is None:
+        cover_all = False
+
+    ret = list(shape[:2])
+    for size, k, s, p in zip(shape[2:], get_pair(ksize), get_pair(stride), get_pair(pad)):
+        if size == -1:
+            ret.append(-1)
+        else:
+            ret.append(conv.get_conv_outsize(size, k, s, p, cover_all=cover_all))
+    return tuple(ret)
+
+
+def estimate_unpooling_2d_shape(args: 'functions.FunctionArgValueInput'):
+    shape = get_tensor_shape(args.get_value('x'))
+    if len(shape) != 4:
+        return ()
+
+    outsize = functions.get_constant(args.get_value('outsize'))
+    if outsize is not None:
+        return tuple(shape[:2]) + tuple(outsize)
+
+    ksize = functions.get_constant(args.get_value('ksize'))
+    stride = functions.get_constant(args.get_value('stride'))
+    pad = functions.get_constant(args.get_value('pad'))
+    cover_all = functions.get_constant(args.get_value('cover_all'))
+    if ksize is None or pad is None or cover_all is None:
+        return ()
+    if stride is None:
+        stride = ksize
+
+    ret = list(shape[:2])
+    for size, k, s, p in zip(shape[2:], get_pair(ksize), get_pair(stride), get_pair(pad)):
+        if size == -1:
+            ret.append(-1)
+        else:
+            ret.append(conv.get_deconv_outsize(size, k, s, p, cover_all=cover_all))
+    return tuple(ret)
+
+
+def estimate_resize_images_shape(args: 'functions.FunctionArgValueInput'):
+    shape = get_tensor_shape(args.get_value('x'))
+    output_shape = functions.get_constant(args.get_value('output_shape'))
+    if len(shape) != 4 or output_shape is None:
+        return ()
+    return tuple(shape[:2]) + tuple(output_shape)
+
+
+# functions to estimate shapes of values returned by chainer functions
+chainer_function_estimators = {
+    F.relu: estimate_same_shape,
+    F.softmax: estimate_same_shape,
+    F.dropout: estimate_same_shape,
+    F.reshape: estimate_reshape_shape,
+    F.swapaxes: estimate_swapaxes_shape,
+    F.concat: estimate_concat_shape,
+    F.matmul: estimate_matmul_shape,
+    F.average_pooling_2d: estimate_pooling_2d_shape,
+    F.max_pooling_2d: estimate_pooling_2d_shape,
+    F.unpooling_2d: estimate_unpooling_2d_shape,
+    F.resize_images: estimate_resize_images_shape,
+}
+
 class ChainerFunction(functions.FunctionBase):
     def __init__(self, func, ret_value_func = create_return_value_in_chainer_function):
         super().__init__()
@@ -27,6 +185,15 @@ class ChainerFunction(functions.FunctionBase):
         #value = functions.generate_value_with_same_type(vargs[0])
         value = self.ret_value_func()
         value.name = '@F.{}.{}'.format(line, self.name)
+
+        if isinstance(value, values.TensorValue):
+            vargs = funcArgs.get_value()
+            if isinstance(vargs.get_value(0), values.TensorValue):
+                value.dtype = vargs.get_value(0).dtype
+
+            estimator = chainer_function_estimators.get(self.base_func)
+            if estimator is not None:
+                value.shape = estimator(vargs)
         node.set_outputs([value])
         return values.ValueRef(value)
 
@@ -37,11 +204,15 @@ class RangeFunction(functions.FunctionBase):
         self.name = 'range'
 
     def vcall(self, module: 'Field', graph: 'Graph', inst: 'values.ValueRef', args: 'functions.FunctionArgInput', line=-1):
-        node = nodes.NodeGenerate(
-            'range', [v.get_value() for v in args.inputs], line)
+        vargs = [v.get_value() for v in args.inputs]
+        node = nodes.NodeGenerate('range', vargs, line)
         graph.add_node(node)
         value = values.RangeValue()
         value.name = '@F.{}.{}'.format(line, self.name)
+
+        constants = [functions.get_constant(v) for v in vargs]
+        if 1 <= len(constants) <= 3 and all([isinstance(c, (int, np.integer)) for c in constants]):
+            value.constant_range = range(*[int(c) for c in constants])
         node.set_outputs([value])
         return values.ValueRef(value)
 
@@ -3,6 +3,7 @@ from elichika.parser import values
 from elichika.parser import functions
 from elichika.parser import graphs
 from elichika.parser import utils
+from elichika.parser import config
 
 import chainer
 import chainer.functions as F
@@ -10,6 +11,47 @@ import chainer.links as L
 
 import numpy as np
 
+def estimate_shape_from_arg(value):
+    shape = functions.get_constant(value)
+    if isinstance(shape, int):
+        return (shape,)
+    if isinstance(shape, tuple):
+        return shape
+    return ()
+
+def estimate_dtype_from_arg(value):
+    '''
+    estimate a dtype of np.array(value). None is returned if it is unknown.
+    '''
+    if isinstance(value, values.TensorValue) or isinstance(value, values.NumberValue):
+        return value.dtype
+
+    if isinstance(value, values.BoolValue):
+        return np.dtype(np.bool)
+
+    elements = None
+    if isinstance(value, values.TupleValue):
+        elements = value.internal_value
+    elif isinstance(value, values.ListValue) and not value.is_any:
+        elements = value.values
+
+    if not elements:
+        return None
+
+    dtypes = []
+    for element in elements:
+        if isinstance(element, values.ValueRef):
+            element = element.get_value()
+        dtype = estimate_dtype_from_arg(element)
+        if dtype is None:
+            return None
+        dtypes.append(dtype)
+
+    dtype = np.result_type(*dtypes)
+    if not config.float_restrict and dtype == np.float64:
+        dtype = np.dtype(np.float32)
+    return dtype
+
 class NDArrayFunction(functions.FunctionBase):
     def __init__(self):
         super().__init__()
@@ -32,15 +74,15 @@ class NDArrayFunction(functions.FunctionBase):
         if dtype_value is not None and not isinstance(dtype_value, values.NoneValue):
             # TODO : make better
             dtype = utils.int_2_numpy_type(dtype_value.internal_value)
-        elif isinstance(vargs[0], values.TensorValue):
-            dtype = vargs[0].dtype
         else:
-            dtype = None
+            dtype = estimate_dtype_from_arg(vargs[0])
 
         node = nodes.NodeGenerate('array', funcArgs, line)
         graph.add_node(node)
         value = values.TensorValue()
         value.dtype = dtype
+        if isinstance(vargs[0], values.TensorValue):
+            value.shape = vargs[0].shape
         value.name = '@F.{}.{}'.format(line, self.name)
         node.set_outputs([value])
         return values.ValueRef(value)
@@ -70,6 +112,7 @@ class NDArrayZerosFunction(functions.FunctionBase):
         graph.add_node(node)
         value = values.TensorValue()
         value.dtype = dtype
+        value.shape = estimate_shape_from_arg(vargs[0])
         value.name = '@F.{}.{}'.format(line, self.name)
         node.set_outputs([value])
         return values.ValueRef(value)
@@ -100,6 +143,7 @@ class NDArrayFullFunction(functions.FunctionBase):
         graph.add_node(node)
         value = values.TensorValue()
         value.dtype = dtype
+        value.shape = estimate_shape_from_arg(vargs[0])
         value.name = '@F.{}.{}'.format(line, self.name)
         node.set_outputs([value])
         return values.ValueRef(value)
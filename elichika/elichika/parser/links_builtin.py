@@ -4,6 +4,7 @@ from elichika.parser import functions
 from elichika.parser.graphs import Graph
 
 import chainer.links
+from chainer.utils import conv
 
 chainer_links = {}
 
@@ -19,8 +20,23 @@ def estimate_linear_shape(inst: 'chainer.links.Linear', args: 'functions.Functio
     return ()
 
 def estimate_convolution2D_shape(inst: 'chainer.links.Convolution2D', args: 'functions.FunctionArgInput'):
-    # TODO make correct
-    return functions.generate_tensor_value_with_undefined_shape_size(args.get_value().get_value('x')).shape
+    x = args.get_value().get_value('x')
+    if not isinstance(x, values.TensorValue) or len(x.shape) != 4:
+        return ()
+
+    def pair(v):
+        if isinstance(v, tuple):
+            return v
+        return (v, v)
+
+    cover_all = getattr(inst, 'cover_all', False)
+    ret = [x.shape[0], inst.out_channels]
+    for size, k, s, p, d in zip(x.shape[2:], pair(inst.ksize), pair(inst.stride), pair(inst.pad), pair(getattr(inst, 'dilate', 1))):
+        if size == -1:
+            ret.append(-1)
+        else:
+            ret.append(conv.get_conv_outsize(size, k, s, p, cover_all=cover_all, d=d))
+    return tuple(ret)
 
 def estimate_batch_norm_shape(inst: 'chainer.links.BatchNormalization', args: 'functions.FunctionArgInput'):
     if isinstance(args.get_value().get_value('x'), values.TensorValue):
@@ -58,11 +74,17 @@ class ChainerLinkFunction(functions.FunctionBase):
         if estimate_shape is not None:
             value.shape = estimate_shape(self.owner.inst, vargs)
 
+        x = vargs.get_value().get_value('x')
+        if isinstance(x, values.TensorValue):
+            value.dtype = x.dtype
+
         node.set_outputs([value])
         return values.ValueRef(value)
 
 
 class ChainerLinkInstance(values.Instance):
+    __slots__ = ()
+
     def __init__(self, module: 'Field', inst):
         super().__init__(module, inst, None)
         self.callable = True
@@ -79,6 +79,8 @@ def remove_ref(value):
     return value
 
 class Node:
+    __slots__ = ('inputs', 'outputs', 'subgraphs', 'lineprop')
+
     def __init__(self, line):
         self.inputs = []
         self.outputs = []
@@ -112,6 +114,8 @@ class Node:
             output.generator = self
 
 class NodeInvalid(Node):
+    __slots__ = ()
+
     def __init__(self, line=-1):
         super().__init__(line)
 
@@ -119,6 +123,8 @@ class NodeInvalid(Node):
         return 'Invalid({})'.format(self.lineprop)
 
 class NodeInput(Node):
+    __slots__ = ('tag',)
+
     def __init__(self, tag = '', line=-1):
         super().__init__(line)
         self.tag = tag
@@ -127,6 +133,8 @@ class NodeInput(Node):
         return 'Input({})'.format(self.tag)
 
 class NodeCopy(Node):
+    __slots__ = ('value',)
+
     def __init__(self, value: 'values.Value', line=-1):
         super().__init__(line)
         value = remove_ref(value)
@@ -139,6 +147,8 @@ class NodeCopy(Node):
 
 
 class NodeNonVolatileAssign(Node):
+    __slots__ = ('target_value', 'value')
+
     def __init__(self, target_value: 'values.Value', value: 'values.Value', line=-1):
         super().__init__(line)
         target_value = remove_ref(target_value)
@@ -154,6 +164,8 @@ class NodeNonVolatileAssign(Node):
 
 
 class NodeAssign(Node):
+    __slots__ = ('targets', 'objects')
+
     def __init__(self, attr: 'values.Attribute', obj: 'values.ValueRef', line=-1):
         assert(isinstance(obj, values.ValueRef))
         super().__init__(line)
@@ -169,6 +181,8 @@ class NodeAssign(Node):
 
 
 class NodeAugAssign(Node):
+    __slots__ = ('target', 'value', 'binop')
+
     def __init__(self, target: 'values.Value', value: 'values.Value', binop: 'BinOp', line=-1):
         super().__init__(line)
 
@@ -187,6 +201,8 @@ class NodeAugAssign(Node):
 
 
 class NodeBinOp(Node):
+    __slots__ = ('left', 'right', 'binop')
+
     def __init__(self, left: 'values.Value', right: 'values.Value', binop: 'BinOp', line=-1):
         super().__init__(line)
 
@@ -205,6 +221,8 @@ class NodeBinOp(Node):
 
 
 class NodeUnaryOp(Node):
+    __slots__ = ('operand', 'unaryop')
+
     def __init__(self, operand: 'values.Value', unaryop: 'UnaryOpType', line=-1):
         super().__init__(line)
         operand = remove_ref(operand)
@@ -219,6 +237,8 @@ class NodeUnaryOp(Node):
 
 
 class NodeCompare(Node):
+    __slots__ = ('left', 'right', 'compare')
+
     def __init__(self, left: 'values.Value', right: 'values.Value', compare: 'CompareType', line=-1):
         super().__init__(line)
         left = remove_ref(left)
@@ -236,6 +256,8 @@ class NodeCompare(Node):
 
 
 class NodeGetItem(Node):
+    __slots__ = ('target', 'indexes')
+
     def __init__(self, target: "values.Value", indexes, line=-1):
         super().__init__(line)
         target = remove_ref(target)
@@ -251,6 +273,8 @@ class NodeGetItem(Node):
 
 
 class NodeSlice(Node):
+    __slots__ = ('target', 'indices', 'slice_specs')
+
     def __init__(self, target: "values.Value", indices, slice_specs, line=-1):
         super().__init__(line)
         target = remove_ref(target)
@@ -267,6 +291,8 @@ class NodeSlice(Node):
 
 
 class NodeCall(Node):
+    __slots__ = ('func', 'args')
+
     def __init__(self, func: 'Function', args : 'functions.FunctionArgInput', line=-1):
         super().__init__(line)
         args_ = args.get_value()
@@ -286,6 +312,8 @@ class NodeCall(Node):
 
 
 class NodeReturn(Node):
+    __slots__ = ('value',)
+
     def __init__(self, value, line=-1):
         super().__init__(line)
         value = remove_ref(value)
@@ -298,6 +326,8 @@ class NodeReturn(Node):
 
 
 class NodeIf(Node):
+    __slots__ = ('cond', 'input_values', 'true_graph', 'false_graph')
+
     def __init__(self, cond, input_values, true_graph, false_graph, line=-1):
         super().__init__(line)
         cond = remove_ref(cond)
@@ -320,6 +350,8 @@ class NodeIf(Node):
 
 
 class NodeFor(Node):
+    __slots__ = ('iter_value', 'input_values', 'body_graph')
+
     def __init__(self, iter_value, input_values, body_graph, line=-1):
         super().__init__(line)
         iter_value = remove_ref(iter_value)
@@ -338,6 +370,8 @@ class NodeFor(Node):
 
 
 class NodeForGenerator(Node):
+    __slots__ = ('counter_value', 'iter_value')
+
     def __init__(self, counter_value, iter_value, line=-1):
         super().__init__(line)
         counter_value = remove_ref(counter_value)
@@ -353,6 +387,8 @@ class NodeForGenerator(Node):
 
 
 class NodeListcomp(Node):
+    __slots__ = ('iter_value', 'input_values', 'body_graph')
+
     def __init__(self, iter_value, input_values, body_graph, line=-1):
         super().__init__(line)
         input_values = remove_ref(input_values)
@@ -371,6 +407,8 @@ class NodeListcomp(Node):
 
 
 class NodeGenerate(Node):
+    __slots__ = ('classtype', 'args')
+
     def __init__(self, classtype, args, line=-1):
         super().__init__(line)
         args = remove_ref(args)
@@ -391,6 +429,8 @@ class NodeGenerate(Node):
 
 
 class NodeConvert(Node):
+    __slots__ = ('classtype', 'value')
+
     def __init__(self, classtype, value, line=-1):
         super().__init__(line)
         value = remove_ref(value)
@@ -0,0 +1,188 @@
+from elichika.parser import nodes
+from elichika.parser import values
+from elichika.parser import functions
+from elichika.parser.graphs import Graph
+
+
+def add_used_value(used: 'set', value):
+    '''
+    add a value and values which it contains
+    '''
+    if not isinstance(value, values.Value) or value in used:
+        return
+
+    used.add(value)
+
+    if isinstance(value, values.TupleValue) and value.internal_value is not None:
+        for v in value.internal_value:
+            if isinstance(v, values.ValueRef):
+                v = v.get_value()
+            add_used_value(used, v)
+
+    if isinstance(value, values.ListValue):
+        for v in value.values:
+            if isinstance(v, values.ValueRef):
+                v = v.get_value()
+            add_used_value(used, v)
+
+
+def add_used_values_in_node(used: 'set', node: 'nodes.Node'):
+    for v in node.inputs:
+        add_used_value(used, v)
+
+    # converters may read keyword arguments directly
+    args = getattr(node, 'args', None)
+    if isinstance(args, functions.FunctionArgValueInput):
+        for v in args.keywords.values():
+            add_used_value(used, v)
+
+
+def add_used_values_in_graph(used: 'set', graph: 'Graph'):
+    for v in graph.output_values:
+        add_used_value(used, v)
+
+    for node in graph.nodes:
+        add_used_values_in_node(used, node)
+        for subgraph in node.subgraphs:
+            add_used_values_in_graph(used, subgraph)
+
+
+def add_live_values_in_graph(used: 'set', graph: 'Graph'):
+    '''
+    add values which are read to compute outputs of the graph
+    unlike add_used_values_in_graph, nodes whose outputs are not used are skipped
+    '''
+    for v in graph.output_values:
+        add_used_value(used, v)
+
+    for node in reversed(graph.nodes):
+        if not is_live(node, used):
+            continue
+
+        add_used_values_in_node(used, node)
+        for subgraph in node.subgraphs:
+            add_used_values_in_graph(used, subgraph)
+
+
+def is_live(node: 'nodes.Node', used: 'set'):
+    if isinstance(node, nodes.NodeInput):
+        return True
+
+    # nodes without outputs are not emitted
+    if len(node.outputs) == 0:
+        return True
+
+    for output in node.outputs:
+        if output in used:
+            return True
+
+    return False
+
+
+def prune_loop_states(node, used: 'set'):
+    '''
+    remove loop-carried values of NodeFor and NodeListcomp which are not used
+
+    body inputs : counter, cond, iter, states...
+    body outputs : cond, iter, states...
+    outputs : iter, states...
+    '''
+    body_graph = node.body_graph
+    state_count = len(node.input_values)
+
+    if len(body_graph.input_values) != state_count + 3 or \
+            len(body_graph.output_values) != state_count + 2 or \
+            len(node.outputs) != state_count + 1:
+        return
+
+    needed = [node.outputs[i + 1] in used for i in range(state_count)]
+
+    # a state is also needed if the body reads it to compute other needed states
+    while True:
+        body_graph_ = Graph()
+        body_graph_.nodes = body_graph.nodes
+        body_graph_.output_values = body_graph.output_values[:2] + \
+            [v for i, v in enumerate(body_graph.output_values[2:]) if needed[i]]
+
+        body_used = set()
+        add_live_values_in_graph(body_used, body_graph_)
+
+        changed = False
+        for i in range(state_count):
+            if not needed[i] and body_graph.input_values[i + 3] in body_used:
+                needed[i] = True
+                changed = True
+
+        if not changed:
+            break
+
+    node.input_values = [v for i, v in enumerate(
+        node.input_values) if needed[i]]
+    node.inputs = [node.iter_value] + node.input_values
+    node.outputs = node.outputs[:1] + \
+        [v for i, v in enumerate(node.outputs[1:]) if needed[i]]
+
+    body_graph.input_values = body_graph.input_values[:3] + \
+        [v for i, v in enumerate(body_graph.input_values[3:]) if needed[i]]
+    body_graph.output_values = body_graph.output_values[:2] + \
+        [v for i, v in enumerate(body_graph.output_values[2:]) if needed[i]]
+
+
+def prune_if_values(node: 'nodes.NodeIf', used: 'set'):
+    '''
+    remove outputs of NodeIf which are not used and inputs which are not read in both branches
+    '''
+    outputs_needed = [output in used for output in node.outputs]
+
+    node.outputs = [v for i, v in enumerate(
+        node.outputs) if outputs_needed[i]]
+    for graph in (node.true_graph, node.false_graph):
+        graph.output_values = [v for i, v in enumerate(
+            graph.output_values) if outputs_needed[i]]
+
+    true_used = prune_graph(node.true_graph)
+    false_used = prune_graph(node.false_graph)
+
+    inputs_needed = [node.true_graph.input_values[i] in true_used or node.false_graph.input_values[i] in false_used
+                     for i in range(len(node.input_values))]
+
+    node.input_values = [v for i, v in enumerate(
+        node.input_values) if inputs_needed[i]]
+    node.inputs = [node.cond] + node.input_values
+    for graph in (node.true_graph, node.false_graph):
+        graph.input_values = [v for i, v in enumerate(
+            graph.input_values) if inputs_needed[i]]
+
+    return true_used | false_used
+
+
+def prune_graph(graph: 'Graph'):
+    '''
+    remove nodes whose outputs are not used by outputs of the graph, including in subgraphs
+    values used in the graph are returned
+    '''
+    used = set()
+    for v in graph.output_values:
+        add_used_value(used, v)
+
+    live_nodes = []
+    for node in reversed(graph.nodes):
+        if not is_live(node, used):
+            continue
+
+        if isinstance(node, nodes.NodeFor) or isinstance(node, nodes.NodeListcomp):
+            prune_loop_states(node, used)
+            # values in outer graphs may be used in the body
+            used |= prune_graph(node.body_graph)
+        elif isinstance(node, nodes.NodeIf):
+            used |= prune_if_values(node, used)
+        else:
+            for subgraph in node.subgraphs:
+                used |= prune_graph(subgraph)
+
+        add_used_values_in_node(used, node)
+        live_nodes.append(node)
+
+    live_nodes.reverse()
+    graph.nodes = live_nodes
+    return used
@@ -60,6 +60,8 @@ def clip_head(s: 'str'):
 
 
 class LineProperty():
+    __slots__ = ('lineno', 'filename')
+
     def __init__(self, lineno=-1, filename=''):
         self.lineno = lineno
         self.filename = filename
@@ -19,9 +19,16 @@ from elichika.parser import functions_ndarray
 
 from elichika.parser.functions import FunctionBase, UserDefinedFunction
 
-fields = []
 histories = []
 
+# Fields are copy-on-write with respect to histories. A field gets a
+# collection for the active histories only when it is read or written,
+# so entering and leaving a block costs O(fields touched in the block).
+# `history_fields[i]` holds the fields which have a collection for
+# `histories[i - 1]`. `history_fields[0]` holds the fields whose base
+# collection has inputs.
+history_fields = [[]]
+
 function_converters = {}
 instance_converters = []
 
@@ -34,46 +41,52 @@ def create_ref_value_name_with_constant(value):
     return '@C_Unknown'
 
 def reset_field_and_attributes():
-    global fields
-    fields = []
+    global history_fields
+    history_fields = [[]]
     histories.clear()
 
 
-def register_field(field: 'Field'):
-    fields.append(weakref.ref(field))
+def register_field(field: 'Field', level: 'int'):
+    history_fields[level].append(weakref.ref(field))
 
 
-def push_history(history_id: 'str'):
-    histories.append(history_id)
-    for field in fields:
+def get_fields(level: 'int') -> 'List[Field]':
+    ret = []
+    for field in history_fields[level]:
         o = field()
         if o is not None:
-            o.push_history(history_id)
+            ret.append(o)
+    # keep the order of creation
+    ret.sort(key=lambda f: f.id)
+    return ret
+
+
+def push_history(history_id: 'str'):
+    histories.append(history_id)
+    history_fields.append([])
 
 
 def pop_history():
     histories.pop()
-    for field in fields:
-        o = field()
-        if o is not None:
-            o.pop_history()
+    for field in get_fields(len(history_fields) - 1):
+        field.pop_history()
+    history_fields.pop()
+
+    for field in get_fields(len(history_fields) - 1):
+        field.collection.pop_history()
 
 
 def get_inputs() -> 'List[FieldInput]':
     ret = []
-    for field in fields:
-        o = field()
-        if o is not None:
-            ret += o.get_inputs()
+    for field in get_fields(len(history_fields) - 1):
+        ret += field.get_inputs()
     return ret
 
 
 def get_outputs() -> 'List[FieldOutput]':
     ret = []
-    for field in fields:
-        o = field()
-        if o is not None:
-            ret += o.get_outputs()
+    for field in get_fields(len(history_fields) - 1):
+        ret += field.get_outputs()
     return ret
 
 
@@ -279,18 +292,14 @@ class FieldAttributeCollection():
 class Field():
     def __init__(self):
         self.collection = FieldAttributeCollection('', None)
-        histories_ = histories.copy()
-        histories_.reverse()
 
-        for history in histories_:
-            collection = FieldAttributeCollection(history, self.collection)
-            self.collection = collection
+        # the number of histories which this field has a collection for
+        self.history_depth = 0
+        self.has_base_inputs = False
 
         self.module = None
         self.id = utils.get_guid()
 
-        register_field(self)
-
     def set_module(self, module):
         self.module = module
 
@@ -308,6 +317,7 @@ class Field():
         return False
 
     def get_attribute(self, key: 'str', from_module=True) -> 'Attribute':
+        self.sync_history()
         attribute = self.collection.try_get_attribute(key)
 
         if attribute is not None:
@@ -325,16 +335,18 @@ class Field():
         self.collection.attributes[key] = attribute
         return attribute
 
-    def push_history(self, history_id: 'str'):
-        collection = FieldAttributeCollection(history_id, self.collection)
-        self.collection = collection
+    def sync_history(self):
+        '''
+        create collections for histories which are pushed after this field is touched
+        '''
+        while self.history_depth < len(histories):
+            self.collection = FieldAttributeCollection(histories[self.history_depth], self.collection)
+            self.history_depth += 1
+            register_field(self, self.history_depth)
 
     def pop_history(self):
         self.collection = self.collection.parent
-        self.collection.pop_history()
-
-        if self.collection is None:
-            self.collection = FieldAttributeCollection('', None)
+        self.history_depth -= 1
 
     def get_inputs(self):
         return self.collection.get_inputs()
@@ -347,6 +359,7 @@ class Field():
         attribute.revise(value)
 
     def set_predefined_obj(self, key, obj):
+        self.sync_history()
         collections = []
         c = self.collection
 
@@ -373,6 +386,10 @@ class Field():
             collection.inputs[attribute] = (attribute.get_ref(), attribute.get_ref(
             ).get_value(), attribute.get_ref().get_value(), attribute.get_ref().get_value())
 
+            if collection.parent is None and not self.has_base_inputs:
+                self.has_base_inputs = True
+                register_field(self, 0)
+
            # if old_value is not None:
            #     collection.inputs[attribute] = (attribute.get_ref(), attribute.get_ref().get_value(), old_value, value)
 
@@ -424,11 +441,15 @@ class Module(Field):
 
 
 class AttributeHistory:
+    __slots__ = ('obj',)
+
     def __init__(self, obj: 'ValueRef'):
         self.obj = obj
 
 
 class Attribute:
+    __slots__ = ('name', 'history', 'parent', 'initial_obj', 'is_non_volatile')
+
     def __init__(self, name: 'str'):
         self.name = name
         self.history = []
@@ -467,11 +488,15 @@ class Attribute:
 
 
 class ValueRefHistory():
+    __slots__ = ('value',)
+
     def __init__(self, value):
         self.value = value
 
 
 class ValueRef():
+    __slots__ = ('name', 'value', 'id', 'attributes')
+
     def __init__(self, value: 'Value'):
         self.name = ""
         self.value = value
@@ -504,6 +529,8 @@ class ValueRef():
 
 
 class Value():
+    __slots__ = ('name', 'generator', 'internal_value', 'id')
+
     def __init__(self):
         self.name = ""
         self.generator = None
@@ -534,6 +561,8 @@ class Value():
 
 
 class NoneValue(Value):
+    __slots__ = ()
+
     def __init__(self):
         super().__init__()
 
@@ -550,12 +579,16 @@ class NoneValue(Value):
         return self.name + '({})'.format('None')
 
 class UnknownValue(Value):
+    __slots__ = ()
+
     def __init__(self):
         super().__init__()
     def __str__(self):
         return self.name + '(Un)'
 
 class NumberValue(Value):
+    __slots__ = ('dtype',)
+
     def __init__(self, number):
         super().__init__()
         self.internal_value = number
@@ -574,6 +607,8 @@ class NumberValue(Value):
 
 
 class StrValue(Value):
+    __slots__ = ()
+
     def __init__(self, string):
         super().__init__()
         self.internal_value = string
@@ -585,6 +620,8 @@ class StrValue(Value):
 
 
 class BoolValue(Value):
+    __slots__ = ()
+
     def __init__(self, b):
         super().__init__()
         self.internal_value = b
@@ -596,14 +633,20 @@ class BoolValue(Value):
 
 
 class RangeValue(Value):
+    __slots__ = ('constant_range',)
+
     def __init__(self):
         super().__init__()
+        # range if all arguments are constant
+        self.constant_range = None
 
     def __str__(self):
         return self.name + '(R)'
 
 
 class TupleValue(Value):
+    __slots__ = ()
+
     def __init__(self, values=None):
         super().__init__()
         self.internal_value = values
@@ -630,6 +673,8 @@ class TupleValue(Value):
 
 
 class FuncValue(Value):
+    __slots__ = ('func', 'obj')
+
     def __init__(self, func: 'functions.FunctionBase', obj: 'ValueRef'):
         super().__init__()
         self.func = func
@@ -640,6 +685,8 @@ class FuncValue(Value):
 
 
 class ListValue(Value):
+    __slots__ = ('is_any', 'values')
+
     def __init__(self, values=None):
         super().__init__()
         self.is_any = values is None
@@ -655,6 +702,8 @@ class ListValue(Value):
 
 
 class ModuleValue(Value):
+    __slots__ = ()
+
     def __init__(self):
         super().__init__()
 
@@ -663,6 +712,8 @@ class ModuleValue(Value):
 
 
 class DictValue(Value):
+    __slots__ = ()
+
     def __init__(self):
         super().__init__()
 
@@ -671,6 +722,8 @@ class DictValue(Value):
 
 
 class TensorValue(Value):
+    __slots__ = ('shape', 'value', 'dtype')
+
     def __init__(self, value = None):
         super().__init__()
         self.shape = ()
@@ -698,12 +751,16 @@ class TensorValue(Value):
 
 
 class Type(Value):
+    __slots__ = ()
+
     def __init__(self, name: 'str'):
         super().__init__()
         self.name = name
 
 
 class Instance(Value):
+    __slots__ = ('inst', 'callable', 'func', 'module', 'classinfo')
+
     def __init__(self, module: 'Field', inst, classinfo):
         super().__init__()
         self.inst = inst
@@ -714,6 +771,8 @@ class Instance(Value):
 
 
 class UserDefinedInstance(Instance):
+    __slots__ = ('is_chainer_link',)
+
     def __init__(self, module: 'Field', inst, classinfo, is_chainer_link=False):
         super().__init__(module, inst, classinfo)
         self.is_chainer_link = is_chainer_link
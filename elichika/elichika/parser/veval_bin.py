@@ -19,6 +19,8 @@ def veval(op: 'nodes.BinOpType', left: 'values.Value', right: 'values.Value'):
         return functions.generate_value_with_same_type(left)
 
     if isinstance(left, values.TensorValue) and isinstance(right, values.TensorValue):
-        return functions.generate_value_with_same_type(left)
+        ret = functions.generate_value_with_same_type(left)
+        ret.shape = functions.broadcast_shapes(left.shape, right.shape)
+        return ret
 
     return values.Value()
@@ -65,12 +65,16 @@ def get_ast_name_forcibly(ast):
     return ''
 
 class AstContext:
+    __slots__ = ('nast', 'lineno_offset', 'lineno')
+
     def __init__(self, nast, lineno_offset : 'int'):
         self.nast = nast
         self.lineno_offset = lineno_offset
-        self.lineno = self.lineno_offset
-        if hasattr(self.nast, 'lineno'):
-            self.lineno = self.nast.lineno + self.lineno_offset
+        lineno = getattr(nast, 'lineno', None)
+        if lineno is None:
+            self.lineno = lineno_offset
+        else:
+            self.lineno = lineno + lineno_offset
 
     def c(self, value) -> 'AstContext':
         """
@@ -116,6 +120,17 @@ def veval_ast_attribute(astc : 'AstContext', local_field : 'values.Field', graph
         print('Assigning value is not found in L.{}'.format(astc.lineno))
     return None
 
+def writes_to_object(target) -> 'bool':
+    '''
+    whether an assignment to target changes an object instead of a local variable
+    Ex. self.x = y, x[0] = y
+    '''
+    if isinstance(target, (gast.gast.Attribute, gast.gast.Subscript)):
+        return True
+    if isinstance(target, (gast.gast.Tuple, gast.gast.List)):
+        return any([writes_to_object(e) for e in target.elts])
+    return False
+
 def veval_ast_assign(astc : 'AstContext', local_field : 'values.Field', graph : 'Graph'):
     assert(isinstance(astc.nast, gast.gast.Assign))
     lineprop = utils.LineProperty(astc.lineno)
@@ -128,6 +143,9 @@ def veval_ast_assign(astc : 'AstContext', local_field : 'values.Field', graph :
             print('It is possible that assiging value is invalid in L.{}'.format(astc.lineno))
         return None
 
+    if writes_to_object(astc.nast.targets[0]):
+        functions.invalidate_recorded_calls()
+
     target_option = VEvalOption()
     target_option.eval_as_written_target = True
     targets = veval_ast(astc.c(astc.nast.targets[0]), local_field, graph, target_option)
@@ -189,6 +207,9 @@ def veval_ast_call(astc : 'AstContext', local_field : 'values.Field', graph : 'G
     func_obj = try_get_ref(func, 'call', lineprop)
     func_value = try_get_value(func, 'call', lineprop)
 
+    if isinstance(astc.nast.func, gast.gast.Attribute) and astc.nast.func.attr in functions.mutating_methods:
+        functions.invalidate_recorded_calls()
+
     finput = functions.FunctionArgInput()
 
     for arg in astc.nast.args:
@@ -355,6 +376,7 @@ def veval_ast_if(astc : 'AstContext', local_field : 'values.Field', graph : 'Gra
 
         if true_output_body_value is not None or false_output_body_value is not None:
             output_value = functions.generate_value_with_same_type(true_output_body_value)
+            functions.merge_value_type(output_value, false_output_body_value)
 
         if input_value is not None:
             inputs.append(input_value)
@@ -383,6 +405,9 @@ def veval_ast_aug_assign(astc : 'AstContext', local_field : 'values.Field', grap
     assert(isinstance(astc.nast, gast.gast.AugAssign))
     lineprop = utils.LineProperty(astc.lineno)
 
+    if writes_to_object(astc.nast.target):
+        functions.invalidate_recorded_calls()
+
     target = veval_ast(astc.c(astc.nast.target), local_field, graph)
     value = veval_ast(astc.c(astc.nast.value), local_field, graph)
 
@@ -398,9 +423,9 @@ def veval_ast_aug_assign(astc : 'AstContext', local_field : 'values.Field', grap
     node_aug_assign = nodes.NodeAugAssign(target_value, value_value, binop, astc.lineno)
     graph.add_node(node_aug_assign)
 
-    # TODO : estimate type
-
     new_value = functions.generate_value_with_same_type(target_value)
+    if isinstance(new_value, values.TensorValue) and isinstance(value_value, values.TensorValue):
+        new_value.shape = functions.broadcast_shapes(target_value.shape, value_value.shape)
     node_aug_assign.set_outputs([new_value])
     target.get_ref().revise(new_value)
 
@@ -412,6 +437,23 @@ def veval_ast_expr(astc : 'AstContext', local_field : 'values.Field', graph : 'G
     assert(isinstance(astc.nast, gast.gast.Expr))
     return veval_ast(astc.c(astc.nast.value), local_field, graph)
 
+def estimate_slice_shape(shape, slice_specs):
+    '''
+    estimate a shape of a sliced tensor
+    each of slice_specs is 1 (index), 0 (:) or 2, 3 (slice)
+    '''
+    if len(shape) < len(slice_specs):
+        return ()
+
+    ret = []
+    for dim, spec in zip(shape, slice_specs):
+        if spec == 0:
+            ret.append(dim)
+        elif spec != 1:
+            ret.append(-1)
+    ret.extend(shape[len(slice_specs):])
+    return tuple(ret)
+
 def veval_ast_subscript(astc : 'AstContext', local_field : 'values.Field', graph : 'Graph'):
     '''
     Ex. x[1], x[y,z]
@@ -466,6 +508,8 @@ def veval_ast_subscript(astc : 'AstContext', local_field : 'values.Field', graph
 
         node = nodes.NodeSlice(value_value, indices, [len(indices)])
         ret_value = functions.generate_value_with_same_type(value_value)
+        if isinstance(ret_value, values.TensorValue):
+            ret_value.shape = estimate_slice_shape(value_value.shape, [len(indices)])
         node.set_outputs([ret_value])
         graph.add_node(node)
         return values.ValueRef(ret_value)
@@ -486,6 +530,8 @@ def veval_ast_subscript(astc : 'AstContext', local_field : 'values.Field', graph
 
         node = nodes.NodeSlice(value_value, indices, slice_specs)
         ret_value = functions.generate_value_with_same_type(value_value)
+        if isinstance(ret_value, values.TensorValue):
+            ret_value.shape = estimate_slice_shape(value_value.shape, slice_specs)
         node.set_outputs([ret_value])
         graph.add_node(node)
         return values.ValueRef(ret_value)
@@ -525,6 +571,20 @@ def veval_ast_listcomp(astc : 'AstContext', local_field : 'values.Field', graph
             print('This for is not supported. in L.{}'.format(astc.lineno))
         return None
 
+    # unroll a list comprehension whose trip count is a small constant
+    unrolled_values = get_unrolled_values(iter_value, [astc.nast.elt])
+    if unrolled_values is not None:
+        local_field.get_attribute(internal_list_id).revise(list_obj)
+        append_value = list_obj.get_field().get_attribute('append').get_ref().get_value()
+        for target_value in unrolled_values:
+            target_value.name = target_name
+            local_field.get_attribute(target_name).revise(values.ValueRef(target_value))
+            elt = veval_ast(astc.c(astc.nast.elt), local_field, graph)
+            finput = functions.FunctionArgInput()
+            finput.inputs.append(try_get_ref(elt, 'listcomp', lineprop))
+            append_value.func.vcall(local_field.module, graph, list_obj, finput, lineprop)
+        return local_field.get_attribute(internal_list_id).get_ref()
+
     counter_value = values.NumberValue(None)
     counter_value.dtype = np.array(0).dtype
     counter_value.name = internal_counter_id
@@ -620,6 +680,9 @@ def veval_ast_listcomp(astc : 'AstContext', local_field : 'values.Field', graph
         if 'output_body_value' in v:
             body_graph.add_output_value(v['output_body_value'])
             output_value = functions.generate_value_with_same_type(v['output_body_value'])
+            if 'input_value' in v:
+                # a shape may be changed in each iteration
+                functions.merge_value_type(output_value, v['input_value'])
             outputs.append(output_value)
             if field.get_attribute(name).has_obj():
                 field.get_attribute(name).get_ref().revise(output_value)
@@ -835,6 +898,25 @@ def veval_ast_list(astc : 'AstContext', local_field : 'values.Field', graph : 'G
 
     return values.ValueRef(value)
 
+def get_unrolled_values(iter_value : 'values.Value', body):
+    '''
+    get values of a target if a for statement or a list comprehension should be unrolled, otherwise None
+    body is a list of ast nodes evaluated in each iteration
+    '''
+    if not isinstance(iter_value, values.RangeValue) or iter_value.constant_range is None:
+        return None
+
+    if len(iter_value.constant_range) > config.unroll_for_threshold:
+        return None
+
+    # return in a body cannot be unrolled
+    for nast_ in body:
+        for n in gast.walk(nast_):
+            if isinstance(n, gast.gast.Return):
+                return None
+
+    return [values.NumberValue(i) for i in iter_value.constant_range]
+
 def veval_ast_for(astc : 'AstContext', local_field : 'values.Field', graph : 'Graph'):
     '''
     for target in iter:
@@ -855,6 +937,17 @@ def veval_ast_for(astc : 'AstContext', local_field : 'values.Field', graph : 'Gr
             print('This for is not supported. in L.{}'.format(astc.lineno))
         return None
 
+    iter_value = try_get_value(iter_, 'for', lineprop)
+
+    # unroll a loop whose trip count is a small constant
+    unrolled_values = get_unrolled_values(iter_value, astc.nast.body)
+    if unrolled_values is not None:
+        for target_value in unrolled_values:
+            target_value.name = target_name
+            local_field.get_attribute(target_name).revise(values.ValueRef(target_value))
+            veval_ast(astc.c(astc.nast.body), local_field, graph)
+        return None
+
     for_guid = utils.get_guid()
     for_id = 'for_' + str(for_guid)
     body_id = 'body_' + str(for_guid)
@@ -872,8 +965,6 @@ def veval_ast_for(astc : 'AstContext', local_field : 'values.Field', graph : 'Gr
     cond_value = values.BoolValue(None)
     cond_value.name = 'for_cond_' + str(for_guid)
 
-    iter_value = try_get_value(iter_, 'for', lineprop)
-
     # create a node to lookup a value from sequence
     node_forgen = nodes.NodeForGenerator(counter_value, iter_value)
 
@@ -954,6 +1045,9 @@ def veval_ast_for(astc : 'AstContext', local_field : 'values.Field', graph : 'Gr
         if 'output_body_value' in v:
             body_graph.add_output_value(v['output_body_value'])
             output_value = functions.generate_value_with_same_type(v['output_body_value'])
+            if 'input_value' in v:
+                # a shape may be changed in each iteration
+                functions.merge_value_type(output_value, v['input_value'])
             outputs.append(output_value)
             if field.get_attribute(name).has_obj():
                 field.get_attribute(name).get_ref().revise(output_value)
@@ -972,86 +1066,75 @@ def veval_ast_for(astc : 'AstContext', local_field : 'values.Field', graph : 'Gr
 
     return None
 
-def veval_ast(astc : 'AstContext', local_field : 'values.Field', graph : 'Graph', option : 'VEvalOption' = None):
-    if isinstance(astc.nast, list):
-        ret = None
-        for nast_ in astc.nast:
-            ret = veval_ast(AstContext(nast_, astc.lineno_offset), local_field, graph)
-            if ret is not None:
-                break
-        return ret
-
-    elif isinstance(astc.nast, gast.gast.Assign):
-        veval_ast_assign(astc, local_field, graph)
-        return None
-
-    elif isinstance(astc.nast, gast.gast.Attribute):
-        ret = veval_ast_attribute(astc, local_field, graph, option)
-        return ret
-
-    elif isinstance(astc.nast, gast.gast.Call):
-        ret = veval_ast_call(astc, local_field, graph)
-        return ret
-
-    elif isinstance(astc.nast, gast.gast.BinOp):
-        ret = veval_ast_bin_op(astc, local_field, graph)
-        return ret
-
-    elif isinstance(astc.nast, gast.gast.UnaryOp):
-        ret = veval_ast_unary_op(astc, local_field, graph)
-        return ret
-
-    elif isinstance(astc.nast, gast.gast.Compare):
-        ret = veval_ast_compare(astc, local_field, graph)
-        return ret
-
-    elif isinstance(astc.nast, gast.gast.Return):
-        ret = veval_ast_return(astc, local_field, graph)
-        return ret
-
-    elif isinstance(astc.nast, gast.gast.Name):
-        ret = veval_ast_name(astc, local_field, graph, option)
-        return ret
-
-    elif isinstance(astc.nast, gast.gast.AugAssign):
-        veval_ast_aug_assign(astc, local_field, graph)
-
-    elif isinstance(astc.nast, gast.gast.Expr):
-        veval_ast_expr(astc, local_field, graph)
-
-    elif isinstance(astc.nast, gast.gast.Subscript):
-        return veval_ast_subscript(astc, local_field, graph)
+def veval_ast_stmts(astc : 'AstContext', local_field : 'values.Field', graph : 'Graph', option : 'VEvalOption' = None):
+    ret = None
+    for nast_ in astc.nast:
+        ret = veval_ast(AstContext(nast_, astc.lineno_offset), local_field, graph)
+        if ret is not None:
+            break
+    return ret
 
-    elif isinstance(astc.nast, gast.gast.ListComp):
-        return veval_ast_listcomp(astc, local_field, graph)
 
-    elif isinstance(astc.nast, gast.gast.If):
-        veval_ast_if(astc, local_field, graph)
+def wrap_statement(func):
+    '''
+    wrap a function which evaluates a statement so that it returns None
+    '''
+    def veval(astc, local_field, graph, option):
+        func(astc, local_field, graph)
         return None
+    return veval
+
+
+def wrap_expression(func):
+    def veval(astc, local_field, graph, option):
+        return func(astc, local_field, graph)
+    return veval
+
+
+def wrap_expression_with_option(func):
+    def veval(astc, local_field, graph, option):
+        return func(astc, local_field, graph, option)
+    return veval
+
+
+# a table from a type of an ast to a function to evaluate it
+veval_ast_functions = {
+    list: veval_ast_stmts,
+    gast.gast.Assign: wrap_statement(veval_ast_assign),
+    gast.gast.Attribute: wrap_expression_with_option(veval_ast_attribute),
+    gast.gast.Call: wrap_expression(veval_ast_call),
+    gast.gast.BinOp: wrap_expression(veval_ast_bin_op),
+    gast.gast.UnaryOp: wrap_expression(veval_ast_unary_op),
+    gast.gast.Compare: wrap_expression(veval_ast_compare),
+    gast.gast.Return: wrap_expression(veval_ast_return),
+    gast.gast.Name: wrap_expression_with_option(veval_ast_name),
+    gast.gast.AugAssign: wrap_statement(veval_ast_aug_assign),
+    gast.gast.Expr: wrap_statement(veval_ast_expr),
+    gast.gast.Subscript: wrap_expression(veval_ast_subscript),
+    gast.gast.ListComp: wrap_expression(veval_ast_listcomp),
+    gast.gast.If: wrap_statement(veval_ast_if),
+    gast.gast.Num: wrap_expression(veval_ast_num),
+    gast.gast.Str: wrap_expression(veval_ast_str),
+    gast.gast.NameConstant: wrap_expression(veval_ast_name_constant),
+    gast.gast.Tuple: wrap_expression_with_option(veval_ast_tuple),
+    gast.gast.List: wrap_expression(veval_ast_list),
+    gast.gast.For: wrap_statement(veval_ast_for),
+}
 
-    elif isinstance(astc.nast, gast.gast.Num):
-        ret = veval_ast_num(astc, local_field, graph)
-        return ret
-
-    elif isinstance(astc.nast, gast.gast.Str):
-        ret = veval_ast_str(astc, local_field, graph)
-        return ret
-
-    elif isinstance(astc.nast, gast.gast.NameConstant):
-        ret = veval_ast_name_constant(astc, local_field, graph)
-        return ret
 
-    elif isinstance(astc.nast, gast.gast.Tuple):
-        ret = veval_ast_tuple(astc, local_field, graph, option)
-        return ret
+def veval_ast(astc : 'AstContext', local_field : 'values.Field', graph : 'Graph', option : 'VEvalOption' = None):
+    func = veval_ast_functions.get(type(astc.nast))
+    if func is None:
+        # subclasses of supported types
+        for type_, func_ in veval_ast_functions.items():
+            if isinstance(astc.nast, type_):
+                func = func_
+                break
+        if func is not None:
+            veval_ast_functions[type(astc.nast)] = func
 
-    elif isinstance(astc.nast, gast.gast.List):
-        ret = veval_ast_list(astc, local_field, graph)
-        return ret
+    if func is not None:
+        return func(astc, local_field, graph, option)
 
-    elif isinstance(astc.nast, gast.gast.For):
-        veval_ast_for(astc, local_field, graph)
-        return None
-    else:
-        if config.show_warnings:
-            print('Unknown ast is found : {} in L.{}'.format(type(astc.nast),astc.lineno))
+    if config.show_warnings:
+        print('Unknown ast is found : {} in L.{}'.format(type(astc.nast),astc.lineno))
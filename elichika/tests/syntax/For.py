@@ -45,6 +45,15 @@ class D(chainer.Chain):
         return o
 
 
+class UnusedState(chainer.Chain):
+    def forward(self, x):
+        y = x * 2
+        for i in range(3):
+            x = x + i
+            y = y * 2
+        return x
+
+
 class UpdateSelf(chainer.Chain):
     def forward(self, x):
         self.x = x
@@ -125,6 +134,11 @@ def main():
 
     testtools.generate_testcase(D(), [], subname='leak')
 
+    onnx_model = testtools.generate_testcase(UnusedState(), [42],
+                                             subname='unused_state')
+    # `y` is not carried by the loop
+    assert testtools.count_nodes(onnx_model.graph, 'Mul') == 0
+
     testtools.generate_testcase(UpdateSelf(), [42], subname='update_self')
 
     testtools.generate_testcase(UpdateSelfLiteral(), [],
@@ -72,6 +72,18 @@ class DynamicCondAlias(chainer.Chain):
         return y
 
 
+class DynamicCondUnusedOutput(chainer.Chain):
+    def forward(self, x, cond):
+        y = x * 2
+        if cond:
+            x = x + 3
+            y = y * 2
+        else:
+            x = x + 10
+            y = y * 3
+        return x
+
+
 class UpdateSelf(chainer.Chain):
     def forward(self, x, cond):
         self.x = x
@@ -152,6 +164,13 @@ def main():
     testtools.generate_testcase(DynamicCondAlias(), [42, True],
                            subname='alias_true')
 
+    for cond in [False, True]:
+        onnx_model = testtools.generate_testcase(
+            DynamicCondUnusedOutput(), [42, cond],
+            subname='unused_output_%s' % str(cond).lower())
+        # `y` is not an output of the branches
+        assert testtools.count_nodes(onnx_model.graph, 'Mul') == 0
+
     testtools.generate_testcase(UpdateSelf(), [42, True],
                            subname='update_self_true')
     testtools.generate_testcase(UpdateSelf(), [42, False],
@@ -0,0 +1,54 @@
+# coding: utf-8
+
+import chainer
+import chainer.functions as F
+import chainer.links as L
+
+
+def scale(x, s):
+    return x * s
+
+
+class A(chainer.Chain):
+
+    def __init__(self):
+        super(A, self).__init__()
+        with self.init_scope():
+            self.l0 = L.Linear(4, 4)
+
+    def block(self, x):
+        return F.relu(self.l0(x)) + x
+
+    def forward(self, x):
+        h = self.block(x)
+        h = self.block(h)
+        h = self.block(h)
+        h = scale(h, 2.0) + scale(h, 3.0)
+        return h
+
+
+# ======================================
+
+import testtools
+import numpy as np
+
+from elichika.parser import functions
+
+
+def main():
+    np.random.seed(314)
+
+    model = A()
+
+    v = np.random.rand(3, 4).astype(np.float32)
+
+    hit = functions.recorded_call_stats['hit']
+    testtools.generate_testcase(model, [v])
+
+    # the second and the third blocks are cloned from the first one
+    # but scale is called with different constants
+    assert functions.recorded_call_stats['hit'] - hit == 2
+
+
+if __name__ == '__main__':
+    main()
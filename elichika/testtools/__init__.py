@@ -1 +1,2 @@
+from testtools.testcasegen import count_nodes
 from testtools.testcasegen import generate_testcase
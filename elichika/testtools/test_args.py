@@ -19,6 +19,15 @@ def get_test_args(args=None):
                         help='Show less messages.')
     parser.add_argument('--allow-unused-params', action='store_true',
                         help='Allow unused parameters.')
+    parser.add_argument('--npy', action='store_true',
+                        help='Also write test data in .npy files.')
+    parser.add_argument('--check-types', action='store_true',
+                        help='Check estimated shapes and dtypes of inputs '
+                        'and outputs against Chainer.')
+    parser.add_argument('--unroll-for', type=int, default=0,
+                        help='Unroll for statements and list comprehensions '
+                        'over range whose trip count is a constant up to '
+                        'this value.')
     _args_cache = parser.parse_args(args=args)
     return _args_cache
 
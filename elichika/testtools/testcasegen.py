@@ -6,24 +6,32 @@ import copy
 import glob
 import os
 import shutil
+import sys
 import types
 
 import numpy as np
 
 import chainer
 
-from elichika.chainer2onnx import compile_model
+from elichika.chainer2onnx import compile_model, save_model
 from elichika.onnx_converters import onnx_name
+import elichika.parser.config as config
 
 from testtools.test_args import get_test_args
 from testtools.test_args import dprint
 
 import onnx
 from onnx import numpy_helper
+from onnx import shape_inference
 from onnx import TensorProto
 
 from testtools.initializer import edit_onnx_protobuf
 
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))))
+sys.path.append(os.path.join(project_root, 'common'))
+import test_data_writer
+
 def _validate_inout(xs):
     # print(xs)
 
@@ -71,6 +79,7 @@ def dump_test_inputs_outputs(inputs, outputs, gradients, test_data_dir):
     if not os.path.exists(test_data_dir):
         os.makedirs(test_data_dir)
 
+    write_npy = get_test_args().npy
     for typ, values in [('input', inputs),
                         ('output', outputs),
                         ('gradient', gradients)]:
@@ -80,34 +89,141 @@ def dump_test_inputs_outputs(inputs, outputs, gradients, test_data_dir):
             else:
                 name = onnx_name(value_info)
             if isinstance(value, list):
-                assert value
-                digits = len(str(len(value)))
-                for j, v in enumerate(value):
-                    filename = os.path.join(
-                        test_data_dir,
-                        '%s_%d_%s.pb' % (typ, i, str(j).zfill(digits)))
-                    tensor = numpy_helper.from_array(v, name)
-                    with open(filename, 'wb') as f:
-                        f.write(tensor.SerializeToString())
+                test_data_writer.write_test_data(
+                    test_data_dir, typ, i, name, value, write_npy=write_npy)
 
                 #value_info.type.CopyFrom(onnx.TypeProto())
                 #sequence_type = value_info.type.sequence_type
                 #tensor_type = sequence_type.elem_type.tensor_type
                 #tensor_type.elem_type = tensor.data_type
             else:
-                filename = os.path.join(test_data_dir,
-                                        '%s_%d.pb' % (typ, i))
                 if value is None:
                     if get_test_args().allow_unused_params:
                         continue
                     raise RuntimeError('Unused parameter: %s' % name)
-                tensor = numpy_helper.from_array(value, name)
-                with open(filename, 'wb') as f:
-                    f.write(tensor.SerializeToString())
-
-                vi = onnx.helper.make_tensor_value_info(
-                    name, tensor.data_type, tensor.dims)
-                #value_info.CopyFrom(vi)
+                test_data_writer.write_test_data(
+                    test_data_dir, typ, i, name, value, write_npy=write_npy)
+
+
+def _check_value_info(value_info, value):
+    """Checks the type of `value_info` estimated by elichika."""
+    if isinstance(value, list):
+        if not value_info.type.HasField('sequence_type'):
+            raise RuntimeError('%s: a sequence is expected' % value_info.name)
+        tensor_type = value_info.type.sequence_type.elem_type.tensor_type
+        for v in value:
+            _check_tensor_type(value_info.name, tensor_type, v, False)
+    else:
+        if not value_info.type.HasField('tensor_type'):
+            raise RuntimeError('%s: a tensor is expected' % value_info.name)
+        _check_tensor_type(value_info.name, value_info.type.tensor_type,
+                           value, True)
+
+
+def _check_tensor_type(name, tensor_type, value, check_shape):
+    value = np.array(value)
+    # elichika uses float32 for float64 values unless float_restrict.
+    if not config.float_restrict and value.dtype == np.float64:
+        value = value.astype(np.float32)
+    dtype = onnx.mapping.NP_TYPE_TO_TENSOR_TYPE[value.dtype]
+    # UNDEFINED means elichika does not know the dtype.
+    if (tensor_type.elem_type != onnx.TensorProto.UNDEFINED and
+        tensor_type.elem_type != dtype):
+        raise RuntimeError('%s: dtype mismatch: estimated=%s actual=%s' %
+                           (name, tensor_type.elem_type, dtype))
+
+    if not check_shape or not tensor_type.HasField('shape'):
+        return
+    dims = [d.dim_value if d.HasField('dim_value') else None
+            for d in tensor_type.shape.dim]
+    if (len(dims) != value.ndim or
+        any(d is not None and d != s for d, s in zip(dims, value.shape))):
+        raise RuntimeError('%s: shape mismatch: estimated=%s actual=%s' %
+                           (name, dims, value.shape))
+
+
+def _check_inferred_type(value_info, inferred):
+    """Checks the type of `value_info` against ONNX's shape inference."""
+    if (not value_info.type.HasField('tensor_type') or
+        not inferred.type.HasField('tensor_type')):
+        return
+    tensor_type = value_info.type.tensor_type
+    inferred_type = inferred.type.tensor_type
+    if (tensor_type.elem_type != onnx.TensorProto.UNDEFINED and
+        inferred_type.elem_type != onnx.TensorProto.UNDEFINED and
+        tensor_type.elem_type != inferred_type.elem_type):
+        raise RuntimeError('%s: dtype mismatch: estimated=%s inferred=%s' %
+                           (value_info.name, tensor_type.elem_type,
+                            inferred_type.elem_type))
+
+    if not tensor_type.HasField('shape') or not inferred_type.HasField('shape'):
+        return
+    dims = [d.dim_value if d.HasField('dim_value') else None
+            for d in tensor_type.shape.dim]
+    inferred_dims = [d.dim_value if d.HasField('dim_value') else None
+                     for d in inferred_type.shape.dim]
+    if (len(dims) != len(inferred_dims) or
+        any(d is not None and i is not None and d != i
+            for d, i in zip(dims, inferred_dims))):
+        raise RuntimeError('%s: shape mismatch: estimated=%s inferred=%s' %
+                           (value_info.name, dims, inferred_dims))
+
+
+def _check_intermediate_types(onnx_graph, inferred_graph):
+    """Checks value_info of intermediate values in `onnx_graph`."""
+    inferred = {vi.name: vi for vi in inferred_graph.value_info}
+    for value_info in onnx_graph.value_info:
+        if value_info.name in inferred:
+            _check_inferred_type(value_info, inferred[value_info.name])
+
+    for node, inferred_node in zip(onnx_graph.node, inferred_graph.node):
+        for attr, inferred_attr in zip(node.attribute,
+                                       inferred_node.attribute):
+            if attr.type == onnx.AttributeProto.GRAPH:
+                _check_intermediate_types(attr.g, inferred_attr.g)
+
+
+def _strip_value_info(onnx_graph):
+    del onnx_graph.value_info[:]
+    # outputs are checked against Chainer's run
+    for value_info in onnx_graph.output:
+        if value_info.type.HasField('tensor_type'):
+            value_info.type.tensor_type.ClearField('shape')
+    for node in onnx_graph.node:
+        for attr in node.attribute:
+            if attr.type == onnx.AttributeProto.GRAPH:
+                _strip_value_info(attr.g)
+
+
+def check_types(onnx_model, inputs, outputs):
+    """Checks shapes and dtypes in `onnx_model` against Chainer's run.
+
+    Inputs and outputs are compared with values computed by Chainer.
+    Intermediate values are compared with types which ONNX's shape
+    inference derives from the inputs, where both of them are known.
+    """
+    onnx_graph = onnx_model.graph
+    for value_info, value in zip(onnx_graph.input, inputs):
+        _check_value_info(value_info, value)
+    for value_info, value in zip(onnx_graph.output, outputs):
+        _check_value_info(value_info, value)
+
+    stripped = copy.deepcopy(onnx_model)
+    _strip_value_info(stripped.graph)
+    inferred = shape_inference.infer_shapes(stripped)
+    _check_intermediate_types(onnx_graph, inferred.graph)
+
+
+def count_nodes(onnx_graph, op_type):
+    """Counts nodes of `op_type` in `onnx_graph` and its subgraphs."""
+    count = 0
+    for node in onnx_graph.node:
+        if node.op_type == op_type:
+            count += 1
+        for attr in node.attribute:
+            if attr.type == onnx.AttributeProto.GRAPH:
+                count += count_nodes(attr.g, op_type)
+    return count
 
 
 _seen_subnames = set()
@@ -122,9 +238,12 @@ def generate_testcase(model_or_model_gen, orig_xs,
                       subname=None, output_dir=None,
                       backprop=False):
     xs = copy.deepcopy(orig_xs)
+    types_checked = False
     if output_dir is None:
         args = get_test_args()
         output_dir = args.output
+        types_checked = args.check_types
+        config.unroll_for_threshold = args.unroll_for
 
         if backprop:
             output_dir = output_dir + '_backprop'
@@ -156,7 +275,7 @@ def generate_testcase(model_or_model_gen, orig_xs,
     chainer_out = validate_chainer_output(ys)
 
     model = get_model()
-    onnxmod = compile_model(model, xs)
+    onnxmod = compile_model(model, xs, reference_params=True)
     input_tensors = onnxmod.inputs
     output_tensors = onnxmod.outputs
 
@@ -180,11 +299,14 @@ def generate_testcase(model_or_model_gen, orig_xs,
 
     xs = list(map(lambda x: _validate_inout(x), orig_xs))
 
+    if types_checked:
+        check_types(onnxmod.model, xs, chainer_out)
+
     dump_test_inputs_outputs(
         list(zip(input_tensors, xs)),
         outputs,
         gradients,
         os.path.join(output_dir, 'test_data_set_0'))
 
-    with open(os.path.join(output_dir, 'model.onnx'), 'wb') as fp:
-        fp.write(onnxmod.model.SerializeToString())
+    save_model(os.path.join(output_dir, 'model.onnx'), onnxmod)
+    return onnxmod.model
@@ -21,6 +21,7 @@
 #include <compiler/subgraph_canonicalizer.h>
 #include <compiler/xcvm/emitter.h>
 #include <runtime/chrome_tracing.h>
+#include <runtime/npy.h>
 #include <runtime/xcvm.h>
 #include <runtime/xcvm.pb.h>
 #include <runtime/xcvm_var.h>
@@ -317,6 +318,10 @@ VarPtr CreateValueFromSequence(const std::vector<VarPtr>& seq) {
     return var;
 }
 
+ArrayBodyPtr LoadNpy(const std::string& filename) {
+    return chainerx::internal::GetArrayBody(runtime::LoadNpy(filename));
+}
+
 }  // namespace
 
 PYBIND11_MODULE(chainer_compiler_core, m) {  // NOLINT
@@ -333,6 +338,7 @@ PYBIND11_MODULE(chainer_compiler_core, m) {  // NOLINT
     m.def("load", &LoadGraph, "Load an ONNX model");
     m.def("value", &CreateValueFromArray, "Create an XCVMVar from a ChainerX Array");
     m.def("value", &CreateValueFromSequence, "Create an XCVMVar from a sequence of XCVMVars");
+    m.def("load_npy", &LoadNpy, "Load a ChainerX Array from a memory-mapped .npy file");
 }
 
 }  // namespace chainer_compiler
@@ -140,3 +140,11 @@ def test_custom_op():
 
     chainerx.testing.assert_allclose(9, outputs['y'].array())
     chainerx.testing.assert_allclose(42, outputs['z'].array())
+
+
+def test_load_npy(tmpdir):
+    a = np.arange(24).reshape(2, 3, 4).astype(np.float32)
+    filename = str(tmpdir.join('a.npy'))
+    np.save(filename, a)
+    chainerx.testing.assert_array_equal(
+        chainerx.array(a), chainer_compiler_core.load_npy(filename))
@@ -1,8 +1,16 @@
 #include "runtime/npy.h"
 
+#include <errno.h>
+#include <fcntl.h>
 #include <stdio.h>
+#include <string.h>
+#include <sys/mman.h>
+#include <sys/stat.h>
+#include <unistd.h>
 
 #include <chainerx/array.h>
+#include <chainerx/native/native_backend.h>
+#include <chainerx/routines/creation.h>
 
 #include <common/log.h>
 #include <common/strutil.h>
@@ -72,5 +80,89 @@ void SaveNpy(const chainerx::Array& orig_a, const std::string& filename) {
     fclose(fp);
 }
 
+namespace {
+
+chainerx::Dtype DtypeFromNpyDescr(const std::string& descr, const std::string& filename) {
+    if (descr == "|b1") return chainerx::Dtype::kBool;
+    if (descr == "|i1") return chainerx::Dtype::kInt8;
+    if (descr == "<i2") return chainerx::Dtype::kInt16;
+    if (descr == "<i4") return chainerx::Dtype::kInt32;
+    if (descr == "<i8") return chainerx::Dtype::kInt64;
+    if (descr == "|u1") return chainerx::Dtype::kUInt8;
+    if (descr == "<f2") return chainerx::Dtype::kFloat16;
+    if (descr == "<f4") return chainerx::Dtype::kFloat32;
+    if (descr == "<f8") return chainerx::Dtype::kFloat64;
+    CHECK(false) << "Unsupported dtype " << descr << " in " << filename;
+}
+
+// Returns the value of `key` in the header dict of a .npy file.
+std::string FindNpyHeaderValue(const std::string& header, const std::string& key, const std::string& filename) {
+    size_t found = header.find("'" + key + "'");
+    CHECK_NE(std::string::npos, found) << "No " << key << " in the header of " << filename;
+    found = header.find(':', found);
+    CHECK_NE(std::string::npos, found) << "Broken header: " << filename;
+    size_t start = header.find_first_not_of(' ', found + 1);
+    CHECK_NE(std::string::npos, start) << "Broken header: " << filename;
+    size_t end;
+    if (header[start] == '\'') {
+        end = header.find('\'', start + 1);
+        CHECK_NE(std::string::npos, end) << "Broken header: " << filename;
+        return header.substr(start + 1, end - start - 1);
+    }
+    if (header[start] == '(') {
+        end = header.find(')', start);
+        CHECK_NE(std::string::npos, end) << "Broken header: " << filename;
+        return header.substr(start + 1, end - start - 1);
+    }
+    end = header.find_first_of(",}", start);
+    CHECK_NE(std::string::npos, end) << "Broken header: " << filename;
+    return header.substr(start, end - start);
+}
+
+}  // namespace
+
+chainerx::Array LoadNpy(const std::string& filename) {
+    int fd = open(filename.c_str(), O_RDONLY);
+    CHECK_LE(0, fd) << "Failed to open: " << filename << ": " << strerror(errno);
+    struct stat st;
+    CHECK_EQ(0, fstat(fd, &st)) << "Failed to stat: " << filename << ": " << strerror(errno);
+    const size_t file_size = st.st_size;
+    CHECK_LT(10, file_size) << "Too small for .npy: " << filename;
+    // The mapping is private so arrays can be modified in place.
+    void* addr = mmap(nullptr, file_size, PROT_READ | PROT_WRITE, MAP_PRIVATE, fd, 0);
+    CHECK_NE(MAP_FAILED, addr) << "Failed to mmap: " << filename << ": " << strerror(errno);
+    close(fd);
+    std::shared_ptr<void> data(addr, [file_size](void* p) { munmap(p, file_size); });
+
+    const uint8_t* bytes = static_cast<const uint8_t*>(addr);
+    CHECK_EQ(0, memcmp(bytes, "\x93NUMPY", 6)) << "Not a .npy file: " << filename;
+    size_t header_offset;
+    size_t header_size;
+    if (bytes[6] == 1) {
+        header_offset = 10;
+        header_size = bytes[8] | bytes[9] << 8;
+    } else {
+        CHECK_LT(12, file_size) << "Too small for .npy: " << filename;
+        header_offset = 12;
+        header_size = bytes[8] | bytes[9] << 8 | bytes[10] << 16 | static_cast<size_t>(bytes[11]) << 24;
+    }
+    const size_t data_offset = header_offset + header_size;
+    CHECK_LE(data_offset, file_size) << "Broken header: " << filename;
+    const std::string header(reinterpret_cast<const char*>(bytes + header_offset), header_size);
+
+    chainerx::Dtype dtype = DtypeFromNpyDescr(FindNpyHeaderValue(header, "descr", filename), filename);
+    CHECK_EQ("False", FindNpyHeaderValue(header, "fortran_order", filename)) << "Fortran order is not supported: " << filename;
+    chainerx::Shape shape;
+    for (const std::string& dim : SplitString(FindNpyHeaderValue(header, "shape", filename), ",")) {
+        size_t start = dim.find_first_not_of(' ');
+        if (start == std::string::npos) continue;
+        shape.push_back(std::stoll(dim.substr(start)));
+    }
+
+    const size_t nbytes = chainerx::GetItemSize(dtype) * shape.GetTotalSize();
+    CHECK_LE(data_offset + nbytes, file_size) << "Truncated .npy file: " << filename;
+    return chainerx::FromData(shape, dtype, data, nonstd::nullopt /* strides */, data_offset, chainerx::GetNativeBackend().GetDevice(0));
+}
+
 }  // namespace runtime
 }  // namespace chainer_compiler
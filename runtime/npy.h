@@ -9,5 +9,10 @@ namespace runtime {
 
 void SaveNpy(const chainerx::Array& a, const std::string& filename);
 
+// Loads an array from a .npy file. The file is memory-mapped and the
+// returned native array refers to the mapping without a copy. Writes
+// to the array are not reflected to the file.
+chainerx::Array LoadNpy(const std::string& filename);
+
 }  // namespace runtime
 }  // namespace chainer_compiler
@@ -38,6 +38,25 @@ TEST(NpyTest, SaveNpy) {
     EXPECT_EQ(expected, actual);
 }
 
+TEST(NpyTest, LoadNpy) {
+    chainerx::Context ctx;
+    chainerx::ContextScope ctx_scope(ctx);
+
+    chainerx::Array a = chainerx::Arange(6, chainerx::Dtype::kFloat32).Reshape({2, 3});
+    SaveNpy(a, "out/t_load.npy");
+    chainerx::Array b = LoadNpy("out/t_load.npy");
+    EXPECT_EQ(a.dtype(), b.dtype());
+    EXPECT_EQ(a.shape(), b.shape());
+    EXPECT_EQ(a.ToString(), b.ToString());
+
+    chainerx::Array s = chainerx::Full({}, 42, chainerx::Dtype::kInt64);
+    SaveNpy(s, "out/t_load.npy");
+    chainerx::Array t = LoadNpy("out/t_load.npy");
+    EXPECT_EQ(chainerx::Dtype::kInt64, t.dtype());
+    EXPECT_EQ(chainerx::Shape({}), t.shape());
+    EXPECT_EQ(42, static_cast<int64_t>(chainerx::AsScalar(t)));
+}
+
 }  // namespace
 }  // namespace runtime
 }  // namespace chainer_compiler
@@ -99,6 +99,7 @@ XCVMOptions::XCVMOptions() {
 
 XCVM::XCVM(const XCProgramProto& program) {
     num_variables_ = 0;
+    arena_size_ = program.arena_size();
     for (const XCInstructionProto& inst : program.instructions()) {
         for (int output : inst.outputs()) {
             num_variables_ = std::max(num_variables_, output + 1);
@@ -148,7 +149,7 @@ InOuts XCVM::Run(const InOuts& program_inputs, const XCVMOptions& options) {
 void XCVM::Run(XCVMState* state) {
     state->SetProgram(&program_);
     const XCVMOptions& options = state->options();
-    int64_t peak_used_mbs = 0, peak_total_mbs = 0;
+    int64_t peak_used_bytes = 0, peak_total_mbs = 0;
 
     while (true) {
         int pc = state->pc();
@@ -183,8 +184,9 @@ void XCVM::Run(XCVMState* state) {
         }
 
         if (options.dump_memory_usage) {
-            int64_t used_mbs = InMbs(state->GetTotalVariableSize());
-            peak_used_mbs = std::max(used_mbs, peak_used_mbs);
+            int64_t used_bytes = state->GetTotalVariableSize();
+            peak_used_bytes = std::max(used_bytes, peak_used_bytes);
+            int64_t used_mbs = InMbs(used_bytes);
             std::string report = StrCat(" Memory usage=", used_mbs, "MB");
             if (options.base_memory_usage >= 0) {
                 int64_t total_mbs = InMbs(options.base_memory_usage - GetMemoryUsageInBytes());
@@ -197,10 +199,14 @@ void XCVM::Run(XCVMState* state) {
 
     if (options.dump_memory_usage) {
         state->ShowVariableStatus();
-        std::string report = StrCat("Peak memory usage=", peak_used_mbs, "MB");
+        peak_memory_usage_ = peak_used_bytes;
+        std::string report = StrCat("Peak memory usage=", InMbs(peak_used_bytes), "MB");
         if (options.base_memory_usage >= 0) {
             report = StrCat(report, " allocated=", peak_total_mbs, "MB");
         }
+        if (arena_size_ > 0) {
+            report = StrCat(report, " planned=", InMbs(arena_size_), "MB");
+        }
         std::cerr << report << std::endl;
     }
 }
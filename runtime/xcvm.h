@@ -70,6 +70,16 @@ public:
         return num_variables_;
     }
 
+    int64_t arena_size() const {
+        return arena_size_;
+    }
+
+    // The peak size of variables observed in the last `Run` with
+    // `dump_memory_usage`.
+    int64_t peak_memory_usage() const {
+        return peak_memory_usage_;
+    }
+
 private:
     XCVM(const XCVM&) = delete;
     XCVM& operator=(const XCVM&) = delete;
@@ -77,6 +87,8 @@ private:
     std::vector<std::unique_ptr<XCVMOp>> program_;
     std::vector<std::unique_ptr<XCVMInputDesc>> input_descs_;
     int num_variables_;
+    int64_t arena_size_;
+    int64_t peak_memory_usage_{0};
 };
 
 }  // namespace runtime
@@ -41,6 +41,29 @@ TEST(XCVMTest, Run) {
     EXPECT_TRUE(chainerx::AllClose(e, outputs["out"]->GetArray(), 0, 0));
 }
 
+TEST(XCVMTest, PeakMemoryUsage) {
+    chainerx::Context ctx;
+    chainerx::ContextScope ctx_scope(ctx);
+
+    XCProgramProto program;
+    xcvm::AddInOp(&program, xcvm::XCVMValue(0), "in1");
+    xcvm::AddInOp(&program, xcvm::XCVMValue(1), "in2");
+    xcvm::AddAddOp(&program, xcvm::XCVMValue(2), 0, 1);
+    xcvm::AddOutOp(&program, "out", 2);
+
+    XCVM xcvm(program);
+    InOuts inputs;
+    chainerx::Array in1 = chainerx::Eye(2, nonstd::nullopt, nonstd::nullopt, chainerx::Dtype::kFloat32);
+    inputs.emplace("in1", std::shared_ptr<XCVMVar>(new XCVMVar(in1)));
+    inputs.emplace("in2", std::shared_ptr<XCVMVar>(new XCVMVar(chainerx::OnesLike(in1))));
+    XCVMOptions options;
+    options.dump_memory_usage = true;
+    options.base_memory_usage = -1;
+    xcvm.Run(inputs, options);
+    // Two inputs and the sum are alive after Add.
+    EXPECT_EQ(3 * 2 * 2 * 4, xcvm.peak_memory_usage());
+}
+
 }  // namespace
 }  // namespace runtime
 }  // namespace chainer_compiler
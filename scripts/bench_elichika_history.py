@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+#
+# Measures how the parser of elichika scales with the number of links
+# in a model when `forward` has deeply nested control flow. Each `for`
+# and `if` pushes a history in `elichika.parser.values`.
+#
+# Usage:
+#
+# $ ./scripts/bench_elichika_history.py --links 10 100 1000
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'elichika'))
+
+import chainer
+import chainer.functions as F
+import chainer.links as L
+import numpy as np
+
+import elichika
+
+
+class NestedControlFlow(chainer.Chain):
+
+    def __init__(self, num_links, n_units):
+        super(NestedControlFlow, self).__init__()
+        with self.init_scope():
+            self.l0 = L.Linear(n_units, n_units)
+            self.l1 = L.Linear(n_units, n_units)
+            # Links which are not used in `forward` but registered
+            # as fields during parsing.
+            for i in range(num_links):
+                setattr(self, 'unused%d' % i, L.Linear(n_units, n_units))
+
+    def forward(self, x, n):
+        h = x
+        for i in range(n):
+            if i == 0:
+                h = self.l0(h)
+            else:
+                h = F.relu(h)
+            for j in range(n):
+                if j == 1:
+                    h = self.l1(h)
+                else:
+                    h = h * 2
+                for k in range(n):
+                    if k == 2:
+                        h = h + x
+                    else:
+                        h = h * 2
+                    for l in range(n):
+                        if l == 3:
+                            h = h + x
+                        else:
+                            h = h * 2
+        return h
+
+
+def bench(num_links, n_units, iterations):
+    model = NestedControlFlow(num_links, n_units)
+    x = np.random.rand(1, n_units).astype(np.float32)
+    st = time.time()
+    for _ in range(iterations):
+        elichika.compile_model(model, [x, 4])
+    return (time.time() - st) * 1000 / iterations
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Benchmark of nested control flow in elichika')
+    parser.add_argument('--links', type=int, nargs='+',
+                        default=[10, 100, 1000])
+    parser.add_argument('--units', type=int, default=8)
+    parser.add_argument('--iterations', type=int, default=3)
+    args = parser.parse_args()
+
+    for num_links in args.links:
+        elapsed = bench(num_links, args.units, args.iterations)
+        print('%d links: %.1f msec' % (num_links, elapsed))
+
+
+if __name__ == '__main__':
+    main()
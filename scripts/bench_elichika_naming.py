@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+#
+# Measures how ONNX name assignment in elichika scales with the number
+# of values in a graph.
+#
+# Usage:
+#
+# $ ./scripts/bench_elichika_naming.py --sizes 10000 30000 100000
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'elichika'))
+
+import elichika.onnx_converters as oc
+
+
+def gen_base_names(num_values, num_bases):
+    # Models reuse a small number of variable names (`h`, `x`, ...)
+    # at many lines so names collide a lot.
+    return ['h_%d' % (i % num_bases) for i in range(num_values)]
+
+
+def bench(num_values, num_bases):
+    base_names = gen_base_names(num_values, num_bases)
+    oc.assigned_names.clear()
+    st = time.time()
+    names = [oc.generate_onnx_name(n) for n in base_names]
+    elapsed = (time.time() - st) * 1000
+    assert len(set(names)) == len(names)
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Benchmark of ONNX naming in elichika')
+    parser.add_argument('--sizes', type=int, nargs='+',
+                        default=[10000, 30000, 100000])
+    parser.add_argument('--bases', type=int, default=100,
+                        help='The number of distinct base names')
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        elapsed = bench(size, args.bases)
+        print('%d values: %.1f msec (%.3f usec/value)' %
+              (size, elapsed, elapsed * 1000 / size))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+#
+# Measures the time and the peak memory elichika takes to translate
+# the models of elichika tests. Test cases are not written.
+#
+# Usage:
+#
+# $ ./scripts/bench_elichika_translation.py
+# $ ./scripts/bench_elichika_translation.py elichika/tests/model/MLP.py
+# $ ./scripts/bench_elichika_translation.py --unroll-for 8 elichika/tests/syntax/For.py
+
+import argparse
+import copy
+import glob
+import importlib.util
+import os
+import sys
+import time
+import tracemalloc
+import types
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(os.path.join(project_root, 'elichika'))
+
+import elichika
+from elichika.parser import config
+import testtools
+
+
+def collect_models(test_file):
+    """Runs `main` of a test and returns its (name, model, inputs)."""
+    models = []
+
+    def generate_testcase(model_or_model_gen, xs, subname=None, **kwargs):
+        if kwargs.get('backprop'):
+            return
+        model = model_or_model_gen
+        if isinstance(model, (type, types.FunctionType)):
+            model = model_or_model_gen()
+        # Initializes lazy parameters as testcasegen does.
+        model(*copy.deepcopy(xs))
+        name = os.path.splitext(os.path.basename(test_file))[0]
+        if subname is not None:
+            name += '_' + subname
+        models.append((name, model, xs))
+
+    orig_generate_testcase = testtools.generate_testcase
+    testtools.generate_testcase = generate_testcase
+    try:
+        spec = importlib.util.spec_from_file_location(
+            'bench_' + os.path.basename(test_file)[:-3], test_file)
+        module = importlib.util.module_from_spec(spec)
+        # elichika looks up the module of a model in sys.modules.
+        sys.modules[spec.name] = module
+        spec.loader.exec_module(module)
+        module.main()
+    finally:
+        testtools.generate_testcase = orig_generate_testcase
+    return models
+
+
+def bench(model, xs, iterations):
+    elapsed = []
+    for _ in range(iterations):
+        inputs = copy.deepcopy(xs)
+        st = time.time()
+        elichika.compile_model(model, inputs)
+        elapsed.append(time.time() - st)
+
+    tracemalloc.start()
+    elichika.compile_model(model, copy.deepcopy(xs))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return min(elapsed) * 1000, peak / 1024 / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Benchmark of translation by elichika')
+    parser.add_argument('tests', nargs='*',
+                        help='Test scripts (default: elichika model tests)')
+    parser.add_argument('--iterations', type=int, default=3)
+    parser.add_argument('--unroll-for', type=int, default=0,
+                        help='Unroll for statements and list comprehensions '
+                        'whose trip count is a constant up to this value')
+    args = parser.parse_args()
+    config.unroll_for_threshold = args.unroll_for
+
+    tests = args.tests
+    if not tests:
+        tests = sorted(glob.glob(os.path.join(
+            project_root, 'elichika', 'tests', 'model', '*.py')))
+
+    total_elapsed = 0
+    for test in tests:
+        for name, model, xs in collect_models(test):
+            try:
+                elapsed, peak = bench(model, xs, args.iterations)
+            except Exception as e:
+                print('%s: failed (%s)' % (name, type(e).__name__))
+                continue
+            total_elapsed += elapsed
+            print('%s: %.1f msec, peak %.1f MB' % (name, elapsed, peak))
+    print('Total: %.1f msec' % total_elapsed)
+
+
+if __name__ == '__main__':
+    main()
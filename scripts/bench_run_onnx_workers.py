@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+#
+# Compares the time to run tests by launching run_onnx for each test
+# against running them in `run_onnx --worker` processes, which is what
+# `runtests.py --use_workers` does.
+#
+# Usage:
+#
+# $ ./scripts/bench_run_onnx_workers.py
+# $ ./scripts/bench_run_onnx_workers.py -j 4 'third_party/onnx/onnx/backend/test/data/node/test_add*'
+
+import argparse
+import glob
+import multiprocessing
+import os
+import subprocess
+import tempfile
+import threading
+import time
+
+
+def run_per_process(run_onnx, test_dirs, jobs, log_dir):
+    procs = []
+    failed = 0
+    for i, test_dir in enumerate(test_dirs):
+        if len(procs) >= jobs:
+            failed += procs.pop(0).wait() != 0
+        with open(os.path.join(log_dir, '%d.txt' % i), 'wb') as log:
+            procs.append(subprocess.Popen([run_onnx, '--test', test_dir],
+                                          stdout=log, stderr=log))
+    for proc in procs:
+        failed += proc.wait() != 0
+    return failed
+
+
+def run_with_workers(run_onnx, test_dirs, jobs, log_dir):
+    test_dirs = list(enumerate(test_dirs))
+    lock = threading.Lock()
+    failed = [0]
+
+    def run_worker():
+        proc = None
+        while True:
+            with lock:
+                if not test_dirs:
+                    break
+                i, test_dir = test_dirs.pop(0)
+            if proc is None:
+                proc = subprocess.Popen([run_onnx, '--worker'],
+                                        stdin=subprocess.PIPE,
+                                        stdout=subprocess.PIPE)
+            log = os.path.join(log_dir, '%d.txt' % i)
+            proc.stdin.write(('%s\t--test\t%s\n' % (log, test_dir)).encode())
+            proc.stdin.flush()
+            if proc.stdout.readline() != b'OK\n':
+                proc.wait()
+                proc = None
+                with lock:
+                    failed[0] += 1
+        if proc is not None:
+            proc.stdin.close()
+            proc.wait()
+
+    threads = [threading.Thread(target=run_worker) for _ in range(jobs)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return failed[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Benchmark of the worker mode of run_onnx')
+    parser.add_argument('tests', nargs='*',
+                        default=['third_party/onnx/onnx/backend/test/data/'
+                                 'node/*'],
+                        help='Globs of test directories')
+    parser.add_argument('--run_onnx', default='build/tools/run_onnx')
+    parser.add_argument('--jobs', '-j', type=int,
+                        default=multiprocessing.cpu_count())
+    args = parser.parse_args()
+
+    test_dirs = []
+    for pattern in args.tests:
+        test_dirs += sorted(d for d in glob.glob(pattern)
+                            if os.path.exists(os.path.join(d, 'model.onnx')))
+    print('%d tests with %d jobs' % (len(test_dirs), args.jobs))
+
+    for name, fn in [('per-process', run_per_process),
+                     ('workers', run_with_workers)]:
+        with tempfile.TemporaryDirectory() as log_dir:
+            start = time.time()
+            failed = fn(args.run_onnx, test_dirs, args.jobs, log_dir)
+            elapsed = time.time() - start
+        print('%s: %.2f sec (%d failed)' % (name, elapsed, failed))
+
+
+if __name__ == '__main__':
+    main()
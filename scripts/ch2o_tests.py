@@ -1,5 +1,9 @@
+import argparse
 import glob
 import os
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
 
 from test_case import TestCase
 
@@ -54,6 +58,7 @@ Vstack
 '''.split()
 
 SYNTAX_TESTS = '''
+ChainListLoop
 Cmp
 For
 ForAndIf
@@ -63,6 +68,7 @@ ListComp
 MultiClass
 MultiFunction
 Range
+RepeatedLink
 Sequence
 Slice
 UserDefinedFunc
@@ -80,6 +86,10 @@ MLP_with_loss
 StatelessLSTM
 '''.split()
 
+CATEGORIES = [('model', MODEL_TESTS),
+              ('node', NODE_TESTS),
+              ('syntax', SYNTAX_TESTS)]
+
 
 def get():
     tests = []
@@ -94,9 +104,7 @@ def get():
         'node_Linear'
     ]
 
-    for category, names in [('model', MODEL_TESTS),
-                            ('node', NODE_TESTS),
-                            ('syntax', SYNTAX_TESTS)]:
+    for category, names in CATEGORIES:
         for name in names:
             test_name = 'ch2o_%s_%s' % (category, name)
             kwargs = {}
@@ -124,3 +132,37 @@ def get():
                                           **kwargs))
 
     return tests
+
+
+def generate_test(category, name, args=None):
+    source_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    py = os.path.join(source_dir, 'ch2o', 'tests', category, name + '.py')
+    out_dir = os.path.join(source_dir, 'out', 'ch2o_%s_%s' % (category, name))
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.path.join(source_dir, 'ch2o')
+    # Each test runs in its own process as it does in CMake, so global
+    # states of ch2o are not shared among tests.
+    return subprocess.call([sys.executable, py, out_dir] + (args or []), env=env)
+
+
+def generate_tests(categories, args=None, jobs=1):
+    tests = [(category, name)
+             for category, names in CATEGORIES if category in categories
+             for name in names]
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        results = executor.map(lambda t: generate_test(*t, args=args), tests)
+        failed = ['%s_%s' % t for t, r in zip(tests, results) if r]
+    if failed:
+        raise RuntimeError('Failed to generate: %s' % ' '.join(failed))
+
+
+if __name__ == '__main__':
+    # e.g., python3 scripts/ch2o_tests.py -j 4 node syntax
+    parser = argparse.ArgumentParser(
+        description='Generate test cases of ch2o in parallel')
+    parser.add_argument('categories', nargs='*',
+                        default=[c for c, _ in CATEGORIES])
+    parser.add_argument('--jobs', '-j', type=int, default=1)
+    args, testcasegen_args = parser.parse_known_args()
+    generate_tests(args.categories, testcasegen_args or ['--quiet'],
+                   jobs=args.jobs)
@@ -3,8 +3,10 @@
 # This file is included by CMakeLists.txt.
 #[[
 
+import argparse
 import importlib
 import glob
+import multiprocessing
 import os
 import subprocess
 import sys
@@ -13,11 +15,16 @@ from test_case import TestCase
 
 
 class Generator(object):
-    def __init__(self, dirname, filename, fail=False):
+    def __init__(self, dirname, filename, fail=False, variant=None, args=None):
         self.dirname = dirname
         self.category = dirname.replace('/', '_')
+        if variant is not None:
+            # e.g., elichika_syntax_unrolled_For
+            self.category += '_' + variant
         self.filename = filename
         self.fail = True
+        # extra arguments for testcasegen
+        self.args = args or []
 
 
 TESTS = [
@@ -60,13 +67,17 @@ TESTS = [
     Generator('syntax', 'Alias'),
     Generator('syntax', 'Cmp'),
     Generator('syntax', 'For'),
+    Generator('syntax', 'For', variant='unrolled', args=['--unroll-for', '8']),
     Generator('syntax', 'ForAndIf'),
     Generator('syntax', 'If'),
     Generator('syntax', 'LinkInFor'),
     Generator('syntax', 'ListComp'),
+    Generator('syntax', 'ListComp', variant='unrolled',
+              args=['--unroll-for', '8']),
     Generator('syntax', 'MultiClass'),
     Generator('syntax', 'MultiFunction'),
     Generator('syntax', 'Range'),
+    Generator('syntax', 'RepeatedCall'),
     Generator('syntax', 'Sequence'),
     Generator('syntax', 'Slice'),
     Generator('syntax', 'UserDefinedFunc'),
@@ -81,8 +92,9 @@ def get_test_generators(dirname):
 def print_test_generators(dirname):
     tests = []
     for gen in get_test_generators(dirname):
-        tests.append(
-            os.path.join('elichika/tests', gen.dirname, gen.filename + '.py'))
+        test = os.path.join('elichika/tests', gen.dirname, gen.filename + '.py')
+        if test not in tests:
+            tests.append(test)
     print(';'.join(tests))
 
 
@@ -90,17 +102,34 @@ def get_source_dir():
     return os.path.dirname(os.path.dirname(sys.argv[0]))
 
 
-def generate_tests(dirname):
+def generate_test(gen, args=None):
     from testtools import testcasegen
 
-    for gen in get_test_generators(dirname):
-        py = os.path.join('tests', gen.dirname, gen.filename)
-        out_dir = os.path.join(get_source_dir(), 'out', 'elichika_%s_%s' %
-                               (gen.category, gen.filename))
-        print('Running %s' % py)
-        module = importlib.import_module(py.replace('/', '.'))
-        testcasegen.reset_test_generator([out_dir])
-        module.main()
+    py = os.path.join('tests', gen.dirname, gen.filename)
+    out_dir = os.path.join(get_source_dir(), 'out', 'elichika_%s_%s' %
+                           (gen.category, gen.filename))
+    print('Running %s' % py)
+    module = importlib.import_module(py.replace('/', '.'))
+    testcasegen.reset_test_generator([out_dir] + gen.args + (args or []))
+    module.main()
+
+
+def _generate_test(gen_and_args):
+    generate_test(*gen_and_args)
+
+
+def generate_tests(dirname, args=None, jobs=1):
+    gens = get_test_generators(dirname)
+    if jobs <= 1:
+        for gen in gens:
+            generate_test(gen, args)
+        return
+
+    # Each generator runs in a fresh process so global states of
+    # testcasegen and elichika (e.g., seen subnames, fields and guids)
+    # are not shared among tests.
+    with multiprocessing.Pool(jobs, maxtasksperchild=1) as pool:
+        pool.map(_generate_test, [(gen, args) for gen in gens], chunksize=1)
 
 
 def get():
@@ -145,7 +174,11 @@ if __name__ == '__main__':
     if sys.argv[1] == '--list':
         print_test_generators(sys.argv[2])
     elif sys.argv[1] == '--generate':
-        generate_tests(sys.argv[2])
+        # e.g., --generate syntax -j 4 --check-types
+        parser = argparse.ArgumentParser()
+        parser.add_argument('--jobs', '-j', type=int, default=1)
+        args, testcasegen_args = parser.parse_known_args(sys.argv[3:])
+        generate_tests(sys.argv[2], testcasegen_args, jobs=args.jobs)
     else:
         raise RuntimeError('See %s for the usage' % sys.argv[0])
 
@@ -1,9 +1,13 @@
 #!/usr/bin/env python3
 
+import argparse
+
 import chainer
 import numpy as np
 import onnx_chainer
 
+import gen_util
+
 
 class AnyModel(chainer.Chain):
     def __init__(self, fn, params):
@@ -28,11 +32,12 @@ def create_backprop_test(test_name, fn, dtype=np.float32, **kwargs):
     model = AnyModel(fn, params)
 
     chainer.disable_experimental_feature_warning = True
-    onnx_chainer.export_testcase(model,
-                                 (),
-                                 test_dir,
-                                 output_grad=True,
-                                 output_names='loss')
+    with gen_util.staged_dir(test_dir) as tmp_dir:
+        onnx_chainer.export_testcase(model,
+                                     (),
+                                     tmp_dir,
+                                     output_grad=True,
+                                     output_names='loss')
 
 
 class BackpropTest(object):
@@ -145,8 +150,13 @@ def get_backprop_tests():
 
 
 def main():
-    for test in get_backprop_tests():
-        test.generate()
+    parser = argparse.ArgumentParser(
+        description='Generate backprop tests by onnx_chainer')
+    parser.add_argument('--jobs', '-j', type=int, default=1)
+    args = parser.parse_args()
+
+    generators = [test.generate for test in get_backprop_tests()]
+    gen_util.run_generators(generators, jobs=args.jobs)
 
 
 if __name__ == '__main__':
@@ -1,5 +1,6 @@
 #!/usr/bin/env python3
 
+import argparse
 import os
 import sys
 
@@ -11,6 +12,9 @@ import onnx
 project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.append(os.path.join(project_root, 'ch2o'))
 import ch2o  # noqa
+import ch2o.test_args  # noqa
+
+import gen_util  # noqa
 
 F = chainer.functions
 L = chainer.links
@@ -21,10 +25,6 @@ def create_backprop_test(test_name, model, input_values):
     model.cleargrads()
     output_values = model(*map(chainer.variable.Variable, input_values))
 
-    test_dir = 'out/backprop_test_pc_%s' % test_name
-    test_data_set_dir = os.path.join(test_dir, 'test_data_set_0')
-    os.makedirs(test_data_set_dir, exist_ok=True)
-
     xmodel = ch2o.compile_model(model, input_values)
     all_input_tensors = xmodel.graph.input
     output_tensors = xmodel.graph.output
@@ -56,13 +56,17 @@ def create_backprop_test(test_name, model, input_values):
             'grad_out@' + name, onnx.TensorProto.FLOAT, ())
         outputs.append((bp_name, param.grad))
 
-    ch2o.testcasegen.dump_test_inputs_outputs(
-        list(zip(input_tensors, input_values)),
-        outputs,
-        test_data_set_dir)
+    test_dir = 'out/backprop_test_pc_%s' % test_name
+    with gen_util.staged_dir(test_dir) as test_dir:
+        test_data_set_dir = os.path.join(test_dir, 'test_data_set_0')
+        os.makedirs(test_data_set_dir)
+        ch2o.testcasegen.dump_test_inputs_outputs(
+            list(zip(input_tensors, input_values)),
+            outputs,
+            test_data_set_dir)
 
-    with open(os.path.join(test_dir, 'model.onnx'), 'wb') as fp:
-        fp.write(xmodel.SerializeToString())
+        with open(os.path.join(test_dir, 'model.onnx'), 'wb') as fp:
+            fp.write(xmodel.SerializeToString())
 
 
 class BackpropTest(object):
@@ -329,12 +333,22 @@ def _get_backprop_tests(dtype):
 
 
 def main():
-    for test in get_backprop_tests():
-        np.random.seed(42)
-        test.generate()
+    parser = argparse.ArgumentParser(
+        description='Generate backprop tests by ch2o')
+    parser.add_argument('--jobs', '-j', type=int, default=1)
+    args = parser.parse_args()
+    # ch2o reads its flags from the command line otherwise.
+    ch2o.test_args.get_test_args(['--quiet', '/tmp/dummy_dir'])
+
+    def generator(test):
+        def generate():
+            np.random.seed(42)
+            test.generate()
+        return generate
+
+    generators = [generator(test) for test in get_backprop_tests()]
+    gen_util.run_generators(generators, jobs=args.jobs)
 
 
 if __name__ == '__main__':
-    sys.argv.append('--quiet')
-    sys.argv.append('/tmp/dummy_dir')
     main()
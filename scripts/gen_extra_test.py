@@ -1,12 +1,15 @@
 """Yet another ONNX test generator for custom ops and new ops."""
 
 
+import argparse
+
 import chainer
 import chainer.functions as F
 import chainer.links as L
 import numpy as np
 import onnx
 
+import gen_util
 import onnx_script
 import test_case
 
@@ -1137,8 +1140,13 @@ def get_tests():
 
 
 def main():
-    for test in get_tests():
-        test.func(test.name)
+    parser = argparse.ArgumentParser(description='Generate extra tests')
+    parser.add_argument('--jobs', '-j', type=int, default=1)
+    args = parser.parse_args()
+
+    generators = [lambda test=test: test.func(test.name)
+                  for test in get_tests()]
+    gen_util.run_generators(generators, jobs=args.jobs)
 
 
 if __name__ == '__main__':
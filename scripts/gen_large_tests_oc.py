@@ -1,14 +1,60 @@
 #!/usr/bin/env python3
 
+import argparse
+import glob
+import hashlib
+import json
+import multiprocessing
+import os
+
 import chainer
 import numpy as np
+import onnx
 import onnx_chainer
 
 import large_models
 
 
+SEED = 314
+
+
+def _source_digest():
+    """Returns a digest of the scripts which define the tests.
+
+    The sources of onnx_chainer are also hashed as it is usually used
+    from the submodule without a version bump.
+    """
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    onnx_chainer_dir = os.path.dirname(os.path.abspath(onnx_chainer.__file__))
+    filenames = [os.path.abspath(__file__)]
+    filenames += sorted(glob.glob(os.path.join(script_dir, 'large_models',
+                                               '*.py')))
+    filenames += sorted(glob.glob(os.path.join(onnx_chainer_dir, '**', '*.py'),
+                                  recursive=True))
+    h = hashlib.sha1()
+    for filename in filenames:
+        with open(filename, 'rb') as f:
+            h.update(os.path.basename(filename).encode())
+            h.update(f.read())
+    return h.hexdigest()
+
+
+def _stamp_content(test_name, dtype):
+    return json.dumps({
+        'test_name': test_name,
+        'source': _source_digest(),
+        'seed': SEED,
+        'dtype': dtype.__name__,
+        'versions': {
+            'chainer': chainer.__version__,
+            'numpy': np.__version__,
+            'onnx': onnx.__version__,
+        },
+    }, sort_keys=True)
+
+
 def create_test(test_name, get_fun, dtype):
-    np.random.seed(314)
+    np.random.seed(SEED)
     chainer.config.dtype = dtype
     model, inputs = get_fun(dtype)
 
@@ -47,9 +93,43 @@ def get_large_tests():
     return tests
 
 
+def _create_test_if_changed(task):
+    test_name, get_fun, dtype, force = task
+    stamp = 'out/%s/stamp.json' % test_name
+    stamp_content = _stamp_content(test_name, dtype)
+    if not force and os.path.exists(stamp):
+        with open(stamp) as f:
+            if stamp_content == f.read():
+                return False
+
+    # Remove the stamp first so an interrupted run is not cached.
+    if os.path.exists(stamp):
+        os.remove(stamp)
+    create_test(test_name, get_fun, dtype)
+    with open(stamp, 'w') as f:
+        f.write(stamp_content)
+    return True
+
+
 def main():
-    for test_name, get_fun, dtype, _ in get_large_tests():
-        create_test(test_name, get_fun, dtype)
+    parser = argparse.ArgumentParser(
+        description='Generate large model tests by onnx_chainer')
+    # Large models take much memory, so tests are generated one by one
+    # unless more jobs are requested explicitly.
+    parser.add_argument('--jobs', '-j', type=int, default=1)
+    parser.add_argument('--force', action='store_true',
+                        help='Generate tests even if they are up to date')
+    args = parser.parse_args()
+
+    tasks = [(test_name, get_fun, dtype, args.force)
+             for test_name, get_fun, dtype, _ in get_large_tests()]
+    # Each test runs in its own process as `create_test` changes
+    # `chainer.config.dtype`.
+    with multiprocessing.Pool(args.jobs, maxtasksperchild=1) as pool:
+        results = pool.imap(_create_test_if_changed, tasks)
+        for task, generated in zip(tasks, results):
+            print('%s: %s' % (task[0],
+                              'generated' if generated else 'up to date'))
 
 
 if __name__ == '__main__':
@@ -0,0 +1,86 @@
+"""Utilities shared by the generators of ONNX tests in out/."""
+
+import contextlib
+import filecmp
+import multiprocessing
+import os
+import shutil
+
+
+def _sync_dir(src_dir, dst_dir):
+    os.makedirs(dst_dir, exist_ok=True)
+    names = set(os.listdir(src_dir))
+    for name in os.listdir(dst_dir):
+        if name not in names:
+            path = os.path.join(dst_dir, name)
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+            else:
+                os.remove(path)
+
+    for name in sorted(names):
+        src = os.path.join(src_dir, name)
+        dst = os.path.join(dst_dir, name)
+        if os.path.isdir(src):
+            if os.path.exists(dst) and not os.path.isdir(dst):
+                os.remove(dst)
+            _sync_dir(src, dst)
+            continue
+        if os.path.isdir(dst):
+            shutil.rmtree(dst)
+        elif os.path.exists(dst) and filecmp.cmp(src, dst, shallow=False):
+            continue
+        os.replace(src, dst)
+
+
+@contextlib.contextmanager
+def staged_dir(test_dir):
+    """Yields a temporary directory whose contents replace `test_dir`.
+
+    Only files whose contents changed are moved to `test_dir` and
+    stale files are removed, so unchanged tests keep their mtimes and
+    an interrupted generation leaves `test_dir` as it was.
+    """
+    tmp_dir = test_dir + '.tmp'
+    if os.path.exists(tmp_dir):
+        shutil.rmtree(tmp_dir)
+    os.makedirs(tmp_dir)
+    try:
+        yield tmp_dir
+        if os.path.exists(test_dir):
+            _sync_dir(tmp_dir, test_dir)
+        else:
+            os.rename(tmp_dir, test_dir)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+_generators = None
+
+
+def _run_generator(index):
+    _generators[index]()
+
+
+def run_generators(generators, jobs=1):
+    """Calls each function in `generators`, in parallel if `jobs` > 1.
+
+    Workers are forked, so generators such as lambdas and closures do
+    not need to be picklable. Generators should not depend on global
+    state left by other generators as they run in arbitrary order.
+    """
+    global _generators
+    if jobs <= 1:
+        for generator in generators:
+            generator()
+        return
+
+    _generators = generators
+    try:
+        ctx = multiprocessing.get_context('fork')
+        with ctx.Pool(jobs) as pool:
+            for _ in pool.imap_unordered(_run_generator,
+                                         range(len(generators))):
+                pass
+    finally:
+        _generators = None
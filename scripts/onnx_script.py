@@ -1,12 +1,18 @@
 import collections
 import os
-import shutil
+import sys
 
 import chainer
 import numpy as np
 import onnx
 from onnx import numpy_helper
 
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(project_root, 'common'))
+import test_data_writer
+
+import gen_util
+
 
 # From onnx/backend/test/case/node/__init__.py
 def _extract_value_info(arr, name):
@@ -47,34 +53,22 @@ def make_constant_sequence_node(name, typ, values):
     return node
 
 
-def gen_test(graph, inputs, outputs, name):
+def gen_test(graph, inputs, outputs, name, write_npy=False):
     model = onnx.helper.make_model(graph, producer_name='backend-test')
 
-    test_dir = os.path.join('out', name)
-    test_data_set_dir = os.path.join(test_dir, 'test_data_set_0')
-    if os.path.exists(test_dir):
-        shutil.rmtree(test_dir)
-    os.makedirs(test_data_set_dir)
-    with open(os.path.join(test_dir, 'model.onnx'), 'wb') as f:
-        f.write(model.SerializeToString())
-    for typ, values in [('input', inputs), ('output', outputs)]:
-        for i, (name, value) in enumerate(values):
-            if isinstance(value, list):
-                assert value
-                digits = len(str(len(value)))
-                for j, v in enumerate(value):
-                    filename = os.path.join(
-                        test_data_set_dir,
-                        '%s_%d_%s.pb' % (typ, i, str(j).zfill(digits)))
-                    tensor = numpy_helper.from_array(v, name)
-                    with open(filename, 'wb') as f:
-                        f.write(tensor.SerializeToString())
-            else:
-                filename = os.path.join(test_data_set_dir,
-                                        '%s_%d.pb' % (typ, i))
-                tensor = numpy_helper.from_array(value, name)
-                with open(filename, 'wb') as f:
-                    f.write(tensor.SerializeToString())
+    with gen_util.staged_dir(os.path.join('out', name)) as test_dir:
+        test_data_set_dir = os.path.join(test_dir, 'test_data_set_0')
+        os.makedirs(test_data_set_dir)
+        with open(os.path.join(test_dir, 'model.onnx'), 'wb') as f:
+            f.write(model.SerializeToString())
+        for typ, values in [('input', inputs), ('output', outputs)]:
+            for i, (name, value) in enumerate(values):
+                test_data_writer.write_test_data(
+                    test_data_set_dir, typ, i, name, value,
+                    write_npy=write_npy)
+    # Value names of the next test should not depend on which tests
+    # were generated before it in this process.
+    GraphBuilder.ids.clear()
 
 
 class Seq(object):
@@ -26,7 +26,7 @@ time make test
 
 cd ..
 ./scripts/runtests.py
-time pytest -sv python
+time pytest -sv python tools/compare_dump_dirs_test.py
 
 time python3 examples/mnist/train_mnist.py \
      -d native --compile -I 3 --use-fake-data
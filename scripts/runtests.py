@@ -3,11 +3,17 @@
 import argparse
 import copy
 import glob
+import hashlib
+import json
 import multiprocessing
 import os
 import re
+import queue
 import sys
 import subprocess
+import threading
+import time
+import traceback
 
 import ch2o_tests
 import elichika_tests
@@ -34,6 +40,9 @@ parser.add_argument('--show_log', action='store_true',
                     help='Show logs')
 parser.add_argument('--skip_build', action='store_true',
                     help='Skip the build before running tests')
+parser.add_argument('--skip_prepare', action='store_true',
+                    help='Skip preparation of tests (e.g., downloading '
+                    'data) which has been done already')
 parser.add_argument('--use_gpu', '-g', action='store_true',
                     help='Run heavy tests with GPU')
 parser.add_argument('--device', '-d', default=None,
@@ -50,6 +59,37 @@ parser.add_argument('--computation_order', default=None,
                     help='Force setting --computation_order flag')
 parser.add_argument('--verbose', action='store_true',
                     help='Run tests with --verbose flag')
+parser.add_argument('--use_workers', action='store_true',
+                    help='Run tests without GPU in long-lived run_onnx '
+                    'processes')
+parser.add_argument('--timing_db', default='out/test_timings.json',
+                    help='The file where elapsed time and peak memory '
+                    'usage of tests are stored to schedule tests')
+parser.add_argument('--cache', action='store_true',
+                    help='Skip tests which passed last time with the same '
+                    'run_onnx, test data, and flags')
+parser.add_argument('--cache_file', default='out/test_results_cache.json',
+                    help='The file where results of tests are cached')
+parser.add_argument('--benchmark', action='store_true',
+                    help='Measure performance of tests one by one and '
+                    'compare it with a baseline')
+parser.add_argument('--benchmark_iterations', type=int, default=10,
+                    help='The number of iterations in the benchmark mode. '
+                    'The first one is for warm up')
+parser.add_argument('--benchmark_db', default='out/benchmarks.json',
+                    help='The file where benchmark results are stored '
+                    'by commit')
+parser.add_argument('--benchmark_baseline', default=None,
+                    help='The commit whose benchmark results are compared')
+parser.add_argument('--benchmark_threshold', type=float, default=0.1,
+                    help='Relative increase of compile time or latency '
+                    'regarded as a regression')
+parser.add_argument('--benchmark_memory_threshold', type=float, default=0.1,
+                    help='Relative increase of peak memory usage regarded '
+                    'as a regression')
+parser.add_argument('--memory_budget', type=int, default=None,
+                    help='Memory in MB which tests running in parallel '
+                    'are expected to use at most (default: physical memory)')
 args = parser.parse_args()
 
 
@@ -621,56 +661,533 @@ def _start_output(msg):
         sys.stdout.write(msg)
 
 
+def load_json(filename):
+    if not os.path.exists(filename):
+        return {}
+    with open(filename) as f:
+        try:
+            return json.load(f)
+        except ValueError:
+            return {}
+
+
+def save_json(filename, obj):
+    tmp_filename = filename + '.tmp'
+    with open(tmp_filename, 'w') as f:
+        json.dump(obj, f, indent=2, sort_keys=True)
+    os.replace(tmp_filename, filename)
+
+
+def get_physical_memory_mb():
+    try:
+        pages = os.sysconf('SC_PHYS_PAGES')
+        page_size = os.sysconf('SC_PAGE_SIZE')
+    except (ValueError, OSError):
+        return None
+    return pages * page_size // (1024 * 1024)
+
+
+def percentile(values, p):
+    values = sorted(values)
+    index = max(0, int(len(values) * p / 100.0 + 0.5) - 1)
+    return values[min(index, len(values) - 1)]
+
+
+def parse_benchmark_log(log):
+    compile_elapsed = None
+    elapsed = []
+    for line in log.decode(errors='replace').splitlines():
+        matched = re.match(r'^Compile elapsed: (\d+(\.\d+)?)', line)
+        if matched:
+            compile_elapsed = float(matched.group(1))
+            continue
+        matched = re.match(r'^Elapsed: (\d+(\.\d+)?)', line)
+        if matched:
+            elapsed.append(float(matched.group(1)))
+    # The first iteration is for warm up.
+    elapsed = elapsed[1:]
+    if not elapsed:
+        return None
+
+    return {
+        'compile': compile_elapsed,
+        'p50': percentile(elapsed, 50),
+        'p90': percentile(elapsed, 90),
+        'p99': percentile(elapsed, 99),
+    }
+
+
+def get_commit():
+    commit = subprocess.check_output(['git', 'rev-parse', 'HEAD'])
+    commit = commit.decode().strip()
+    status = subprocess.check_output(['git', 'status', '--porcelain',
+                                      '--untracked-files=no'])
+    if status.strip():
+        commit += '-dirty'
+    return commit
+
+
+def find_regressions(results, baseline):
+    regressions = []
+    for name, result in sorted(results.items()):
+        base = baseline.get(name)
+        if base is None:
+            continue
+        for key, threshold in [('compile', args.benchmark_threshold),
+                               ('p50', args.benchmark_threshold),
+                               ('p90', args.benchmark_threshold),
+                               ('max_rss_kb', args.benchmark_memory_threshold)]:
+            if not result.get(key) or not base.get(key):
+                continue
+            ratio = result[key] / base[key]
+            if ratio > 1 + threshold:
+                regressions.append((name, key, base[key], result[key], ratio))
+    return regressions
+
+
+def run_benchmark(runner, timings):
+    results = {}
+    for test_case in runner.tested:
+        if test_case in runner.failed:
+            continue
+        result = parse_benchmark_log(test_case.log_read())
+        if result is None:
+            continue
+        result['max_rss_kb'] = timings[test_case.name]['max_rss_kb']
+        results[test_case.name] = result
+        print('%s: compile=%s msec p50=%.3f p90=%.3f p99=%.3f msec '
+              'peak=%d MB' %
+              (test_case.name, result['compile'], result['p50'],
+               result['p90'], result['p99'], result['max_rss_kb'] // 1024))
+
+    commit = get_commit()
+    benchmarks = load_json(args.benchmark_db)
+    benchmarks.setdefault(commit, {}).update(results)
+    save_json(args.benchmark_db, benchmarks)
+    print('Stored benchmark results of %d tests for %s' %
+          (len(results), commit))
+
+    if args.benchmark_baseline is None:
+        return True
+    if args.benchmark_baseline not in benchmarks:
+        raise RuntimeError('No benchmark results for %s in %s' %
+                           (args.benchmark_baseline, args.benchmark_db))
+    regressions = find_regressions(results,
+                                   benchmarks[args.benchmark_baseline])
+    for name, key, base, value, ratio in regressions:
+        print('%sREGRESSION%s: %s %s %.3f => %.3f (%+.1f%%)' %
+              (RED, RESET, name, key, base, value, (ratio - 1) * 100))
+    if regressions:
+        print('%d regressions from %s' %
+              (len(regressions), args.benchmark_baseline))
+        return False
+    print('No regressions from %s' % args.benchmark_baseline)
+    return True
+
+
+class ResultCache(object):
+    """Remembers tests which passed with their inputs.
+
+    A test is keyed by hashes of run_onnx, its shared libraries, files in
+    the test directory, and the command line. Hashes of files are reused
+    while their sizes and modification times do not change.
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.files = {}
+        self.passed = {}
+        if os.path.exists(filename):
+            with open(filename) as f:
+                try:
+                    cache = json.load(f)
+                    self.files = cache['files']
+                    self.passed = cache['passed']
+                except (ValueError, KeyError):
+                    pass
+        self.binary_digests = {}
+
+    def _file_digest(self, filename):
+        st = os.stat(filename)
+        stamp = [st.st_size, st.st_mtime_ns]
+        entry = self.files.get(filename)
+        if entry is not None and entry[:2] == stamp:
+            return entry[2]
+
+        h = hashlib.sha256()
+        with open(filename, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                h.update(chunk)
+        digest = h.hexdigest()
+        self.files[filename] = stamp + [digest]
+        return digest
+
+    def _binary_digest(self, binary):
+        if binary in self.binary_digests:
+            return self.binary_digests[binary]
+
+        filenames = [binary]
+        try:
+            ldd = subprocess.check_output(['ldd', binary],
+                                          stderr=subprocess.DEVNULL)
+            for line in ldd.decode().splitlines():
+                matched = re.search(r'(/\S+) \(0x', line)
+                if matched:
+                    filenames.append(matched.group(1))
+        except (OSError, subprocess.CalledProcessError):
+            pass
+
+        h = hashlib.sha256()
+        for filename in filenames:
+            h.update(filename.encode())
+            h.update(self._file_digest(filename).encode())
+        digest = h.hexdigest()
+        self.binary_digests[binary] = digest
+        return digest
+
+    def _key(self, test_case):
+        if not os.path.isdir(test_case.test_dir):
+            return None
+
+        h = hashlib.sha256()
+        h.update(self._binary_digest(test_case.args[0]).encode())
+        for arg in test_case.args:
+            h.update(arg.encode() + b'\0')
+        for dirpath, dirnames, filenames in os.walk(test_case.test_dir):
+            dirnames.sort()
+            for filename in sorted(filenames):
+                filename = os.path.join(dirpath, filename)
+                if filename == test_case.log_filename:
+                    continue
+                h.update(os.path.relpath(filename, test_case.test_dir).encode())
+                h.update(self._file_digest(filename).encode())
+        return h.hexdigest()
+
+    def is_passed(self, test_case):
+        key = self.passed.get(test_case.name)
+        return key is not None and key == self._key(test_case)
+
+    def add_passed(self, test_case):
+        key = self._key(test_case)
+        if key is not None:
+            self.passed[test_case.name] = key
+
+    def save(self):
+        tmp_filename = self.filename + '.tmp'
+        with open(tmp_filename, 'w') as f:
+            json.dump({'files': self.files, 'passed': self.passed}, f)
+        os.replace(tmp_filename, self.filename)
+
+
 class TestRunner(object):
-    def __init__(self, test_cases, show_log):
+    def __init__(self, test_cases, show_log, timings=None,
+                 memory_budget=None):
         self.test_cases = test_cases
         self.tested = []
         self.failed = []
         self.show_log = show_log
-
-    def run(self, num_parallel_jobs):
-        tests = list(reversed(self.test_cases))
+        # Elapsed time and peak RSS of tests measured in previous runs.
+        self.timings = {} if timings is None else timings
+        # The sum of peak RSS of tests running in parallel in MB.
+        self.memory_budget = memory_budget
+
+    def _expected_elapsed(self, test_case):
+        timing = self.timings.get(test_case.name)
+        if timing is None:
+            # Unknown tests start first as they may be heavy.
+            return float('inf')
+        return timing['elapsed']
+
+    def _expected_rss_mb(self, test_case):
+        timing = self.timings.get(test_case.name)
+        if timing is None:
+            return 0
+        return timing['max_rss_kb'] / 1024
+
+    def _fits_memory_budget(self, test_case, num_running, running_rss):
+        # A test always runs when nothing else runs.
+        return (not num_running or self.memory_budget is None or
+                running_rss + self._expected_rss_mb(test_case) <=
+                self.memory_budget)
+
+    def _start_prepare(self, test_case):
+        sys.stdout.flush()
+        pid = os.fork()
+        if pid == 0:
+            # Messages of the preparation are kept in the log in case
+            # it fails.
+            log_fd = os.open(test_case.log_filename,
+                             os.O_WRONLY | os.O_CREAT | os.O_TRUNC)
+            os.dup2(log_fd, 1)
+            os.dup2(log_fd, 2)
+            try:
+                test_case.prepare()
+            except BaseException:
+                traceback.print_exc()
+                os._exit(1)
+            os._exit(0)
+        return pid
+
+    def _start_test(self, test_case):
+        log_file = open(test_case.log_filename, 'wb')
+        proc = subprocess.Popen(test_case.args,
+                                stdout=subprocess.PIPE,
+                                stderr=log_file)
+        return proc, log_file
+
+    def run(self, num_parallel_jobs, num_gpu_jobs=1):
+        """Runs tests and their preparation in a single job pool.
+
+        Preparation (e.g., downloading data) of a test runs as a job in
+        the same pool and the test starts as soon as it finishes.
+        Tests which took longer in previous runs start first so a few
+        heavy tests do not finish late, unless the sum of their peak
+        memory usage exceeds the memory budget.
+        """
+        # The last element is the next test to run.
+        tests = sorted(reversed(self.test_cases),
+                       key=self._expected_elapsed)
+        prepared = set()
         procs = {}
+        start_times = {}
         while tests or procs:
-            if tests and len(procs) < num_parallel_jobs:
-                test_case = tests.pop()
+            runnable = None
+            if len(procs) < num_parallel_jobs:
+                running = [t for t, p, _ in procs.values() if p is not None]
+                num_gpu_procs = sum(1 for t in running if t.is_gpu)
+                running_rss = sum(self._expected_rss_mb(t) for t in running)
+                for i in reversed(range(len(tests))):
+                    test_case = tests[i]
+                    if test_case in prepared or test_case.prepare_func is None:
+                        if test_case.is_gpu and num_gpu_procs >= num_gpu_jobs:
+                            continue
+                        if not self._fits_memory_budget(
+                                test_case, len(running), running_rss):
+                            continue
+                    runnable = tests.pop(i)
+                    break
+
+            if runnable is not None:
+                test_case = runnable
+                if (test_case.prepare_func is not None and
+                    test_case not in prepared):
+                    pid = self._start_prepare(test_case)
+                    procs[pid] = (test_case, None, None)
+                    continue
+
                 if num_parallel_jobs == 1:
                     _start_output('%s... ' % test_case.name)
-                log_file = open(test_case.log_filename, 'wb')
-                proc = subprocess.Popen(test_case.args,
-                                        stdout=subprocess.PIPE,
-                                        stderr=log_file)
+                proc, log_file = self._start_test(test_case)
                 procs[proc.pid] = (test_case, proc, log_file)
+                start_times[proc.pid] = time.time()
                 continue
 
             assert procs
-            pid, status = os.wait()
+            pid, status, rusage = os.wait4(-1, 0)
             assert pid in procs
             test_case, proc, log_file = procs[pid]
             del procs[pid]
+
+            if proc is None:
+                # Preparation finished.
+                if status == 0:
+                    prepared.add(test_case)
+                    tests.append(test_case)
+                    continue
+                self._report_prepare_failure(test_case)
+                continue
+
             log_file.close()
+            self.timings[test_case.name] = {
+                'elapsed': time.time() - start_times.pop(pid),
+                # ru_maxrss is in kilobytes on Linux.
+                'max_rss_kb': rusage.ru_maxrss,
+            }
 
             if num_parallel_jobs != 1:
                 _start_output('%s... ' % test_case.name)
-            self.tested.append(test_case)
-            if status == 0:
-                if test_case.fail:
-                    sys.stdout.write('%sOK (unexpected)%s\n' % (YELLOW, RESET))
-                else:
-                    sys.stdout.write('%sOK%s' % (GREEN, RESET))
-                    if not sys.stdout.isatty():
-                        sys.stdout.write('\n')
+            self._report(test_case, status)
+        _start_output('')
+        sys.stdout.write('\n')
+
+    def _report_prepare_failure(self, test_case):
+        self.tested.append(test_case)
+        self.failed.append(test_case)
+        _start_output('%s... ' % test_case.name)
+        sys.stdout.write('%sFAIL%s: preparation failed\n' % (RED, RESET))
+        sys.stdout.buffer.write(test_case.log_read())
+        sys.stdout.flush()
+
+    def _report(self, test_case, status):
+        self.tested.append(test_case)
+        if status == 0:
+            if test_case.fail:
+                sys.stdout.write('%sOK (unexpected)%s\n' % (YELLOW, RESET))
             else:
-                self.failed.append(test_case)
-                sys.stdout.write('%sFAIL%s: %s\n' %
+                sys.stdout.write('%sOK%s' % (GREEN, RESET))
+                if not sys.stdout.isatty():
+                    sys.stdout.write('\n')
+        else:
+            self.failed.append(test_case)
+            sys.stdout.write('%sFAIL%s: %s\n' %
+                             (RED, RESET, test_case.repro_cmdline()))
+        if status != 0 or self.show_log:
+            sys.stdout.buffer.write(test_case.log_read())
+            if status != 0:
+                sys.stdout.write('%s$%s %s\n' %
                                  (RED, RESET, test_case.repro_cmdline()))
-            if status != 0 or self.show_log:
-                sys.stdout.buffer.write(test_case.log_read())
-                if status != 0:
-                    sys.stdout.write('%s$%s %s\n' %
-                                     (RED, RESET, test_case.repro_cmdline()))
 
-            sys.stdout.flush()
+        sys.stdout.flush()
+
+
+class _Worker(object):
+    """A `run_onnx --worker` process which runs tests one by one."""
+
+    def __init__(self, run_onnx):
+        self.run_onnx = run_onnx
+        self.proc = None
+        self.proc_status = None
+        # Peak RSS of the worker during the last test in kilobytes, or
+        # None if it is unknown.
+        self.max_rss_kb = None
+
+    def _reset_peak_rss(self):
+        # Writing 5 to clear_refs resets VmHWM on Linux.
+        try:
+            with open('/proc/%d/clear_refs' % self.proc.pid, 'w') as f:
+                f.write('5')
+        except OSError:
+            return False
+        return True
+
+    def _read_peak_rss_kb(self):
+        try:
+            with open('/proc/%d/status' % self.proc.pid) as f:
+                for line in f:
+                    if line.startswith('VmHWM:'):
+                        return int(line.split()[1])
+        except OSError:
+            pass
+        return None
+
+    def run(self, test_case):
+        """Runs a test and returns its exit status."""
+        assert test_case.args[0] == self.run_onnx
+        if self.proc is None:
+            self.proc = subprocess.Popen([self.run_onnx, '--worker'],
+                                         stdin=subprocess.PIPE,
+                                         stdout=subprocess.PIPE)
+        self.max_rss_kb = None
+        is_peak_reset = self._reset_peak_rss()
+        request = '\t'.join([test_case.log_filename] + test_case.args[1:])
+        try:
+            self.proc.stdin.write((request + '\n').encode())
+            self.proc.stdin.flush()
+            response = self.proc.stdout.readline()
+        except BrokenPipeError:
+            response = b''
+        if response == b'OK\n':
+            if is_peak_reset:
+                self.max_rss_kb = self._read_peak_rss_kb()
+            return 0
+
+        # The test killed the worker. A new worker will be started for
+        # the next test.
+        self.close()
+        return self.proc_status or 1
+
+    def close(self):
+        self.proc_status = None
+        if self.proc is None:
+            return
+        self.proc.stdin.close()
+        self.proc_status = self.proc.wait()
+        self.proc = None
+
+
+class WorkerTestRunner(TestRunner):
+    """Runs tests in long-lived run_onnx processes.
+
+    This saves the startup of run_onnx (e.g., initialization of ChainerX
+    and registration of ONNX schemas) which dominates small tests.
+    Tests are admitted under the memory budget like `TestRunner`, and
+    the peak RSS of a worker while it runs a test is recorded as the
+    peak RSS of the test.
+    """
+
+    def run(self, num_parallel_jobs, num_gpu_jobs=1):
+        # The last element is the next test to run.
+        tests = sorted(reversed(self.test_cases),
+                       key=self._expected_elapsed)
+        # Guards `tests` and `running`, which are tests running now.
+        cond = threading.Condition()
+        running = []
+        results = queue.Queue()
+
+        def take_test():
+            with cond:
+                while tests:
+                    running_rss = sum(self._expected_rss_mb(t)
+                                      for t in running)
+                    for i in reversed(range(len(tests))):
+                        if self._fits_memory_budget(tests[i], len(running),
+                                                    running_rss):
+                            test_case = tests.pop(i)
+                            running.append(test_case)
+                            return test_case
+                    cond.wait()
+            return None
+
+        def finish_test(test_case, result):
+            with cond:
+                running.remove(test_case)
+                cond.notify_all()
+            results.put((test_case, result))
+
+        def run_worker(run_onnx):
+            worker = _Worker(run_onnx)
+            while True:
+                test_case = take_test()
+                if test_case is None:
+                    break
+                try:
+                    test_case.prepare()
+                except Exception:
+                    with open(test_case.log_filename, 'w') as f:
+                        f.write(traceback.format_exc())
+                    finish_test(test_case, None)
+                    continue
+                start_time = time.time()
+                status = worker.run(test_case)
+                elapsed = time.time() - start_time
+                finish_test(test_case, (status, elapsed, worker.max_rss_kb))
+            worker.close()
+
+        threads = []
+        for _ in range(min(num_parallel_jobs, len(self.test_cases))):
+            thread = threading.Thread(target=run_worker,
+                                      args=(self.test_cases[0].args[0],))
+            thread.start()
+            threads.append(thread)
+
+        for _ in range(len(self.test_cases)):
+            test_case, result = results.get()
+            if result is None:
+                self._report_prepare_failure(test_case)
+                continue
+            status, elapsed, max_rss_kb = result
+            timing = self.timings.get(test_case.name, {'max_rss_kb': 0})
+            timing['elapsed'] = elapsed
+            # Keep the previous peak if the worker could not tell it
+            # (e.g., the test killed the worker).
+            if max_rss_kb is not None:
+                timing['max_rss_kb'] = max_rss_kb
+            self.timings[test_case.name] = timing
+            _start_output('%s... ' % test_case.name)
+            self._report(test_case, status)
+
+        for thread in threads:
+            thread.join()
         _start_output('')
         sys.stdout.write('\n')
 
@@ -723,6 +1240,9 @@ def main():
             test_case.args.append(test_case.backend)
         if args.verbose:
             test_case.args.append('--verbose')
+        if args.benchmark:
+            test_case.args.extend(['--iterations',
+                                   str(args.benchmark_iterations)])
         device = args.device
         if test_case.want_gpu or args.use_gpu_all:
             if not args.use_gpu and not args.use_gpu_all:
@@ -741,6 +1261,7 @@ def main():
             test_case.args.append('--fuse_operations')
             test_case.args.append('--use_ngraph')
 
+        test_case.is_gpu = is_gpu
         if is_gpu:
             gpu_tests.append(test_case)
         else:
@@ -748,14 +1269,60 @@ def main():
 
     print('Testing %d tests with %s' % (len(tests + gpu_tests), run_onnx))
 
-    for test in tests + gpu_tests:
-        test.prepare()
-
-    for tests, num_jobs in [(tests, args.jobs), (gpu_tests, 1)]:
-        runner = TestRunner(tests, args.show_log)
-        runner.run(num_jobs)
+    if args.skip_prepare:
+        for test in tests + gpu_tests:
+            test.prepare_func = None
+
+    cache = None
+    cached = []
+    if args.cache and not args.benchmark:
+        cache = ResultCache(args.cache_file)
+        # Tests which need preparation may be updated by it.
+        cached = [t for t in tests + gpu_tests
+                  if t.prepare_func is None and cache.is_passed(t)]
+        tests = [t for t in tests if t not in cached]
+        gpu_tests = [t for t in gpu_tests if t not in cached]
+        print('Skipping %d tests which passed last time' % len(cached))
+
+    memory_budget = args.memory_budget
+    if memory_budget is None:
+        memory_budget = get_physical_memory_mb()
+    benchmark_ok = True
+    if args.benchmark:
+        # Tests run one by one so they do not disturb each other, and
+        # their timings are not recorded for scheduling.
+        timings = {}
+        runner = TestRunner(tests + gpu_tests, args.show_log,
+                            timings=timings)
+        runner.run(1)
+        benchmark_ok = run_benchmark(runner, timings)
         tested += runner.tested
         failed += runner.failed
+    else:
+        timings = load_json(args.timing_db)
+        runners = [(TestRunner(tests + gpu_tests, args.show_log,
+                               timings=timings, memory_budget=memory_budget),
+                    args.jobs)]
+        if args.use_workers:
+            runners = [(WorkerTestRunner(tests, args.show_log,
+                                         timings=timings,
+                                         memory_budget=memory_budget),
+                        args.jobs),
+                       (TestRunner(gpu_tests, args.show_log,
+                                   timings=timings), 1)]
+        try:
+            for runner, num_jobs in runners:
+                runner.run(num_jobs)
+                tested += runner.tested
+                failed += runner.failed
+        finally:
+            save_json(args.timing_db, timings)
+
+    if cache is not None:
+        for test in tested:
+            if test not in failed and not test.fail:
+                cache.add_passed(test)
+        cache.save()
 
     if failed:
         with open(args.failure_log, 'wb') as f:
@@ -768,8 +1335,11 @@ def main():
               (len(failed), len(tested), args.failure_log))
         sys.exit(1)
     else:
-        print('ALL %d tests OK! (%d from ONNX)' %
-              (len(tested), num_official_onnx_tests))
+        print('ALL %d tests OK! (%d from ONNX, %d executed, %d cached)' %
+              (len(tested) + len(cached), num_official_onnx_tests,
+               len(tested), len(cached)))
+        if not benchmark_ok:
+            sys.exit(1)
 
 
 main()
@@ -32,6 +32,7 @@ class TestCase(object):
         self.is_backprop_two_phase = False
         self.computation_order = None
         self.want_gpu = want_gpu
+        self.is_gpu = False
         self.prepare_func = prepare_func
         self.backend = backend
 
@@ -6,8 +6,13 @@
 # $ build/tools/run_onnx --dump_outputs_dir b  --backprop --test out/backprop_test_mnist_mlp
 # $ python3 tools/compare_dump_dirs.py a b
 #
+# Dumps are memory-mapped and compared chunk by chunk in parallel, so
+# dumps larger than the memory can be compared. Mismatches are
+# summarized instead of printing whole arrays.
 
+import argparse
 import glob
+import multiprocessing
 import os
 import re
 import sys
@@ -15,11 +20,6 @@ import sys
 import numpy as np
 
 
-if len(sys.argv) != 3:
-    sys.stderr.write('Usage: %s <dir1> <dir2>\n' % sys.argv[0])
-    sys.exit(1)
-
-
 def read_dump_dir(d):
     filenames = sorted(glob.glob(os.path.join(d, '*.npy')))
     files = []
@@ -31,21 +31,103 @@ def read_dump_dir(d):
     return files
 
 
-files1 = read_dump_dir(sys.argv[1])
-files2 = read_dump_dir(sys.argv[2])
-
-files_map2 = dict(files2)
-
-for name, filename1 in files1:
-    filename2 = files_map2.get(name)
-    if filename2 is None:
-        continue
-    print('Comparing %s' % name)
-    n1 = np.load(filename1)
-    n2 = np.load(filename2)
-    try:
-        np.testing.assert_allclose(n1, n2)
-    except AssertionError as e:
-        sys.stderr.write('%s\n\n' % e)
-        sys.stderr.write('=== %s ===\n%s\n' % (filename1, n1))
-        sys.stderr.write('=== %s ===\n%s\n' % (filename2, n2))
+def compare_files(task):
+    """Compares two .npy files and returns a summary of mismatches.
+
+    The condition of mismatches is the same as
+    `np.testing.assert_allclose`. None is returned if they match.
+    """
+    name, filename1, filename2, rtol, atol, chunk_size = task
+    n1 = np.load(filename1, mmap_mode='r')
+    n2 = np.load(filename2, mmap_mode='r')
+    if n1.shape != n2.shape:
+        return 'shape mismatch: %s vs %s' % (n1.shape, n2.shape)
+
+    flat1 = n1.reshape(-1)
+    flat2 = n2.reshape(-1)
+    num_bad = 0
+    first_bad = None
+    max_abs = 0.0
+    max_rel = 0.0
+    nans1 = 0
+    nans2 = 0
+    for i in range(0, flat1.size, chunk_size):
+        a = np.asarray(flat1[i:i + chunk_size], dtype=np.float64)
+        b = np.asarray(flat2[i:i + chunk_size], dtype=np.float64)
+        nan1 = np.isnan(a)
+        nan2 = np.isnan(b)
+        nans1 += int(np.count_nonzero(nan1))
+        nans2 += int(np.count_nonzero(nan2))
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            diff = np.abs(a - b)
+            # An infinity matches only the same infinity. The tolerance
+            # below is infinite when `b` is, so it cannot tell them.
+            inf_bad = (np.isinf(a) | np.isinf(b)) & (a != b)
+            bad = ~(diff <= atol + rtol * np.abs(b)) | inf_bad
+            # NaNs at the same positions are equal as assert_allclose.
+            bad &= ~(nan1 & nan2)
+            # Infinities with the same sign are equal, too.
+            bad &= ~(np.isinf(a) & (a == b))
+            if not np.any(bad):
+                continue
+            rel = diff / np.abs(b)
+
+        num_bad += int(np.count_nonzero(bad))
+        if first_bad is None:
+            first_bad = i + int(np.argmax(bad))
+        finite = bad & np.isfinite(diff)
+        if np.any(finite):
+            max_abs = max(max_abs, float(np.max(diff[finite])))
+            max_rel = max(max_rel, float(np.max(rel[finite])))
+
+    if not num_bad:
+        return None
+
+    index = np.unravel_index(first_bad, n1.shape) if n1.shape else ()
+    return ('mismatch %d / %d (%.3f%%) max_abs=%g max_rel=%g '
+            'first=%s (%s vs %s) nans=%d/%d' %
+            (num_bad, flat1.size, num_bad * 100.0 / flat1.size,
+             max_abs, max_rel, tuple(int(x) for x in index),
+             flat1[first_bad], flat2[first_bad], nans1, nans2))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Compare two output dumps created by --dump_outputs_dir')
+    parser.add_argument('dir1')
+    parser.add_argument('dir2')
+    parser.add_argument('--rtol', type=float, default=1e-7)
+    parser.add_argument('--atol', type=float, default=0.0)
+    parser.add_argument('--jobs', '-j', type=int,
+                        default=multiprocessing.cpu_count())
+    parser.add_argument('--chunk_size', type=int, default=1024 * 1024,
+                        help='The number of elements compared at once')
+    args = parser.parse_args()
+
+    files1 = read_dump_dir(args.dir1)
+    files2 = read_dump_dir(args.dir2)
+
+    files_map2 = dict(files2)
+
+    tasks = []
+    for name, filename1 in files1:
+        filename2 = files_map2.get(name)
+        if filename2 is None:
+            continue
+        tasks.append((name, filename1, filename2,
+                      args.rtol, args.atol, args.chunk_size))
+
+    num_mismatches = 0
+    with multiprocessing.Pool(args.jobs) as pool:
+        for task, error in zip(tasks, pool.imap(compare_files, tasks)):
+            print('Comparing %s' % task[0])
+            if error is not None:
+                num_mismatches += 1
+                sys.stderr.write('%s: %s\n' % (task[0], error))
+
+    print('%d / %d outputs mismatched' % (num_mismatches, len(tasks)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import compare_dump_dirs
+
+
+def _compare(tmpdir, n1, n2, rtol=1e-7, atol=0.0, chunk_size=4):
+    filename1 = str(tmpdir.join('1.npy'))
+    filename2 = str(tmpdir.join('2.npy'))
+    np.save(filename1, n1)
+    np.save(filename2, n2)
+    return compare_dump_dirs.compare_files(
+        ('x', filename1, filename2, rtol, atol, chunk_size))
+
+
+def test_match(tmpdir):
+    a = np.arange(10, dtype=np.float32)
+    assert _compare(tmpdir, a, a.copy()) is None
+    assert _compare(tmpdir, a, a + 1e-3, atol=1e-2) is None
+
+
+def test_mismatch(tmpdir):
+    a = np.arange(10, dtype=np.float32)
+    b = a.copy()
+    b[6] = 42
+    error = _compare(tmpdir, a, b)
+    assert error.startswith('mismatch 1 / 10')
+    assert 'first=(6,)' in error
+
+
+def test_inf(tmpdir):
+    a = np.array([1, np.inf, -np.inf, 4], dtype=np.float32)
+    assert _compare(tmpdir, a, a.copy()) is None
+    for i, v in [(0, np.inf), (1, 2), (1, -np.inf), (2, np.inf)]:
+        b = a.copy()
+        b[i] = v
+        assert _compare(tmpdir, a, b).startswith('mismatch 1 / 4')
+        assert _compare(tmpdir, b, a).startswith('mismatch 1 / 4')
+
+
+def test_nan(tmpdir):
+    a = np.array([1, np.nan, 3], dtype=np.float32)
+    assert _compare(tmpdir, a, a.copy()) is None
+    b = a.copy()
+    b[1] = 2
+    error = _compare(tmpdir, a, b)
+    assert error.startswith('mismatch 1 / 3')
+    assert error.endswith('nans=1/0')
+
+
+def test_shape(tmpdir):
+    a = np.zeros((2, 3), dtype=np.float32)
+    b = np.zeros((3, 2), dtype=np.float32)
+    assert _compare(tmpdir, a, b) == 'shape mismatch: (2, 3) vs (3, 2)'
+
+
+def test_scalar(tmpdir):
+    a = np.array(np.inf, dtype=np.float32)
+    assert _compare(tmpdir, a, a.copy()) is None
+    error = _compare(tmpdir, a, np.array(-np.inf, dtype=np.float32))
+    assert error.startswith('mismatch 1 / 1')
+    assert 'first=()' in error
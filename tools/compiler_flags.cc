@@ -26,6 +26,7 @@ void AddCompilerFlags(cmdline::parser* args) {
     args->add("dump_after_fusion", '\0', "Dump the ONNX graph after operator fusion");
     args->add("dump_after_scheduling", '\0', "Dump the ONNX graph after scheduling");
     args->add("dump_subgraphs", '\0', "Dump the subgraph tree of the ONNX graph");
+    args->add("plan_memory", '\0', "Plan offsets of arrays in a single arena");
     args->add<std::string>("computation_order", '\0', "Run the specified policy of computation order (backprop only)", false);
     args->add<int>("chen_budget", '\0', "Memory budget of Chen's policy (in MB)", 0);
 }
@@ -51,6 +52,7 @@ void ApplyCompilerFlags(const cmdline::parser& args) {
     g_dump_after_fusion = args.exist("dump_after_fusion");
     g_dump_after_scheduling = args.exist("dump_after_scheduling");
     g_dump_subgraphs = args.exist("dump_subgraphs");
+    g_plan_memory = args.exist("plan_memory");
     g_computation_order = args.get<std::string>("computation_order");
     g_chen_budget = args.get<int>("chen_budget");
 }
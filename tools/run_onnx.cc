@@ -1,15 +1,25 @@
 #include <dirent.h>
+#include <fcntl.h>
+#include <sys/stat.h>
 #include <sys/types.h>
+#include <unistd.h>
 
 #include <algorithm>
 #include <chrono>
+#include <cstdio>
 #include <cstdlib>
 #include <fstream>
+#include <iostream>
+#include <limits>
 #include <map>
 #include <queue>
 #include <set>
 #include <string>
 
+#include <google/protobuf/io/coded_stream.h>
+#include <google/protobuf/io/zero_copy_stream_impl.h>
+#include <google/protobuf/wire_format_lite.h>
+
 #include <compiler/onnx.h>
 
 #include <chainerx/array.h>
@@ -28,6 +38,7 @@
 #include <compiler/flags.h>
 #include <compiler/gradient.h>
 #include <compiler/graph.h>
+#include <compiler/memory_simulator.h>
 #include <compiler/model.h>
 #include <compiler/passes.h>
 #include <compiler/tensor.h>
@@ -37,6 +48,7 @@
 #include <runtime/chainerx_util.h>
 #include <runtime/chrome_tracing.h>
 #include <runtime/meminfo.h>
+#include <runtime/npy.h>
 #include <runtime/xcvm.h>
 #include <runtime/xcvm.pb.h>
 #include <runtime/xcvm_var.h>
@@ -53,6 +65,7 @@ const char* RED = "\033[91m";
 const char* RESET = "\033[0m";
 
 bool g_quiet;
+bool g_no_npy;
 
 #define LOG() \
     if (!g_quiet) std::cerr
@@ -98,6 +111,29 @@ chainerx::Array MakeArrayFromONNX(const onnx::TensorProto& xtensor) {
     return array;
 }
 
+// Reads only the name of a serialized TensorProto without parsing
+// its payload.
+std::string ReadTensorName(const std::string& filename) {
+    int fd = open(filename.c_str(), O_RDONLY);
+    CHECK_LE(0, fd) << "Failed to open: " << filename;
+    std::string name;
+    {
+        google::protobuf::io::FileInputStream fis(fd);
+        google::protobuf::io::CodedInputStream cis(&fis);
+        cis.SetTotalBytesLimit(std::numeric_limits<int>::max(), std::numeric_limits<int>::max());
+        const int kNameField = onnx::TensorProto::kNameFieldNumber;
+        for (uint32_t tag; (tag = cis.ReadTag()) != 0;) {
+            if (google::protobuf::internal::WireFormatLite::GetTagFieldNumber(tag) == kNameField) {
+                CHECK(google::protobuf::internal::WireFormatLite::ReadString(&cis, &name)) << "Broken tensor: " << filename;
+                break;
+            }
+            CHECK(google::protobuf::internal::WireFormatLite::SkipField(&cis, tag)) << "Broken tensor: " << filename;
+        }
+    }
+    close(fd);
+    return name;
+}
+
 struct TestCase {
     std::string name;
     InOuts inputs;
@@ -119,6 +155,13 @@ void ReadTestDir(
         std::vector<std::tuple<std::string, std::string, chainerx::Array>> all_tensors;
         for (const std::string& tensor_pb : ListDir(data_set_dir)) {
             if (!HasSuffix(tensor_pb, ".pb")) continue;
+            // Prefer a memory-mapped .npy file if exists. Only the
+            // name of the tensor is read from the .pb file.
+            const std::string tensor_npy = tensor_pb.substr(0, tensor_pb.size() - 3) + ".npy";
+            if (!g_no_npy && access(tensor_npy.c_str(), R_OK) == 0) {
+                all_tensors.emplace_back(Basename(tensor_pb), ReadTensorName(tensor_pb), LoadNpy(tensor_npy));
+                continue;
+            }
             onnx::TensorProto xtensor(LoadLargeProto<onnx::TensorProto>(tensor_pb));
             chainerx::Array tensor(MakeArrayFromONNX(xtensor));
             all_tensors.emplace_back(Basename(tensor_pb), xtensor.name(), tensor);
@@ -310,6 +353,9 @@ public:
         }
 
         xcvm->reset(new XCVM(xcvm_prog));
+        if (trace_level() && xcvm_prog.arena_size()) {
+            simulated_peaks_[xcvm->get()] = SimulateMemoryUsage(model->graph()).peak;
+        }
     }
 
     ~ModelRunner() {
@@ -321,6 +367,7 @@ public:
     InOuts Run(const InOuts& inputs) {
         if (trace_level()) std::cerr << "Running XCVM..." << std::endl;
         InOuts outputs = xcvm_->Run(inputs, xcvm_opts_);
+        MaybeShowPlannedMemory(*xcvm_);
         MaybeShowGPUMemory();
         if (xcvm_bp_.get()) {
             if (trace_level()) std::cerr << "Running XCVM for backward..." << std::endl;
@@ -342,6 +389,7 @@ public:
                 CHECK(bp_inputs.emplace(input_name, value).second) << name;
             }
             InOuts bp_outputs = xcvm_bp_->Run(bp_inputs, xcvm_opts_);
+            MaybeShowPlannedMemory(*xcvm_bp_);
             MaybeShowGPUMemory();
             for (auto& p : bp_outputs) {
                 outputs.emplace(p);
@@ -362,6 +410,17 @@ private:
         return args_.exist("verbose") ? 2 : args_.exist("trace") ? 1 : 0;
     }
 
+    // Shows the peak memory usage simulated at compile time, the arena
+    // size planned by --plan_memory, and the peak observed by `xcvm`.
+    void MaybeShowPlannedMemory(const XCVM& xcvm) const {
+        auto found = simulated_peaks_.find(&xcvm);
+        if (found == simulated_peaks_.end() || !xcvm_opts_.dump_memory_usage) {
+            return;
+        }
+        std::cerr << "Memory usage: simulated peak=" << found->second / 1000 / 1000 << "MB planned=" << xcvm.arena_size() / 1000 / 1000
+                  << "MB observed peak=" << xcvm.peak_memory_usage() / 1000 / 1000 << "MB" << std::endl;
+    }
+
     void MaybeShowGPUMemory() const {
         if (initial_free_bytes_ >= 0) {
             int64_t free_bytes = GetMemoryUsageInBytes();
@@ -382,6 +441,9 @@ private:
 
     std::unique_ptr<XCVM> xcvm_bp_;
     std::vector<std::string> backprop_ins_;
+
+    // Peak memory usage simulated for each compiled program.
+    std::map<const XCVM*, int64_t> simulated_peaks_;
 };
 
 void RunMain(const std::vector<std::string>& argv) {
@@ -405,6 +467,7 @@ void RunMain(const std::vector<std::string>& argv) {
     args.add("backprop", 'b', "Add backprop outputs");
     args.add("backprop_two_phase", '\0', "Backprop using different graphs for forward and backward");
     args.add("skip_shape_inference", '\0', "Skip shape inference");
+    args.add("no_npy", '\0', "Read .pb test data even if .npy files exist");
     args.add("trace", 't', "Tracing mode");
     args.add("verbose", 'v', "Verbose mode");
     args.add<std::string>("verbose_ops", '\0', "Show verbose outputs for specific ops", false);
@@ -419,6 +482,7 @@ void RunMain(const std::vector<std::string>& argv) {
     std::string test_path = args.get<std::string>("test");
 
     g_quiet = args.exist("quiet");
+    g_no_npy = args.exist("no_npy");
     if ((onnx_path.empty() && test_path.empty()) || (!onnx_path.empty() && !test_path.empty())) {
         std::cerr << args.usage() << std::endl;
         QFAIL() << "Either --onnx or --test must be specified!";
@@ -429,6 +493,8 @@ void RunMain(const std::vector<std::string>& argv) {
     chainerx::ContextScope ctx_scope(ctx);
     chainerx::NoBackpropModeScope no_backprop;
     const std::string device_spec = args.get<std::string>("device");
+    g_use_cuda = false;
+    g_meminfo_enabled = false;
     if (!device_spec.empty()) {
         chainerx::Device* device = &chainerx::GetDefaultContext().GetDevice(device_spec);
         chainerx::SetDefaultDevice(device);
@@ -489,7 +555,12 @@ void RunMain(const std::vector<std::string>& argv) {
         test_cases.swap(new_test_cases);
     }
 
+    std::chrono::system_clock::time_point compile_start = std::chrono::system_clock::now();
     ModelRunner model_runner(args, initial_free_bytes, &model);
+    std::chrono::system_clock::time_point compile_end = std::chrono::system_clock::now();
+    LOG() << "Compile elapsed: "
+          << std::chrono::duration_cast<std::chrono::microseconds>(compile_end - compile_start).count() * 0.001 << " msec"
+          << std::endl;
 
     if (args.exist("compile_only")) return;
 
@@ -645,9 +716,50 @@ void RunMain(const std::vector<std::string>& argv) {
     }
 }
 
+// Runs tests fed from stdin one by one in a single process to save
+// the startup time. Each line consists of tab-separated arguments and
+// the first one is the file where stdout and stderr of the test go.
+// "OK" is written to stdout after each test. A failed test kills the
+// process as usual.
+void RunWorker(const std::string& argv0) {
+    std::string line;
+    while (std::getline(std::cin, line)) {
+        std::vector<std::string> fields = SplitString(line, "\t");
+        CHECK_LE(1, fields.size());
+        std::vector<std::string> argv = {argv0};
+        argv.insert(argv.end(), fields.begin() + 1, fields.end());
+
+        int log_fd = open(fields[0].c_str(), O_WRONLY | O_CREAT | O_TRUNC, 0644);
+        CHECK_LE(0, log_fd) << "Failed to open " << fields[0];
+        std::cout.flush();
+        fflush(stdout);
+        int stdout_fd = dup(STDOUT_FILENO);
+        int stderr_fd = dup(STDERR_FILENO);
+        CHECK_LE(0, dup2(log_fd, STDOUT_FILENO));
+        CHECK_LE(0, dup2(log_fd, STDERR_FILENO));
+        close(log_fd);
+
+        RunMain(argv);
+
+        std::cout.flush();
+        std::cerr.flush();
+        fflush(stdout);
+        fflush(stderr);
+        CHECK_LE(0, dup2(stdout_fd, STDOUT_FILENO));
+        CHECK_LE(0, dup2(stderr_fd, STDERR_FILENO));
+        close(stdout_fd);
+        close(stderr_fd);
+        std::cout << "OK" << std::endl;
+    }
+}
+
 }  // namespace
 
 void RunONNX(const std::vector<std::string>& argv) {
+    if (argv.size() == 2 && argv[1] == "--worker") {
+        RunWorker(argv[0]);
+        return;
+    }
     RunMain(argv);
 }
 
@@ -79,29 +79,41 @@ int MismatchInAllClose(const chainerx::Array& a, const chainerx::Array& b, doubl
         throw chainerx::DtypeError{"Cannot compare Arrays of different Dtypes: ", a.dtype(), ", ", b.dtype()};
     }
 
-    chainerx::Array a_native = a.ToNative();
-    chainerx::Array b_native = b.ToNative();
+    // Compare arrays chunk by chunk so large arrays on devices and
+    // memory-mapped expected outputs are not copied at once.
+    const int64_t kChunkSize = 1 << 20;
+    const int64_t total_size = a.GetTotalSize();
+    chainerx::Array a_flat = a.Reshape({total_size});
+    chainerx::Array b_flat = b.Reshape({total_size});
 
-    return VisitDtype(a.dtype(), [&](auto pt) {
-        using T = typename decltype(pt)::type;
-        chainerx::IndexableArray<const T> a_iarray{a_native};
-        chainerx::IndexableArray<const T> b_iarray{b_native};
-        chainerx::Indexer<> indexer{a_native.shape()};
+    int64_t error_count = 0;
+    for (int64_t start = 0; start < total_size; start += kChunkSize) {
+        const int64_t stop = std::min(start + kChunkSize, total_size);
+        chainerx::Array a_native = a_flat.At({chainerx::Slice(start, stop)}).ToNative();
+        chainerx::Array b_native = b_flat.At({chainerx::Slice(start, stop)}).ToNative();
 
-        int64_t error_count = 0;
-        for (auto it = indexer.It(0); it; ++it) {
-            T ai = chainerx::native::StorageToDataType<const T>(a_iarray[it]);
-            T bi = chainerx::native::StorageToDataType<const T>(b_iarray[it]);
-            if (equal_nan && chainerx::IsNan(ai) && chainerx::IsNan(bi)) {
-                // nop
-            } else if (
-                    chainerx::IsNan(ai) || chainerx::IsNan(bi) ||
-                    std::abs(static_cast<double>(ai) - static_cast<double>(bi)) > atol + rtol * std::abs(static_cast<double>(bi))) {
-                error_count++;
+        error_count += VisitDtype(a.dtype(), [&](auto pt) {
+            using T = typename decltype(pt)::type;
+            chainerx::IndexableArray<const T> a_iarray{a_native};
+            chainerx::IndexableArray<const T> b_iarray{b_native};
+            chainerx::Indexer<> indexer{a_native.shape()};
+
+            int64_t count = 0;
+            for (auto it = indexer.It(0); it; ++it) {
+                T ai = chainerx::native::StorageToDataType<const T>(a_iarray[it]);
+                T bi = chainerx::native::StorageToDataType<const T>(b_iarray[it]);
+                if (equal_nan && chainerx::IsNan(ai) && chainerx::IsNan(bi)) {
+                    // nop
+                } else if (
+                        chainerx::IsNan(ai) || chainerx::IsNan(bi) ||
+                        std::abs(static_cast<double>(ai) - static_cast<double>(bi)) > atol + rtol * std::abs(static_cast<double>(bi))) {
+                    count++;
+                }
             }
-        }
-        return error_count;
-    });
+            return count;
+        });
+    }
+    return error_count;
 }
 
 }  // namespace runtime